@@ -1,5 +1,42 @@
 # coding: utf-8
-"""This is a simple code"""
+"""This is a simple code
+
+Modules are loaded on first use, so ``import wrlr`` is cheap and a worker
+ process only pays for what it touches:
+
+    from wrlr import CAPPI  # Loads cappi, not pandas nor scipy
+"""
 __author__ = 'João Victor Cal Garcia'
 __docformat__ = 'restructuredtext en'
 __version__ = "0.0.1"
+
+import importlib
+
+# Classes exported by the package, and the module defining each of them
+
+_classes = {'CAPPI': 'cappi',
+            'Codec': 'codec',
+            'EarthNetworks': 'earthnetworks',
+            'Handler': 'handler',
+            'SteinerHandler': 'handler_steiner',
+            'Summary': 'summary',
+            'WRLRHandler': 'handler_wrlr',
+            'Workspace': 'workspace'}
+
+__all__ = sorted(_classes)
+
+
+def __getattr__(name: str):
+    if name in _classes:
+        module = importlib.import_module('.' + _classes[name], __name__)
+        return getattr(module, name)
+    try:
+        return importlib.import_module('.' + name, __name__)
+    except ModuleNotFoundError as error:
+        if error.name != '%s.%s' % (__name__, name):
+            raise
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_classes))
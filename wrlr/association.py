@@ -0,0 +1,214 @@
+# coding: utf-8
+"""
+Association of Earth Networks pulses (``pulse.csv``) to their parent flashes
+ (``flash.csv``).
+
+A pulse belongs to the flash closest in time among the flashes starting at
+ most ``before`` after and ``after`` before it, within ``distance`` km. Both
+ tables are sorted by time, so the candidates of every pulse are a contiguous
+ range found by binary search, and all candidate pairs are checked at once:
+ the cost grows with the number of pulses and candidates, not with the
+ product of both tables.
+
+Files are streamed a chunk at a time, keeping in memory only the flashes
+ that can still receive pulses:
+
+    summary = association.stream('flash.csv', 'pulse.csv', 'BRU')
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+
+from .earthnetworks import EarthNetworks
+
+_km = 111.32  # km in a degree of latitude
+
+
+def _times(data: pd.DataFrame) -> np.ndarray:
+    times = data.datahora.values.astype('datetime64[ns]').view(np.int64)
+    if len(times) and (np.diff(times) < 0).any():
+        raise ValueError("Events must be sorted by time")
+    return times
+
+
+def associate(flashes: pd.DataFrame, pulses: pd.DataFrame,
+              before: str = "100ms", after: str = "1s",
+              distance: float = 10.0) -> np.ndarray:
+    """
+    Finds the parent flash of every pulse. Both tables must be sorted by time.
+
+    :param flashes: flashes as read by ``EarthNetworks.open``
+    :param pulses: pulses as read by ``EarthNetworks.open``
+    :param before: how long a pulse may precede its flash
+    :param after: how long a pulse may follow its flash
+    :param distance: the largest distance between a pulse and its flash, in km
+    :return: the position of the parent flash in ``flashes`` for every pulse,
+     -1 when there is none
+    """
+    flash_times = _times(flashes)
+    pulse_times = _times(pulses)
+    before = pd.to_timedelta(before).value
+    after = pd.to_timedelta(after).value
+
+    first = np.searchsorted(flash_times, pulse_times - after, side='left')
+    last = np.searchsorted(flash_times, pulse_times + before, side='right')
+    counts = last - first
+
+    # Every (pulse, candidate flash) pair, without a Python loop
+
+    pulse = np.repeat(np.arange(len(pulses)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                 counts)
+    flash = np.repeat(first, counts) + offset
+
+    latitude = flashes.latitude.values[flash]
+    dy = (pulses.latitude.values[pulse] - latitude) * _km
+    dx = (pulses.longitude.values[pulse] - flashes.longitude.values[flash]) * \
+        _km * np.cos(np.radians(latitude))
+    km = np.hypot(dx, dy)
+    gap = np.abs(pulse_times[pulse] - flash_times[flash])
+
+    near = km <= distance
+    pulse, flash, gap, km = pulse[near], flash[near], gap[near], km[near]
+
+    # The closest in time, then in distance, is the first of each pulse
+
+    order = np.lexsort((km, gap, pulse))
+    pulse, flash = pulse[order], flash[order]
+    chosen = np.ones(len(pulse), dtype=bool)
+    chosen[1:] = pulse[1:] != pulse[:-1]
+
+    output = np.full(len(pulses), -1, dtype=np.intp)
+    output[pulse[chosen]] = flash[chosen]
+    return output
+
+
+def summarize(flashes: pd.DataFrame, pulses: pd.DataFrame) -> pd.DataFrame:
+    """
+    Counts the pulses of every flash, given pulses with a ``flash`` column
+
+    :param flashes: flashes as read by ``EarthNetworks.open``
+    :param pulses: pulses with the id of their flash in ``flash``
+    :return: pd.DataFrame indexed by flash id, with ``tipo``,
+     ``multiplicidade`` and the number of ``pulses``, ``ic`` and ``cg`` pulses
+    """
+    matched = pulses[pulses.flash >= 0]
+    counts = pd.crosstab(matched.flash, matched.tipo)
+    output = flashes[['tipo', 'multiplicidade']].copy()
+    for column, kind in (('ic', 'IC'), ('cg', 'CG')):
+        values = counts[kind] if kind in counts else pd.Series(dtype=np.int64)
+        output[column] = values.reindex(output.index, fill_value=0) \
+            .astype(np.int64)
+    output.insert(2, 'pulses', output.ic + output.cg)
+    return output
+
+
+class Associator(object):
+    """
+    Streams time-sorted chunks of flashes and pulses, keeping only the
+     flashes that pulses still to come may belong to.
+
+    :param before: how long a pulse may precede its flash
+    :param after: how long a pulse may follow its flash
+    :param distance: the largest distance between a pulse and its flash, in km
+    """
+
+    def __init__(self, before: str = "100ms", after: str = "1s",
+                 distance: float = 10.0):
+        self.before = before
+        self.after = after
+        self.distance = distance
+
+    def run(self, flash_chunks, pulse_chunks):
+        """
+        Associates every chunk of pulses
+
+        :param flash_chunks: an iterable of time-sorted flash tables
+        :param pulse_chunks: an iterable of time-sorted pulse tables
+        :return: a generator of (flashes, pulses), the pulses of a chunk with
+         a ``flash`` id column (-1 when unmatched), and the flashes leaving the
+         buffer, which cannot receive more pulses
+        """
+        before = pd.to_timedelta(self.before)
+        after = pd.to_timedelta(self.after)
+        flash_chunks = iter(flash_chunks)
+        buffer = None
+        exhausted = False
+        last_time = None
+
+        for pulses in pulse_chunks:
+            if not len(pulses):
+                continue
+            if last_time is not None and pulses.datahora.iloc[0] < last_time:
+                raise ValueError("Events must be sorted by time")
+            last_time = pulses.datahora.iloc[-1]
+
+            # Flashes up to the last pulse of the chunk (plus ``before``)
+
+            while not exhausted and (buffer is None or not len(buffer) or
+                                     buffer.datahora.iloc[-1] <=
+                                     last_time + before):
+                chunk = next(flash_chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    buffer = chunk if buffer is None \
+                        else pd.concat([buffer, chunk])
+
+            if buffer is None:
+                buffer = pd.DataFrame(columns=pulses.columns)
+
+            index = associate(buffer, pulses, self.before, self.after,
+                              self.distance)
+            ids = np.append(buffer.index.values, -1)  # -1 for index -1
+            pulses = pulses.assign(flash=ids[index])
+
+            # Flashes too old for the next pulses leave the buffer
+
+            old = buffer.datahora < last_time - after
+            done, buffer = buffer[old], buffer[~old]
+            yield done, pulses
+
+        # Flashes left, including the ones after the last pulse
+
+        rest = ([] if buffer is None else [buffer]) + list(flash_chunks)
+        if rest:
+            yield pd.concat(rest), pd.DataFrame({'flash': [], 'tipo': []})
+
+
+def stream(flash_file: str, pulse_file: str, city: str,
+           chunksize: int = 100000, before: str = "100ms",
+           after: str = "1s", distance: float = 10.0) -> pd.DataFrame:
+    """
+    Associates the pulses of a file with the flashes of another, both sorted
+     by time, reading them a chunk at a time.
+
+    :param flash_file: the flash.csv file
+    :param pulse_file: the pulse.csv file
+    :param city: city code for a radar, whose box limits the events
+    :param chunksize: number of rows read at a time
+    :param before: how long a pulse may precede its flash
+    :param after: how long a pulse may follow its flash
+    :param distance: the largest distance between a pulse and its flash, in km
+    :return: the table of ``summarize`` for every flash
+    """
+    reader = EarthNetworks(city)
+    associator = Associator(before, after, distance)
+
+    output = []
+    pending = []
+    for flashes, pulses in associator.run(reader.chunks(flash_file, chunksize),
+                                          reader.chunks(pulse_file,
+                                                        chunksize)):
+        pending.append(pulses[pulses.flash >= 0])
+        if len(flashes):
+            matched = pd.concat(pending)
+            ids = flashes.index
+            output.append(summarize(flashes, matched[matched.flash.isin(ids)]))
+            pending = [matched[~matched.flash.isin(ids)]]
+
+    if not output:
+        return summarize(pd.DataFrame(columns=['tipo', 'multiplicidade']),
+                         pd.DataFrame(columns=['flash', 'tipo']))
+    return pd.concat(output)
@@ -0,0 +1,337 @@
+# coding: utf-8
+"""
+Compute backends for the kernels of the Steiner method, see
+ ``CAPPI.steiner_filter``:
+* background: the mean of the valid pixels of the 11 km background circle;
+* peak: the threshold rule, ``True`` where a pixel is not a peak;
+* surrounding: the convective radius dilation, ``True`` around convective
+  pixels.
+
+Every backend shares the same API and must give the same masks as the
+ ``reference`` one, the per-pixel callbacks of ``scipy.ndimage``:
+* reference: per-pixel Python callbacks and loops, always available;
+* numpy: vectorized shifts over the whole grid, always available;
+* numba: compiled loops, when numba is installed.
+
+The numpy and numba backends share the vectorized ``peak``, while the
+ reference one applies the threshold pixel by pixel.
+
+The backend is chosen by ``CAPPI.backend``, else by the
+ ``WRLR_STEINER_BACKEND`` environment variable, else the first available of
+ ``preference``. A backend that cannot be loaded falls back to numpy with a
+ warning.
+"""
+__docformat__ = 'restructuredtext en'
+
+import bisect
+import collections
+import functools
+import importlib.util
+import os
+import warnings
+
+import numpy as np
+
+from . import circles
+
+Backend = collections.namedtuple('Backend', ['name', 'background', 'peak',
+                                             'surrounding'])
+
+# name: (function building the Backend, module it requires)
+
+_registry = collections.OrderedDict()
+
+preference = ('numba', 'numpy')
+fallback = 'numpy'
+variable = 'WRLR_STEINER_BACKEND'
+
+_background_size = 23  # Side of the background circle
+
+
+def register(name: str, factory, requires: str = None):
+    """
+    Adds a backend to the registry
+
+    :param name: the backend name
+    :param factory: a function without arguments returning the Backend
+    :param requires: a module the backend needs, if any
+    """
+    _registry[name] = (factory, requires)
+    get.cache_clear()
+
+
+def available() -> tuple:
+    """
+    The names of the backends that can be loaded here
+    """
+    return tuple(name for name, (_, requires) in _registry.items()
+                 if requires is None or
+                 importlib.util.find_spec(requires) is not None)
+
+
+@functools.lru_cache(maxsize=None)
+def get(name: str) -> Backend:
+    """
+    Loads a backend, once per process
+
+    :param name: the backend name
+    :return: Backend
+    """
+    if name not in _registry:
+        raise ValueError("Unknown Steiner backend %r, use one of %s" %
+                         (name, ', '.join(_registry)))
+    return _registry[name][0]()
+
+
+def select(name: str = None) -> Backend:
+    """
+    Chooses a backend by name, by the ``WRLR_STEINER_BACKEND`` environment
+     variable or by ``preference``, falling back to numpy
+
+    :param name: the backend name, None for the configured one
+    :return: Backend
+    """
+    name = name or os.environ.get(variable)
+    if name is None:
+        name = next(name for name in preference if name in available())
+    try:
+        return get(name)
+    except (ImportError, ValueError) as error:
+        if name == fallback:
+            raise
+        warnings.warn("Steiner backend %r is not available (%s), using %r" %
+                      (name, error, fallback), RuntimeWarning)
+        return get(fallback)
+
+
+def peak(data: np.ndarray, background: np.ndarray, mask_value: float,
+         parameters, output: np.ndarray = None) -> np.ndarray:
+    """
+    The threshold rule: ``True`` where a pixel is masked or does not exceed
+     its background by the threshold of Steiner et al. (1995), Equation 2
+
+    :param data: dBZ matrix
+    :param background: the background mean of data
+    :param mask_value: the value of invalid pixels
+    :param parameters: a SteinerParameters
+    :param output: a boolean array to be overwritten with the result
+    :return: np.ndarray of bool
+    """
+    point = data.astype(np.float64)
+    threshold = np.where(point < 0, parameters.threshold_max,
+                         parameters.threshold_max -
+                         (point ** 2) / parameters.threshold_scale)
+    threshold[point >= parameters.threshold_cutoff] = 0
+    point -= threshold
+    output = np.greater(point, background, out=output)
+    np.logical_not(output, out=output)
+    output[data == mask_value] = True
+    return output
+
+
+def _radius(data: np.ndarray, radius_bins: tuple) -> np.ndarray:
+    return np.searchsorted(np.asarray(radius_bins, dtype=np.float64), data,
+                           side='right') + 1
+
+
+def _check(radius_bins: tuple):
+    if len(radius_bins) >= len(circles.convective_radius):
+        raise ValueError("At most %d radius bins are supported" %
+                         (len(circles.convective_radius) - 1))
+
+
+# Reference: the per-pixel callbacks
+
+def _reference_background(data: np.ndarray, mask_value: float,
+                          output: np.ndarray = None) -> np.ndarray:
+    from scipy import ndimage
+
+    line = circles.background_line
+
+    def mean(window: np.ndarray) -> float:
+        window = window[line]
+        window = window[window != mask_value]
+        return window.mean() if window.size else 0
+
+    if output is None:
+        output = np.empty(data.shape, dtype=np.float64)
+    ndimage.generic_filter(data, mean, output=output, size=_background_size)
+    return output
+
+
+def _reference_peak(data: np.ndarray, background: np.ndarray,
+                    mask_value: float, parameters,
+                    output: np.ndarray = None) -> np.ndarray:
+    def threshold(point: float) -> float:
+        # Steiner et al. (1995), Equation 2
+        if point < 0:
+            return parameters.threshold_max
+        elif point < parameters.threshold_cutoff:
+            return parameters.threshold_max - \
+                (point ** 2) / parameters.threshold_scale
+        else:
+            return 0
+
+    if output is None:
+        output = np.empty(data.shape, dtype=np.bool_)
+    for (line, column), value in np.ndenumerate(data):
+        point = float(value)
+        output[line, column] = value == mask_value or \
+            not point - threshold(point) > background[line, column]
+    return output
+
+
+def _reference_surrounding(data: np.ndarray, mask_value: float,
+                           radius_bins: tuple,
+                           output: np.ndarray = None) -> np.ndarray:
+    _check(radius_bins)
+    if output is None:
+        output = np.zeros(data.shape, dtype=np.bool_)
+    else:
+        output.fill(False)
+
+    line_max, column_max = data.shape
+    for (line, column), value in np.ndenumerate(data):
+        if value == mask_value:
+            continue
+        if 5 >= line or line >= line_max - 5:
+            continue
+        if 5 >= column or column >= column_max - 5:
+            continue
+
+        radius = bisect.bisect_right(radius_bins, value) + 1
+        output[line - radius:line + radius + 1,
+               column - radius:column + radius + 1] += \
+            circles.convective_radius[radius]
+    return output
+
+
+register('reference', lambda: Backend('reference', _reference_background,
+                                      _reference_peak,
+                                      _reference_surrounding))
+
+
+# NumPy: the same sums and dilations as shifted whole-grid operations
+
+def _numpy_background(data: np.ndarray, mask_value: float,
+                      output: np.ndarray = None) -> np.ndarray:
+    half = _background_size // 2
+    lines, columns = data.shape
+
+    # ``reflect`` of scipy.ndimage is ``symmetric`` of numpy
+
+    padded = np.pad(data.astype(np.float64), half, mode='symmetric')
+    valid = padded != mask_value
+    padded[~valid] = 0
+
+    total = np.zeros(data.shape, dtype=np.float64)
+    count = np.zeros(data.shape, dtype=np.intp)
+    for line, column in np.argwhere(circles.background_radius):
+        total += padded[line:line + lines, column:column + columns]
+        count += valid[line:line + lines, column:column + columns]
+
+    if output is None:
+        output = np.empty(data.shape, dtype=np.float64)
+    np.divide(total, count, out=output, where=count > 0)
+    output[count == 0] = 0
+    return output
+
+
+def _numpy_surrounding(data: np.ndarray, mask_value: float,
+                       radius_bins: tuple,
+                       output: np.ndarray = None) -> np.ndarray:
+    _check(radius_bins)
+    lines, columns = data.shape
+    margin = len(circles.convective_radius)
+
+    convective = np.zeros(data.shape, dtype=np.bool_)
+    convective[6:lines - 5, 6:columns - 5] = True
+    convective &= data != mask_value
+    radius = _radius(data, radius_bins)
+
+    grown = np.zeros((lines + 2 * margin, columns + 2 * margin),
+                     dtype=np.bool_)
+    for size in np.unique(radius[convective]):
+        selected = convective & (radius == size)
+        for line, column in np.argwhere(circles.convective_radius[size]):
+            top = margin + line - size
+            left = margin + column - size
+            grown[top:top + lines, left:left + columns] |= selected
+
+    if output is None:
+        output = np.empty(data.shape, dtype=np.bool_)
+    output[...] = grown[margin:margin + lines, margin:margin + columns]
+    return output
+
+
+register('numpy', lambda: Backend('numpy', _numpy_background, peak,
+                                  _numpy_surrounding))
+
+
+# Numba: compiled loops, built the first time the backend is loaded
+
+def _numba_backend() -> Backend:
+    import numba
+
+    offsets = np.argwhere(circles.background_radius) - _background_size // 2
+    disks = np.zeros((len(circles.convective_radius) + 1, 11, 11),
+                     dtype=np.bool_)
+    for size, disk in circles.convective_radius.items():
+        disks[size, 5 - size:6 + size, 5 - size:6 + size] = disk
+
+    @numba.njit(cache=True)
+    def reflect(index, size):
+        while index < 0 or index >= size:
+            index = -index - 1 if index < 0 else 2 * size - index - 1
+        return index
+
+    @numba.njit(cache=True)
+    def background_loop(data, mask_value, offsets, output):
+        lines, columns = data.shape
+        for line in range(lines):
+            for column in range(columns):
+                total = 0.0
+                count = 0
+                for k in range(offsets.shape[0]):
+                    value = data[reflect(line + offsets[k, 0], lines),
+                                 reflect(column + offsets[k, 1], columns)]
+                    if value != mask_value:
+                        total += value
+                        count += 1
+                output[line, column] = total / count if count else 0.0
+
+    @numba.njit(cache=True)
+    def surrounding_loop(data, mask_value, radius_bins, disks, output):
+        lines, columns = data.shape
+        output[:] = False
+        for line in range(6, lines - 5):
+            for column in range(6, columns - 5):
+                value = data[line, column]
+                if value == mask_value:
+                    continue
+                size = np.searchsorted(radius_bins, value, side='right') + 1
+                for i in range(-size, size + 1):
+                    for j in range(-size, size + 1):
+                        if disks[size, 5 + i, 5 + j]:
+                            output[line + i, column + j] = True
+
+    def background(data, mask_value, output=None):
+        if output is None:
+            output = np.empty(data.shape, dtype=np.float64)
+        background_loop(data.astype(np.float64), np.float64(mask_value),
+                        offsets, output)
+        return output
+
+    def surrounding(data, mask_value, radius_bins, output=None):
+        _check(radius_bins)
+        if output is None:
+            output = np.empty(data.shape, dtype=np.bool_)
+        surrounding_loop(data.astype(np.float64), np.float64(mask_value),
+                         np.asarray(radius_bins, dtype=np.float64), disks,
+                         output)
+        return output
+
+    return Backend('numba', background, peak, surrounding)
+
+
+register('numba', _numba_backend, requires='numba')
@@ -0,0 +1,306 @@
+# coding: utf-8
+"""
+Batch entry point splitting the Steiner processing of a radar archive across
+ several machines sharing the same storage, without any coordinator.
+
+Every machine lists the same files and takes its own deterministic share:
+
+    python -m wrlr.batch run BRU PPR --path /data/Radar/BR_PP \\
+        --start 2014-01-01 --end 2015-01-01 --shard 0/4 --output manifests
+
+Each shard writes its Steiner files, a manifest and a summary, see
+ ``summary``. While a shard runs, every finished file is appended to a journal
+ next to its manifest, which is only written in full when the shard starts
+ and ends, and the summary rows of the shard are saved as a part file every
+ ``checkpoint`` files.
+ Once all shards are done, the manifests are merged and checked, and the
+ shard summaries are merged into ``summary.npz``:
+
+    python -m wrlr.batch merge manifests
+"""
+__docformat__ = 'restructuredtext en'
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+from pandas import to_datetime
+
+from . import summary
+from .handler import Handler
+from .handler_steiner import SteinerHandler
+from .summary import Summary
+
+
+def parse_shard(shard: str) -> tuple:
+    """
+    Parses a ``i/N`` shard specification
+
+    :param shard: a string such as "0/4"
+    :return: (index, count)
+    """
+    try:
+        index, count = (int(value) for value in shard.split('/'))
+    except ValueError:
+        raise ValueError("Shard must be given as i/N, not %r" % shard)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError("Shard %r is out of range" % shard)
+    return index, count
+
+
+def assign(catalog: list, count: int) -> list:
+    """
+    Splits catalog entries in ``count`` shards, balancing bytes and files.
+
+    Files are taken from the largest to the smallest and each one is given to
+     the shard with the fewest bytes so far (then fewest files, then lowest
+     index). The result only depends on the file names and sizes, so every
+     machine computes the same split.
+
+    :param catalog: a list of CatalogEntry
+    :param count: number of shards
+    :return: a list of ``count`` lists of CatalogEntry, sorted by file name
+    """
+    shards = [[] for _ in range(count)]
+    load = [(0, 0, index) for index in range(count)]
+
+    for entry in sorted(catalog, key=lambda e: (-e.size, e.file)):
+        size, files, index = min(load)
+        shards[index].append(entry)
+        load[index] = (size + entry.size, files + 1, index)
+
+    return [sorted(shard, key=lambda e: e.file) for shard in shards]
+
+
+def select(handler: Handler, start: str = None, end: str = None) -> list:
+    """
+    Lists the catalog of a handler, keeping files in [start, end)
+
+    :param handler: a Handler
+    :param start: first date, inclusive
+    :param end: last date, exclusive
+    :return: a list of CatalogEntry
+    """
+    handler.list_catalog()
+    start = to_datetime(start) if start else None
+    end = to_datetime(end) if end else None
+    return [entry for entry in handler.catalog
+            if (start is None or entry.date >= start) and
+            (end is None or entry.date < end)]
+
+
+def manifest_name(output: str, index: int, count: int) -> str:
+    return os.path.join(output, "manifest-%04d-of-%04d.json" % (index, count))
+
+
+def journal_name(output: str, index: int, count: int) -> str:
+    return os.path.join(output, "manifest-%04d-of-%04d.jsonl" % (index, count))
+
+
+def summary_name(output: str, index: int, count: int) -> str:
+    return os.path.join(output, "summary-%04d-of-%04d.npz" % (index, count))
+
+
+def read_files(output: str, manifest: dict) -> list:
+    """
+    The files of a shard manifest, followed by those of its journal when the
+     shard did not finish. A line cut by a crash is ignored.
+
+    :param output: directory of the manifests
+    :param manifest: the manifest of the shard
+    :return: a list of file items, a file being repeated when processed again
+    """
+    files = list(manifest['files'])
+    file_name = journal_name(output, manifest['shard'], manifest['shards'])
+    if manifest['finished'] is None and os.path.exists(file_name):
+        with open(file_name) as journal:
+            for line in journal:
+                try:
+                    files.append(json.loads(line))
+                except ValueError:
+                    continue
+    return files
+
+
+def write_json(file_name: str, content: dict):
+    """
+    Writes a JSON file atomically, so a crashed shard never leaves a partial
+     manifest behind.
+    """
+    temporary = file_name + ".tmp"
+    with open(temporary, 'w') as output:
+        json.dump(content, output, indent=1)
+    os.replace(temporary, file_name)
+
+
+def run(city_codes: list, path: str, shard: str, output: str,
+        start: str = None, end: str = None, checkpoint: int = 100) -> dict:
+    """
+    Processes a single shard, writing its manifest and summary to ``output``.
+     Files already done by a previous run of the same shard are skipped,
+     unless their output or their summary rows are missing.
+
+    :param city_codes: city codes sharing the radar files
+    :param path: file path for the radar files
+    :param shard: a ``i/N`` shard specification
+    :param output: directory of the manifests
+    :param start: first date, inclusive
+    :param end: last date, exclusive
+    :param checkpoint: files processed between two saves of the summary
+    :return: the manifest
+    """
+    index, count = parse_shard(shard)
+    handler = SteinerHandler(city_codes, path)
+    handler.checkpoint = checkpoint
+    entries = assign(select(handler, start, end), count)[index]
+
+    os.makedirs(output, exist_ok=True)
+    file_name = manifest_name(output, index, count)
+    summary_file = summary_name(output, index, count)
+
+    # Rows are saved after their journal lines, so a file of the journal may
+    # have lost its rows in a crash.
+
+    summarized = set(summary.read(summary_file).data['file_name'])
+
+    done = {}
+    if os.path.exists(file_name):
+        with open(file_name) as previous:
+            previous = json.load(previous)
+        for item in read_files(output, previous):
+            if item['status'] == 'done' and \
+                    os.path.exists(item['output']) and \
+                    item['file'] in summarized:
+                done[item['file']] = item
+            else:
+                done.pop(item['file'], None)
+
+    manifest = {'cities': list(city_codes), 'path': path,
+                'start': start, 'end': end, 'shard': index, 'shards': count,
+                'host': socket.gethostname(), 'started': time.time(),
+                'finished': None, 'files': []}
+
+    # The items done by a previous run move from its journal to the manifest
+    # before the journal is started again.
+
+    write_json(file_name, dict(manifest, files=list(done.values())))
+
+    handler.populate_dirs()
+    with open(journal_name(output, index, count), 'w') as journal:
+        for entry in entries:
+            item = done.get(entry.file)
+            if item is None:
+                item = {'file': entry.file, 'size': entry.size}
+                began = time.perf_counter()
+                try:
+                    handler.process_file(entry.file)
+                    item.update(status='done',
+                                output=handler.radar.steiner_file_name())
+                except Exception:
+                    item.update(status='failed',
+                                error=traceback.format_exc())
+                item['seconds'] = time.perf_counter() - began
+                journal.write(json.dumps(item) + '\n')
+                journal.flush()
+                handler.checkpoint_summary(summary_file)
+            manifest['files'].append(item)
+
+            sys.stdout.write("\r%d/%d - %s" % (len(manifest['files']),
+                                               len(entries), entry.file))
+            sys.stdout.flush()
+
+    handler.combine_summary(summary_file)
+    manifest['finished'] = time.time()
+    write_json(file_name, manifest)
+    os.remove(journal_name(output, index, count))
+    return manifest
+
+
+def merge(output: str) -> dict:
+    """
+    Merges the manifests of every shard in ``output`` into ``manifest.json``,
+     reporting missing shards, failed files and files processed twice, and
+     their summaries into ``summary.npz``.
+
+    :param output: directory of the manifests
+    :return: the merged manifest
+    """
+    manifests = []
+    for file_name in sorted(glob.glob(os.path.join(output,
+                                                   "manifest-*-of-*.json"))):
+        with open(file_name) as manifest:
+            manifests.append(json.load(manifest))
+    if not manifests:
+        raise ValueError("No manifests found in %s" % output)
+
+    keys = ('cities', 'path', 'start', 'end', 'shards')
+    first = manifests[0]
+    for manifest in manifests:
+        if any(manifest[key] != first[key] for key in keys):
+            raise ValueError("Shard %d was run with other parameters" %
+                             manifest['shard'])
+
+    files = {}
+    duplicated = []
+    for manifest in manifests:
+        shard = {}
+        for item in read_files(output, manifest):
+            shard[item['file']] = item
+        for file_name, item in shard.items():
+            if file_name in files:
+                duplicated.append(file_name)
+            files[file_name] = item
+
+    found = {manifest['shard'] for manifest in manifests}
+    merged = {key: first[key] for key in keys}
+    merged.update(
+        missing_shards=sorted(set(range(first['shards'])) - found),
+        unfinished_shards=sorted(m['shard'] for m in manifests
+                                 if m['finished'] is None),
+        failed=sorted(f for f, item in files.items()
+                      if item['status'] != 'done'),
+        duplicated=sorted(duplicated),
+        files=[files[file_name] for file_name in sorted(files)])
+    write_json(os.path.join(output, "manifest.json"), merged)
+
+    shards = [summary.read(summary_name(output, manifest['shard'],
+                                        manifest['shards']))
+              for manifest in manifests]
+    Summary.concatenate(shards).save(os.path.join(output, "summary.npz"))
+    return merged
+
+
+def main(arguments: list = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run_parser = commands.add_parser('run', help='process a single shard')
+    run_parser.add_argument('cities', nargs='+')
+    run_parser.add_argument('--path', required=True)
+    run_parser.add_argument('--start')
+    run_parser.add_argument('--end')
+    run_parser.add_argument('--shard', default='0/1')
+    run_parser.add_argument('--output', required=True)
+    run_parser.add_argument('--checkpoint', type=int, default=100)
+
+    merge_parser = commands.add_parser('merge', help='merge shard manifests')
+    merge_parser.add_argument('output')
+
+    arguments = parser.parse_args(arguments)
+    if arguments.command == 'run':
+        return run(arguments.cities, arguments.path, arguments.shard,
+                   arguments.output, arguments.start, arguments.end,
+                   arguments.checkpoint)
+    return merge(arguments.output)
+
+
+if __name__ == '__main__':
+    main()
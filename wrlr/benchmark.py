@@ -0,0 +1,266 @@
+# coding: utf-8
+"""
+Benchmark suite for the radar and lightning hot paths, running over synthetic
+ data so results can be compared between machines and engines.
+
+Every stage is timed over a few repetitions and its peak traced memory is
+ recorded. Results are written as JSON, and may be compared against a
+ previous baseline:
+
+    python -m wrlr.benchmark --output baseline.json
+    python -m wrlr.benchmark --compare baseline.json
+"""
+__docformat__ = 'restructuredtext en'
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from . import backends
+from . import cities
+from . import synthetic
+from .cappi import CAPPI
+from .clustering import Cluster
+from .earthnetworks import EarthNetworks
+from .handler import Handler
+
+# Modules a worker process may need. Each must import within ``import_budget``
+# seconds on top of numpy, without loading any of ``heavy_modules``.
+
+worker_modules = ('wrlr.cappi', 'wrlr.handler_steiner', 'wrlr.pipeline',
+                  'wrlr.workspace')
+heavy_modules = ('pandas', 'scipy', 'geopy')
+import_budget = 0.25
+
+_import_script = """
+import importlib, json, sys, time
+import numpy
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({'seconds': time.perf_counter() - start,
+                  'loaded': [name for name in sys.argv[2:]
+                             if name in sys.modules]}))
+"""
+
+
+def import_time(module: str) -> dict:
+    """
+    Imports a module in a fresh interpreter, as a worker process would
+
+    :param module: the module name, such as 'wrlr.cappi'
+    :return: dict with the seconds taken after numpy is loaded, and which of
+     ``heavy_modules`` were loaded
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', _import_script, module] +
+                            list(heavy_modules), cwd=root, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True)
+    return json.loads(output.stdout)
+
+
+def measure(function, repeat: int = 3) -> dict:
+    """
+    Runs a function ``repeat`` times, returning the best wall time and the
+     peak memory traced during the first run.
+
+    :param function: a callable without arguments
+    :param repeat: number of runs
+    :return: dict with seconds and peak_bytes
+    """
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    return {'seconds': min(seconds), 'peak_bytes': peak}
+
+
+class Benchmark(object):
+    """
+    Creates the synthetic data tree inside ``root`` and times every stage for
+     the given cities, storing one record per (stage, city) in ``results``.
+    """
+
+    def __init__(self, root: str, scans: int = 4, events: int = 100000,
+                 repeat: int = 3):
+        self.root = root
+        self.scans = scans
+        self.events = events
+        self.repeat = repeat
+        self.results = []
+
+    def record(self, stage: str, city: str, function, items: int,
+               unit: str, repeat: int = None):
+        """
+        Measures a stage and stores its throughput in ``unit`` per second.
+        """
+        result = measure(function, self.repeat if repeat is None else repeat)
+        result.update(stage=stage, city=city, items=items, unit=unit,
+                      throughput=items / result['seconds']
+                      if result['seconds'] else float('inf'))
+        self.results.append(result)
+        sys.stdout.write("%-28s %-4s %10.4fs %12.1f %s/s %8.1f MB\n" %
+                         (stage, city, result['seconds'],
+                          result['throughput'], unit,
+                          result['peak_bytes'] / 2 ** 20))
+
+    def imports(self):
+        """
+        Benchmarks the import of the modules of a worker process
+        """
+        for module in worker_modules:
+            result = min((import_time(module) for _ in range(self.repeat)),
+                         key=lambda result: result['seconds'])
+            result.update(stage='import ' + module, city='', items=1,
+                          unit='import', peak_bytes=0,
+                          throughput=1 / max(result['seconds'], 1e-9))
+            self.results.append(result)
+            sys.stdout.write("%-28s %-4s %10.4fs %s\n" %
+                             (result['stage'], '', result['seconds'],
+                              ' '.join(result['loaded'])))
+
+    def radar(self, city: str):
+        """
+        Benchmarks CAPPI and Handler over a synthetic radar tree
+        """
+        files = synthetic.radar_tree(os.path.join(self.root, city), city,
+                                     periods=self.scans)
+        radar = CAPPI(city)
+        megabytes = radar.data_size / 2.0 ** 20
+
+        self.record('CAPPI.open', city, lambda: radar.open(files[0]),
+                    megabytes, 'MB')
+
+        radar.open(files[0])
+        regions = CAPPI.regions([radar])
+        for backend in backends.available():
+            radar.backend = backend
+            self.record('CAPPI.steiner_filter[%s]' % backend, city,
+                        lambda: radar.steiner_filter(regions),
+                        1, 'scan', repeat=1)
+        radar.backend = None
+
+        def to_zr():
+            radar.open(files[0])
+            radar.remove_borders()
+            radar.to_zr()
+
+        self.record('CAPPI.to_zr', city, to_zr, 1, 'scan')
+
+        radar.open(files[0])
+        radar.remove_borders()
+        self.record('CAPPI._slice', city, lambda: radar._slice(4), 1, 'scan')
+
+        handler = Handler(os.path.dirname(os.path.dirname(files[0])))
+
+        def index():
+            handler.list_files()
+            handler.list_dates()
+            handler.generate_date_tuples("30m", "450s")
+
+        self.record('Handler.index', city, index, len(files), 'file')
+
+    def lightning(self, city: str):
+        """
+        Benchmarks EarthNetworks and Cluster over a synthetic csv file
+        """
+        file_name = synthetic.lightning_csv(
+            os.path.join(self.root, city, 'Lightning', 'flash.csv'), city,
+            events=self.events)
+        flash = EarthNetworks(city)
+
+        self.record('EarthNetworks.open', city,
+                    lambda: flash.open(file_name), self.events, 'event')
+
+        flash.open(file_name)
+        start = flash.data.datahora.min()
+        end = flash.data.datahora.max()
+        self.record('EarthNetworks.to_matrix', city,
+                    lambda: flash.to_matrix(start, end, 'IC'),
+                    len(flash.data), 'event')
+
+        cluster = Cluster(file_name)
+        self.record('Cluster.create_clusters', city, cluster.create_clusters,
+                    len(cluster.data), 'event', repeat=1)
+
+    def run(self, city_codes: list) -> dict:
+        """
+        Benchmarks every stage for every city
+
+        :param city_codes: a list of city codes
+        :return: dict with the machine description and the results
+        """
+        self.imports()
+        for city in city_codes:
+            self.radar(city)
+            self.lightning(city)
+
+        return {'machine': {'python': platform.python_version(),
+                            'numpy': np.__version__,
+                            'pandas': pd.__version__,
+                            'platform': platform.platform(),
+                            'processor': platform.processor()},
+                'parameters': {'scans': self.scans, 'events': self.events,
+                               'repeat': self.repeat},
+                'results': self.results}
+
+
+def compare(baseline: dict, current: dict):
+    """
+    Writes the speed-up of every stage of current over baseline
+    """
+    old = {(r['stage'], r['city']): r for r in baseline['results']}
+    for result in current['results']:
+        previous = old.get((result['stage'], result['city']))
+        if previous is None:
+            continue
+        sys.stdout.write("%-28s %-4s %6.2fx time %6.2fx memory\n" %
+                         (result['stage'], result['city'],
+                          previous['seconds'] / result['seconds'],
+                          previous['peak_bytes'] /
+                          max(result['peak_bytes'], 1)))
+
+
+def main(arguments: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cities', nargs='+', default=list(cities.valid_cities),
+                        choices=cities.valid_cities)
+    parser.add_argument('--scans', type=int, default=4)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--compare', help='JSON baseline to compare against')
+    arguments = parser.parse_args(arguments)
+
+    with tempfile.TemporaryDirectory() as root:
+        output = Benchmark(root, arguments.scans, arguments.events,
+                           arguments.repeat).run(arguments.cities)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(output, output_file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            compare(json.load(baseline_file), output)
+
+    return output
+
+
+if __name__ == '__main__':
+    main()
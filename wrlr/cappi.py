@@ -6,20 +6,44 @@ This Package deals with CAPPI files containing Radar data.
 
 __docformat__ = 'restructuredtext en'
 
+import collections
 import datetime
 import gzip
+import io
+import itertools
+import os
 
 import numpy as np
-from scipy.ndimage.filters import generic_filter
 
-import cities
-import circles
+from . import backends
+from . import geometry
+from . import instrument
+from .workspace import Workspace
+
+# The parameters of the Steiner method, as described in ``steiner_filter``:
+# * intensity: dBZ above which every point is convective;
+# * threshold_max, threshold_scale and threshold_cutoff: the threshold curve,
+#   ``threshold_max - z ** 2 / threshold_scale`` for 0 <= z < threshold_cutoff;
+# * radius_bins: dBZ limits between convective radius of 1, 2, ... pixels.
+
+SteinerParameters = collections.namedtuple(
+    'SteinerParameters',
+    ['intensity', 'threshold_max', 'threshold_scale', 'threshold_cutoff',
+     'radius_bins'],
+    defaults=(40.0, 10.0, 180.0, 42.43, (25, 30, 35, 40)))
 
 
 class CAPPI(object):
     """
     This is the class for working with CAPPI radar files
 
+    When ``workspace`` is set, ``open``, ``steiner_filter`` and ``to_zr`` write
+     into its buffers instead of allocating new arrays, so ``data`` and
+     ``steiner_mask`` are only valid until the next file is opened.
+
+    ``backend`` names the implementation of the Steiner kernels, see
+     ``backends``.
+
     :param city: A string for the radar location
     """
 
@@ -32,23 +56,25 @@ class CAPPI(object):
     side = 200  # Side of the square matrix
     slices = None
     steiner_mask = None  # type: np.ndarray
+    steiner_masks = None  # type: collections.OrderedDict
+    workspace = None  # type: Workspace
+    backend = None  # Name of the Steiner backend, see ``backends.select``
+    _selected = None  # (backend, Backend) selected by ``_backend``
 
-    def __init__(self, city: str):
-        self.city = cities.cities[city]
+    # Pixels around a city box that the Steiner method depends upon: the 11
+    # pixel background radius plus the largest convective radius.
+    halo = 16
 
-        lat_line = np.linspace(start=self.city.lat_min,
-                               stop=self.city.lat_max,
-                               num=self.side)
-        lon_line = np.linspace(start=self.city.lon_min,
-                               stop=self.city.lon_max,
-                               num=self.side)
-
-        self.latitude, self.longitude = np.meshgrid(lon_line, lat_line,
-                                                    indexing='ij')
+    def __init__(self, city: str):
+        self.geometry = geometry.get(city)
+        self.city = self.geometry.city
+        self.latitude = self.geometry.latitude
+        self.longitude = self.geometry.longitude
 
         self.y_size, self.x_size = self.city.shape
-        self.y_upper_left, self.x_upper_left = self.city.box_ul
-        self.y_lower_right, self.x_lower_right = self.city.box_lr
+        rows, columns = self.geometry.box
+        self.y_upper_left, self.y_lower_right = rows.start, rows.stop
+        self.x_upper_left, self.x_lower_right = columns.start, columns.stop
         self.data_size = self.x_size * self.y_size * 4  # Binary size for float
 
     @property
@@ -69,13 +95,18 @@ class CAPPI(object):
         date = date.split('.')[0]
         self.date = datetime.datetime.strptime(date, "%Y%m%d%H%M%S")
 
+    @instrument.timed('cappi.to_zr')
     def to_zr(self):
         """
-        Convert dBZ pixel values to mmh by using a ZR relationship
+        Convert dBZ pixel values to mmh by using the ZR lookup table of the
+         city, see ``geometry.Geometry.zr``
         """
-        self.data[-self.mask] = self.city.zr(self.data[-self.mask])
+        valid = self._buffer('zr.valid', self.mask.shape, np.bool_)
+        np.logical_not(self.mask, out=valid)
+        self.data[valid] = self.geometry.zr(self.data[valid])
         self.data[self.mask] = 0
-        self.data[self.data < 0] = 0
+        np.less(self.data, 0, out=valid)
+        self.data[valid] = 0
 
     def remove_borders(self):
         """
@@ -89,12 +120,17 @@ class CAPPI(object):
                 self.steiner_mask[self.y_upper_left:self.y_lower_right,
                                   self.x_upper_left:self.x_lower_right]
 
+        if isinstance(self.mask, np.ndarray):
+            self.mask = self.mask[self.y_upper_left:self.y_lower_right,
+                                  self.x_upper_left:self.x_lower_right]
+
     def apply_filter(self):
         """
         Apply the previously obtained steiner filter to the data.
         """
         self.data[self.steiner_mask] = 0
 
+    @instrument.timed('cappi.open')
     def open(self, file_name: str=''):
         """
         Open a single radar file given it's file_name.
@@ -109,13 +145,51 @@ class CAPPI(object):
             file_name = self._file_name
 
         with gzip.open(file_name) as data_file:
-            data_stream = data_file.read(self.data_size)
-            local_map = np.fromstring(data_stream, dtype=np.float32)
-            cappi_map = local_map.reshape(self.y_size, self.x_size)
+            self._load(data_file, file_name)
+
+        if instrument.recorder is not None:
+            instrument.count('cappi.open', files=1,
+                             bytes_inflated=self.data_size,
+                             bytes_read=os.path.getsize(file_name))
+
+    @instrument.timed('cappi.decode')
+    def decode(self, compressed: bytes, file_name: str = ''):
+        """
+        Same as ``open``, for the bytes of a radar file already read from disk.
+
+        :param compressed: the content of a radar file
+        :param file_name: The filename for a radar file, for error messages
+        """
+
+        with gzip.GzipFile(fileobj=io.BytesIO(compressed)) as data_file:
+            self._load(data_file, file_name or self._file_name)
+
+    def _load(self, data_file, file_name: str):
+        """
+        Inflates a gzip file object and sets ``data``, ``mask`` and
+         ``mask_value``.
+
+        :param data_file: an opened gzip file object
+        :param file_name: The filename for a radar file, for error messages
+        """
+
+        # The file is inflated straight into the stream buffer, which the
+        # matrix is a view of, so no intermediate copy is made.
+
+        stream = self._buffer('open.stream', (self.data_size,), np.uint8)
+        view = memoryview(stream)
+        size = 0
+        while size < self.data_size:
+            read = data_file.readinto(view[size:])
+            if not read:
+                break
+            size += read
 
-            # TODO Explicit delete - must profile do select the best option
-            del data_stream
-            del local_map
+        if size < self.data_size:
+            raise IOError("%s is truncated: %d of %d bytes" %
+                          (file_name, size, self.data_size))
+
+        cappi_map = stream.view(np.float32).reshape(self.y_size, self.x_size)
 
         # Bin data files contain a marked value, which must not be used for
         # processing data. A simple way to avoid using it is to set it to an
@@ -123,18 +197,55 @@ class CAPPI(object):
 
         self.mask_value = cappi_map[2, 2]
         self.data = cappi_map[::self.city.y_direction, ::self.city.x_direction]
-        self.data[np.isnan(self.data)] = self.mask_value
-        self.data[self.data < -15.0] = self.mask_value
-        self.mask = self.data == self.mask_value  # This is a masked numpy array
 
-    def open_steiner(self, file_name: str=''):
+        invalid = self._buffer('open.invalid', self.data.shape, np.bool_)
+        np.isnan(self.data, out=invalid)
+        self.data[invalid] = self.mask_value
+        np.less(self.data, -15.0, out=invalid)
+        self.data[invalid] = self.mask_value
+
+        # This is a masked numpy array
+        self.mask = np.equal(self.data, self.mask_value,
+                             out=self._buffer('open.mask', self.data.shape,
+                                              np.bool_))
+
+    def steiner_file_name(self, label: str = None) -> str:
+        """
+        Returns the Steiner file matching the current radar file, replacing
+         the directory ``Radar`` with ``Steiner``. Masks from a parameter
+         sweep are labelled, and saved side by side with the default one.
+
+        :param label: the parameter set label, if any
+        :return: str
+        """
+        extension = "npy.gz"
+        if label is not None:
+            if not label or set(label) & {'_', '.', os.sep}:
+                raise ValueError("Invalid Steiner label %r" % label)
+            extension = "%s.npy.gz" % label
+
+        file_name = self._file_name.replace("Radar", "Steiner")
+        return file_name.replace("raw.gz", extension)
+
+    def open_steiner(self, file_name: str='', label: str = None):
         if file_name == '':
-            file_name = self._file_name.replace("Radar", "Steiner")
-            file_name = file_name.replace("raw.gz", "npy.gz")
+            file_name = self.steiner_file_name(label)
 
         self.steiner_mask = np.loadtxt(file_name).astype("bool")
 
-    def steiner_filter(self):
+    def load_steiner(self):
+        """
+        Opens the Steiner file of the current radar file when it exists, or
+         applies the Steiner filter over the city box otherwise.
+        """
+        file_name = self.steiner_file_name()
+        if os.path.exists(file_name):
+            self.open_steiner(file_name)
+        else:
+            self.steiner_filter(self.regions([self]))
+
+    @instrument.timed('cappi.steiner_filter')
+    def steiner_filter(self, regions: list = None):
         """
         Steiner Filter is based on the Steiner Method Steiner et al. (1995) for
          filtering convective rainfall from a radar image.
@@ -151,9 +262,41 @@ class CAPPI(object):
         (a) is the threshold
         (b) is given by the static method convective_radius, in this class
 
+        When ``regions`` is given, only those parts of the grid are filtered,
+         and everything else is masked. Regions built by ``regions`` give the
+         same result as the whole grid inside the city boxes.
+
+        :param regions: a list of (rows, columns) slices, as given by
+         ``regions``
+        """
+
+        if regions is None:
+            self.steiner_mask = self._steiner(self.data, self.mask)
+            return
+
+        steiner_mask = self._buffer('steiner.regions', self.data.shape,
+                                    np.bool_)
+        steiner_mask.fill(True)
+        for region in regions:
+            steiner_mask[region] = self._steiner(self.data[region],
+                                                 self.mask[region])
+        self.steiner_mask = steiner_mask
+
+    def _steiner(self, data: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        Applies the Steiner method to a matrix, see ``steiner_filter``.
+
+        :param data: dBZ matrix, which is left untouched
+        :param mask: the invalid pixels of data
+        :return: the Steiner mask, ``True`` where pixels are not convective
         """
+        backend = self._backend()
+        parameters = SteinerParameters()
 
-        data = np.copy(self.data)
+        shape = data.shape
+        copy = self._buffer('steiner.data', shape, data.dtype)
+        np.copyto(copy, data)
+        data = copy
 
         # On a numpy mask, ``True`` means masked, while ``False`` means unmasked
         # thus all masks should be ``True`` where pixels should be removed.
@@ -161,128 +304,224 @@ class CAPPI(object):
         # 1. Intensity
         # This rule may be removed eventually after fixing 2. Peak
 
-        rule_intensity = data < 40.0  # type: np.ndarray
+        with instrument.stage('steiner.intensity'):
+            rule_intensity = np.less(data, parameters.intensity,
+                                     out=self._buffer('steiner.intensity',
+                                                      shape, np.bool_))
 
         # 2. Peak
-        # TODO improve performance here
-        rule_peak = np.ones(rule_intensity.shape, dtype=rule_intensity.dtype)
-        generic_filter(data, self._above_background, output=rule_peak, size=23)
 
-        self.steiner_mask = np.logical_and(rule_peak, rule_intensity)
-        data[self.steiner_mask] = self.mask_value
+        with instrument.stage('steiner.peak'):
+            background = backend.background(
+                data, self.mask_value,
+                output=self._buffer('steiner.background', shape, np.float64))
+            rule_peak = backend.peak(
+                data, background, self.mask_value, parameters,
+                output=self._buffer('steiner.peak', shape, np.bool_))
+
+        steiner_mask = np.logical_and(rule_peak, rule_intensity,
+                                      out=self._buffer('steiner.mask', shape,
+                                                       np.bool_))
+        data[steiner_mask] = self.mask_value
 
         # 3. Neighbor
         # Probably shouldn't need to make a logical and with the mask, as it
         # should be at least equal to it.
 
-        rule_neighbor = -self._surrounding_area(data)
-        self.steiner_mask = np.logical_and(self.steiner_mask, rule_neighbor)
-        self.steiner_mask = np.logical_or(self.steiner_mask, self.mask)
+        with instrument.stage('steiner.neighbor'):
+            rule_neighbor = backend.surrounding(
+                data, self.mask_value, parameters.radius_bins,
+                output=self._buffer('steiner.neighbor', shape, np.bool_))
+        np.logical_not(rule_neighbor, out=rule_neighbor)
+        np.logical_and(steiner_mask, rule_neighbor, out=steiner_mask)
+        return np.logical_or(steiner_mask, mask, out=steiner_mask)
+
+    @instrument.timed('cappi.steiner_sweep')
+    def steiner_sweep(self, parameters: dict, regions: list = None) \
+            -> collections.OrderedDict:
+        """
+        Applies the Steiner method once for each set of parameters. The
+         background mean, the expensive part, is computed only once and shared
+         by every set.
+
+        The masks are kept in ``steiner_masks``, labelled as in parameters.
+
+        :param parameters: a dict of label: SteinerParameters
+        :param regions: a list of (rows, columns) slices, see
+         ``steiner_filter``
+        :return: an OrderedDict of label: Steiner mask
+        """
+        if regions is None:
+            regions = [(slice(None), slice(None))]
+
+        output = collections.OrderedDict()
+        for label in parameters:
+            output[label] = np.ones(self.data.shape, dtype=np.bool_)
 
+        for region in regions:
+            data = self.data[region]
+            background = self._background(data)
+            for label, parameter in parameters.items():
+                output[label][region] = self._steiner_mask(
+                    data, self.mask[region], background, parameter)
 
-        # return np.ma.array(self.data, mask=self.steiner_mask)
+        self.steiner_masks = output
+        return output
 
-    def _above_background(self, data: np.ndarray) -> bool:
+    def _background(self, data: np.ndarray) -> np.ndarray:
         """
-        A filter function to be used with scipy.ndimage.filters.generic_filter
-         in order to find the mean background intensity for the entire matrix.
+        Finds the mean background intensity (11 km radius circle) around every
+         point, ignoring masked pixels and the point itself.
 
-        Returns a boolean np.ndarray with True being the values to filter out.
+        :param data: dBZ matrix
+        :return: np.ndarray of float64
+        """
+        return self._backend().background(
+            data, self.mask_value,
+            output=self._buffer('sweep.background', data.shape, np.float64))
 
-        :param data:
-        :return:
+    def _steiner_mask(self, data: np.ndarray, mask: np.ndarray,
+                      background: np.ndarray,
+                      parameters: SteinerParameters) -> np.ndarray:
+        """
+        Applies the three rules of the Steiner method given the background
+         mean, see ``steiner_filter``.
+
+        :param data: dBZ matrix
+        :param mask: the invalid pixels of data
+        :param background: the background mean of data
+        :param parameters: a SteinerParameters
+        :return: the Steiner mask, ``True`` where pixels are not convective
         """
+        backend = self._backend()
+        point = data.astype(np.float64)
 
-        # This function will be called about half a million times per image, and
-        # should be optimized as much as possible
+        # 1. Intensity
 
-        point = data[len(data) // 2]
-        if point == self.mask_value:
-            return True
+        rule_intensity = point < parameters.intensity
 
-        data[len(data) // 2] = self.mask_value
-        data = data[circles.background_line]
-        data = data[data != self.mask_value]
+        # 2. Peak
 
-        data = data.mean() if data.size else 0
-        return False if point - self._threshold(point) > data else True
+        rule_peak = backend.peak(data, background, self.mask_value,
+                                 parameters)
 
-    def _surrounding_area(self, data: np.ndarray) -> np.ndarray:
-        """
-        This is a semi-optimized class for finding the surrounding area for a
-         given intensity pixel.
-        :param data:
-        """
+        steiner_mask = np.logical_and(rule_peak, rule_intensity)
+        point[steiner_mask] = self.mask_value
 
-        output = np.zeros(data.shape, dtype=np.bool)
+        # 3. Neighbor
 
-        line_max, column_max = data.shape
-        line_min = 5
-        column_min = 5
-        line_max -= 5
-        column_max -= 5
-        for (line, column), value in np.ndenumerate(data):
+        rule_neighbor = ~backend.surrounding(point, self.mask_value,
+                                             parameters.radius_bins)
+        steiner_mask = np.logical_and(steiner_mask, rule_neighbor)
+        return np.logical_or(steiner_mask, mask)
 
-            if value == self.mask_value:
-                continue
-            if line_min >= line or line >= line_max:
-                continue
-            if column_min >= column or column >= column_max:
-                continue
+    def _backend(self) -> backends.Backend:
+        """
+        The Steiner backend named by ``backend``, selected once for this
+         object and again only when ``backend`` changes.
 
-            radius = self._convective_radius(value)
-            output[line - radius:line + radius+1, column - radius:column + radius+1] +=\
-                circles.convective_radius[radius]
+        :return: backends.Backend
+        """
+        if self._selected is None or self._selected[0] != self.backend:
+            self._selected = (self.backend, backends.select(self.backend))
+        return self._selected[1]
 
-        return output
+    def __getstate__(self) -> dict:
+        # Compiled backends cannot be pickled, the selection is made again
+        state = self.__dict__.copy()
+        state.pop('_selected', None)
+        return state
 
-    @staticmethod
-    def _convective_radius(reflectivity):
+    def _buffer(self, name: str, shape: tuple, dtype) -> np.ndarray:
         """
-        Calculates the Convective Radius of a given convective, i.e. the radius
-         in which all points should be considered convective.
+        Returns an uninitialized array, taken from ``workspace`` when there is
+         one, so it is reused by the next file.
 
-        As per Steiner et al. (1995), Figure 6 (b)
-        :param reflectivity: mean reflectivity over a 11 km radius in dBZ
+        :param name: the buffer name
+        :param shape: the array shape
+        :param dtype: the array dtype
+        :return: np.ndarray
         """
+        if self.workspace is None:
+            return np.empty(shape, dtype=dtype)
+        return self.workspace.get(name, shape, dtype)
 
-        # Tested against a simpler equation ( x//5 - 3) this resulting  formula
-        # had almost twice the performance. This is a function that  will be
-        # called several times, so performance enhancements are welcome.
+    def region(self) -> tuple:
+        """
+        The city box grown by ``halo`` pixels on each side, clipped to the
+         native grid.
 
-        if reflectivity < 25:
-            return 1
-        elif reflectivity < 30:
-            return 2
-        elif reflectivity < 35:
-            return 3
-        elif reflectivity < 40:
-            return 4
-        else:
-            return 5
+        :return: (rows, columns) slices
+        """
+        return (slice(max(self.y_upper_left - self.halo, 0),
+                      min(self.y_lower_right + self.halo, self.y_size)),
+                slice(max(self.x_upper_left - self.halo, 0),
+                      min(self.x_lower_right + self.halo, self.x_size)))
 
     @staticmethod
-    def _threshold(background_reflectivity: np.float) -> np.float:
+    def regions(radars: list) -> list:
         """
-        Calculates the threshold a certain Z must to be above the background
-         reflectivity in order to be considered a Convective Point.
+        Merges the regions of several CAPPI objects sharing the same native
+         grid, so overlapping halos are filtered only once.
 
-        As per Steiner et al. (1995), Equation 2
-        :param background_reflectivity:
+        :param radars: a list of CAPPI objects
+        :return: a list of (rows, columns) slices
         """
+        boxes = [(r.start, r.stop, c.start, c.stop) for r, c in
+                 (radar.region() for radar in radars)]
+
+        merged = True
+        while merged:
+            merged = False
+            for i, j in itertools.combinations(range(len(boxes)), 2):
+                first, second = boxes[i], boxes[j]
+                if first[0] < second[1] and second[0] < first[1] and \
+                        first[2] < second[3] and second[2] < first[3]:
+                    boxes[i] = (min(first[0], second[0]),
+                                max(first[1], second[1]),
+                                min(first[2], second[2]),
+                                max(first[3], second[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+
+        return [(slice(top, bottom), slice(left, right))
+                for top, bottom, left, right in sorted(boxes)]
+
+    def crop(self, radar: 'CAPPI'):
+        """
+        Fills this object with its city box taken from another CAPPI object
+         that holds the same native grid, so a file is decoded and filtered
+         only once for every city sharing it. Arrays are copied, into the
+         ``workspace`` buffers when there is one, leaving the other object
+         untouched.
 
-        # This function will be called several times (as many as there are
-        # points in a map), so it should be as optimal as possible in order to
-        # avoid performance issues.
-        # If memory is no issue, maybe a full matrix should be generated here to
-        # make use of numpy optimizations.
-
-        if background_reflectivity < 0:
-            return 10
-        elif background_reflectivity < 42.43:
-            return 10 - (background_reflectivity ** 2) / 180.0
-        else:
-            return 0
+        :param radar: a CAPPI object after ``open`` and ``steiner_filter``
+        """
+        if radar.city.shape != self.city.shape:
+            raise ValueError("%s and %s do not share the same grid" %
+                             (radar.city.file_name, self.city.file_name))
+
+        self._file_name = radar.file_name
+        self.date = radar.date
+        self.mask_value = radar.mask_value
+
+        box = (slice(self.y_upper_left, self.y_lower_right),
+               slice(self.x_upper_left, self.x_lower_right))
+        self.data = self._copy('crop.data', radar.data[box])
+        self.mask = self._copy('crop.mask', radar.mask[box])
+        self.steiner_mask = None
+        if isinstance(radar.steiner_mask, np.ndarray):
+            self.steiner_mask = self._copy('crop.steiner_mask',
+                                           radar.steiner_mask[box])
+
+    def _copy(self, name: str, array: np.ndarray) -> np.ndarray:
+        """
+        Copies an array into the buffer ``name``, see ``_buffer``
+        """
+        output = self._buffer(name, array.shape, array.dtype)
+        np.copyto(output, array)
+        return output
 
     @staticmethod
     def _split(data: np.ndarray, lines: int, columns: int):
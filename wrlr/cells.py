@@ -0,0 +1,251 @@
+# coding: utf-8
+"""
+Labelling and tracking of the convective cells of consecutive scans.
+
+The convective pixels of the Steiner mask are split in 8-connected cells with
+ a single ``ndimage.label`` call, and every per-cell quantity is a
+ ``bincount`` over the labels. A cell continues the track of the cell of the
+ previous scan it overlaps the most; when several cells overlap the same
+ previous cell (a split), only the largest overlap continues the track.
+"""
+__docformat__ = 'restructuredtext en'
+
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage
+
+from .cappi import CAPPI
+from .earthnetworks import EarthNetworks
+from .handler import Handler
+from .workspace import Workspace
+
+_structure = np.ones((3, 3), dtype=bool)  # 8-connectivity
+
+
+def label(convective: np.ndarray, minimum: int = 1) -> tuple:
+    """
+    Labels the connected convective regions of a scan, dropping regions
+     smaller than ``minimum`` pixels.
+
+    :param convective: a boolean (side, side) array
+    :param minimum: the smallest area kept, in pixels
+    :return: (labels, count), labels being 0 outside any cell
+    """
+    labels, count = ndimage.label(convective, structure=_structure)
+    if minimum > 1 and count:
+        area = np.bincount(labels.ravel(), minlength=count + 1)
+        keep = area >= minimum
+        keep[0] = False
+        index = np.zeros(count + 1, dtype=labels.dtype)
+        index[keep] = np.arange(1, keep.sum() + 1)
+        labels = index[labels]
+        count = int(keep.sum())
+    return labels, count
+
+
+def match(previous: np.ndarray, current: np.ndarray, previous_count: int,
+          current_count: int) -> np.ndarray:
+    """
+    Matches the cells of two consecutive scans by overlap
+
+    :param previous: labels of the previous scan
+    :param current: labels of the current scan
+    :param previous_count: number of cells of the previous scan
+    :param current_count: number of cells of the current scan
+    :return: for each current cell (label - 1), the previous label it
+     continues, or 0 for a new cell
+    """
+    output = np.zeros(current_count, dtype=np.intp)
+    both = (previous > 0) & (current > 0)
+    if not both.any():
+        return output
+
+    pairs = np.bincount(previous[both].astype(np.intp) * (current_count + 1) +
+                        current[both],
+                        minlength=(previous_count + 1) * (current_count + 1))
+    overlap = pairs.reshape(previous_count + 1, current_count + 1)[1:, 1:]
+
+    # Best previous cell of every current cell, then only the best current
+    # cell of every previous cell keeps it.
+
+    best = overlap.argmax(axis=0)
+    size = overlap[best, np.arange(current_count)]
+    ranked = np.lexsort((np.arange(current_count), -size))
+    taken = np.zeros(previous_count, dtype=bool)
+    for cell in ranked:
+        if size[cell] and not taken[best[cell]]:
+            taken[best[cell]] = True
+            output[cell] = best[cell] + 1
+    return output
+
+
+class CellTracker(object):
+    """
+    Tracks convective cells over consecutive scans of a city box and keeps a
+     record for every cell of every scan:
+    * date: the date of the scan;
+    * track: an id shared by the same cell across scans;
+    * area: the area in pixels;
+    * max_dbz: the highest reflectivity;
+    * row, column: the centroid in box pixels;
+    * latitude, longitude: the centroid;
+    * first: the date the track was first seen;
+    * lifetime: the time since the track was first seen;
+    * flashes: the lightning strokes inside the cell during the scan, when a
+      lightning object is given.
+
+    :param city: city code for a radar
+    :param minimum: the smallest area kept, in pixels
+    :param lightning: an EarthNetworks object with its data opened
+    :param scan_interval: the time each scan represents
+    """
+
+    columns = ('date', 'track', 'area', 'max_dbz', 'row', 'column',
+               'latitude', 'longitude', 'first', 'lifetime', 'flashes')
+
+    def __init__(self, city: str, minimum: int = 4,
+                 lightning: EarthNetworks = None, scan_interval: str = "450s"):
+        self.city = city
+        self.minimum = minimum
+        self.lightning = lightning
+        self.scan_interval = pd.to_timedelta(scan_interval)
+
+        self.labels = None  # type: np.ndarray
+        self.count = 0
+        self.tracks = np.zeros(0, dtype=np.int64)  # track of each label
+        self.first = {}  # track: first date
+        self.next_track = 1
+        self.records = []
+
+    def _flashes(self, labels: np.ndarray, count: int, date) -> np.ndarray:
+        output = np.zeros(count + 1, dtype=np.int64)
+        if self.lightning is None or self.lightning.data is None:
+            return output[1:]
+
+        data = self.lightning.data
+        data = data[(data.datahora >= date) &
+                    (data.datahora < date + self.scan_interval)]
+        rows, columns = self.lightning.to_pixels(data.latitude,
+                                                 data.longitude)
+        inside = rows >= 0
+        cell = labels[rows[inside], columns[inside]]
+        output += np.bincount(cell, weights=data.multiplicidade.values[inside],
+                              minlength=count + 1).astype(np.int64)
+        return output[1:]
+
+    def update(self, radar: CAPPI) -> np.ndarray:
+        """
+        Labels the cells of a scan and continues the tracks. The radar must
+         hold the dBZ values, mask and Steiner mask of the city box, i.e. after
+         ``open``, ``load_steiner`` and ``remove_borders``; it is left
+         untouched.
+
+        :param radar: a CAPPI object
+        :return: the labels of the scan
+        """
+        convective = ~radar.mask & ~radar.steiner_mask
+        labels, count = label(convective, self.minimum)
+        flat = labels.ravel()
+
+        if self.labels is None:
+            parents = np.zeros(count, dtype=np.intp)
+        else:
+            parents = match(self.labels, labels, self.count, count)
+
+        tracks = np.zeros(count, dtype=np.int64)
+        continued = parents > 0
+        tracks[continued] = self.tracks[parents[continued] - 1]
+        new = np.flatnonzero(~continued)
+        tracks[new] = self.next_track + np.arange(len(new))
+        self.next_track += len(new)
+
+        date = radar.date
+        for track in tracks[new]:
+            self.first[int(track)] = date
+        alive = set(tracks.tolist())
+        self.first = {track: first for track, first in self.first.items()
+                      if track in alive}
+
+        if count:
+            rows, columns = np.indices(labels.shape)
+            area = np.bincount(flat, minlength=count + 1)[1:]
+            row = np.bincount(flat, weights=rows.ravel(),
+                              minlength=count + 1)[1:] / area
+            column = np.bincount(flat, weights=columns.ravel(),
+                                 minlength=count + 1)[1:] / area
+
+            max_dbz = np.full(count + 1, -np.inf)
+            np.maximum.at(max_dbz, flat, radar.data.ravel())
+
+            city = radar.city
+            side = labels.shape[0]
+            first = np.array([self.first[int(t)] for t in tracks],
+                             dtype='datetime64[ns]')
+            self.records.append(pd.DataFrame({
+                'date': pd.Timestamp(date), 'track': tracks, 'area': area,
+                'max_dbz': max_dbz[1:], 'row': row, 'column': column,
+                'latitude': city.lat_min + (row + 0.5) *
+                (city.lat_max - city.lat_min) / side,
+                'longitude': city.lon_min + (column + 0.5) *
+                (city.lon_max - city.lon_min) / side,
+                'first': first,
+                'lifetime': np.datetime64(pd.Timestamp(date)) - first,
+                'flashes': self._flashes(labels, count, date)},
+                columns=self.columns))
+
+        self.labels, self.count, self.tracks = labels, count, tracks
+        return labels
+
+    def table(self) -> pd.DataFrame:
+        """
+        All records so far
+
+        :return: pd.DataFrame
+        """
+        if not self.records:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(self.records, ignore_index=True)
+
+
+class CellHandler(Handler):
+    """
+    The CellHandler class tracks the convective cells of every radar file of a
+     path, in chronological order.
+
+    :param city: city code for a radar
+    :param path: file path for the radar files
+    :param minimum: the smallest area kept, in pixels
+    """
+
+    def __init__(self, city: str, path: str, minimum: int = 4):
+        super().__init__(path)
+        self.radar = CAPPI(city)
+        self.radar.workspace = Workspace()
+        self.lightning = EarthNetworks(city)
+        self.tracker = CellTracker(city, minimum, self.lightning)
+
+    def process(self) -> pd.DataFrame:
+        """
+        Tracks the cells of every file. Lightning strokes are joined to the
+         cells when the lightning file was opened by ``self.lightning.open``.
+
+        :return: the table of ``CellTracker``
+        """
+        if self.dates is None:
+            self.perform()
+
+        final = len(self.files)
+        for present, index in enumerate(np.argsort(self.dates, kind='stable')):
+            self.radar.file_name = self.files[index]
+            self.radar.open()
+            self.radar.load_steiner()
+            self.radar.remove_borders()
+            self.tracker.update(self.radar)
+
+            percentage = ((present + 1) * 100) // final
+            sys.stdout.write("\r%d%% - %s" % (percentage, self.files[index]))
+            sys.stdout.flush()
+
+        return self.tracker.table()
@@ -1,133 +1,155 @@
 # coding: utf-8
 """
 This is a file containing several 1 and 2-dimension filters
+
+The filters are built the first time one of them is used, as in
+ ``circles.background_line``, so importing the module costs nothing.
 """
 __docformat__ = 'restructuredtext en'
+import functools
+
 import numpy as np
 
-background_radius = np.array(
-    [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-     [0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
-     [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
-     [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
-     [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
-     [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-     [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-     [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-     [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-     [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
-     [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
-     [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
-     [0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
-     [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
-    dtype=np.bool)
 
-background_line = background_radius.reshape(-1)
-# The disk dictionary contains 5 pre-set influence disks
+@functools.lru_cache(maxsize=None)
+def _filters() -> dict:
+    background_radius = np.array(
+        [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+         [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
+         [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+         [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+         [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+         [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+         [0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0],
+         [0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+         ], dtype=np.bool_)
+
+    background_line = background_radius.reshape(-1)
+    # The disk dictionary contains 5 pre-set influence disks
+
+    convective_radius = {5: np.array([[0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                      [0, 0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
+                                      [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0]],
+                                     dtype=np.bool_),
+                         4: np.array([[0, 0, 0, 0, 1, 0, 0, 0, 0],
+                                      [0, 0, 1, 1, 1, 1, 1, 0, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [1, 1, 1, 1, 1, 1, 1, 1, 1],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 1, 1, 0],
+                                      [0, 0, 1, 1, 1, 1, 1, 0, 0],
+                                      [0, 0, 0, 0, 1, 0, 0, 0, 0]],
+                                     dtype=np.bool_),
+                         3: np.array([[0, 0, 0, 1, 0, 0, 0],
+                                      [0, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 0],
+                                      [1, 1, 1, 1, 1, 1, 1],
+                                      [0, 1, 1, 1, 1, 1, 0],
+                                      [0, 1, 1, 1, 1, 1, 0],
+                                      [0, 0, 0, 1, 0, 0, 0]], dtype=np.bool_),
+                         2: np.array([[0, 0, 1, 0, 0],
+                                      [0, 1, 1, 1, 0],
+                                      [1, 1, 1, 1, 1],
+                                      [0, 1, 1, 1, 0],
+                                      [0, 0, 1, 0, 0]], dtype=np.bool_),
+                         1: np.array([[0, 1, 0],
+                                      [1, 1, 1],
+                                      [0, 1, 0]], dtype=np.bool_)}
+
+    convective_line = {5: np.array([[0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 1, 1, 1, 0, 1, 1, 1, 0, 0],
+                                    [0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0],
+                                    [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                                    [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                                    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+                                    [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                                    [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                                    [0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0],
+                                    [0, 0, 1, 1, 1, 0, 1, 1, 1, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0]],
+                                   dtype=np.bool_).reshape(-1),
+                       4: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
+                                    [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
+                                    [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
+                                    [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+                                    [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
+                                    [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
+                                    [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
+                                   dtype=np.bool_).reshape(-1),
+                       3: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
+                                    [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                                    [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
+                                    [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                                    [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
+                                   dtype=np.bool_).reshape(-1),
+                       2: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
+                                    [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
+                                    [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
+                                   dtype=np.bool_).reshape(-1),
+                       1: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
+                                   dtype=np.bool_).reshape(-1)}
+
+    return {'background_radius': background_radius,
+            'background_line': background_line,
+            'convective_radius': convective_radius,
+            'convective_line': convective_line}
 
-convective_radius = {5: np.array([[0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                  [0, 0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 0, 1, 1, 1, 1, 1, 1, 1, 0, 0],
-                                  [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0]],
-                                 dtype=np.bool),
-                     4: np.array([[0, 0, 0, 0, 1, 0, 0, 0, 0],
-                                  [0, 0, 1, 1, 1, 1, 1, 0, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [1, 1, 1, 1, 1, 1, 1, 1, 1],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 1, 1, 0],
-                                  [0, 0, 1, 1, 1, 1, 1, 0, 0],
-                                  [0, 0, 0, 0, 1, 0, 0, 0, 0]], dtype=np.bool),
-                     3: np.array([[0, 0, 0, 1, 0, 0, 0],
-                                  [0, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 0],
-                                  [1, 1, 1, 1, 1, 1, 1],
-                                  [0, 1, 1, 1, 1, 1, 0],
-                                  [0, 1, 1, 1, 1, 1, 0],
-                                  [0, 0, 0, 1, 0, 0, 0]], dtype=np.bool),
-                     2: np.array([[0, 0, 1, 0, 0],
-                                  [0, 1, 1, 1, 0],
-                                  [1, 1, 1, 1, 1],
-                                  [0, 1, 1, 1, 0],
-                                  [0, 0, 1, 0, 0]], dtype=np.bool),
-                     1: np.array([[0, 1, 0],
-                                  [1, 1, 1],
-                                  [0, 1, 0]], dtype=np.bool)}
 
-convective_line = {5: np.array([[0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 1, 1, 1, 0, 1, 1, 1, 0, 0],
-                                [0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0],
-                                [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-                                [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-                                [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-                                [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-                                [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-                                [0, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0],
-                                [0, 0, 1, 1, 1, 0, 1, 1, 1, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0]],
-                               dtype=np.bool).reshape(-1),
-                   4: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
-                                [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
-                                [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
-                                [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
-                                [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
-                                [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
-                                [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
-                               dtype=np.bool).reshape(-1),
-                   3: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
-                                [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
-                                [0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 0],
-                                [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
-                                [0, 0, 0, 1, 1, 0, 1, 1, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
-                               dtype=np.bool).reshape(-1),
-                   2: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
-                                [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0],
-                                [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
-                               dtype=np.bool).reshape(-1),
-                   1: np.array([[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]],
-                               dtype=np.bool).reshape(-1)}
\ No newline at end of file
+def __getattr__(name: str):
+    filters = _filters()
+    if name not in filters:
+        raise AttributeError("module %r has no attribute %r" %
+                             (__name__, name))
+    return filters[name]
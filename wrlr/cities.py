@@ -27,6 +27,30 @@ City = collections.namedtuple('City',
                                'folder',
                                'zr'))
 
+# The ZR relationships are plain functions rather than lambdas, so a City can
+# be pickled and sent to worker processes.
+
+
+def zr_bru(dbz):
+    """
+    Z = 32 R ** 1.65, used by BRU and PPR
+    """
+    return piecewise(dbz, [dbz < -15, dbz >= -15],
+                     [0, lambda z: power((10 ** (z / 10.0)) / 32.0,
+                                         1 / 1.65)])
+
+
+def zr_pi(dbz):
+    """
+    Z = 300 R ** 1.6 up to 36 dBZ and Z = 200 R ** 1.4 above, used by PI and
+     SR
+    """
+    return piecewise(dbz, [dbz < -15, (dbz >= -15) & (dbz <= 36.0),
+                           dbz > 36.0],
+                     [0, lambda z: power((10 ** (z / 10.0)) / 300.0, 1 / 1.6),
+                      lambda z: power((10 ** (z / 10.0)) / 200.0, 1 / 1.4)])
+
+
 # Bauru - SP
 
 cities = dict(BRU=City(file_name='BRU',
@@ -44,10 +68,7 @@ cities = dict(BRU=City(file_name='BRU',
                        date0="2014-01-01 00:07:00",
                        date1="2014-11-30 06:59:00",
                        folder="BR_PP",
-                       zr=lambda dbz: piecewise(dbz, [dbz < -15, dbz >= -15],
-                                                [0, lambda z: power(
-                                                    (10 ** (z / 10.0)) / 32.0,
-                                                    1 / 1.65)])),
+                       zr=zr_bru),
               PPR=City(file_name='PPR',
                        lat_min=-22.925,
                        lat_max=-21.425,
@@ -63,10 +84,7 @@ cities = dict(BRU=City(file_name='BRU',
                        date0="2014-01-01 00:07:00",
                        date1="2014-11-30 06:59:00",
                        folder="BR_PP",
-                       zr=lambda dbz: piecewise(dbz, [dbz < -15, dbz >= -15],
-                                                [0, lambda z: power(
-                                                    (10 ** (z / 10.0)) / 32.0,
-                                                    1 / 1.65)])),
+                       zr=zr_bru),
               PI=City(file_name='PI',
                       lat_min=-23.3510900,
                       lat_max=-20.2013000,
@@ -82,16 +100,7 @@ cities = dict(BRU=City(file_name='BRU',
                       date0="2014-01-01 00:01:00",
                       date1="2014-11-30 23:50:00",
                       folder="PC",
-                      zr=lambda dbz: piecewise(dbz, [dbz < -15,
-                                                     (dbz >= -15) &
-                                                     (dbz <= 36.0),
-                                                     (dbz > 36.0)],
-                                               [0, lambda z: power(
-                                                   (10 ** (z / 10.0)) / 300.0,
-                                                   1 / 1.6),
-                                                lambda z: power(
-                                                    (10 ** (z / 10.0)) / 200.0,
-                                                    1 / 1.4)])),
+                      zr=zr_pi),
               SR=City(file_name='SR',
                       lat_min=-24.4973900,
                       lat_max=-22.6971100,
@@ -107,13 +116,4 @@ cities = dict(BRU=City(file_name='BRU',
                       date0="2014-01-01 00:11:00",
                       date1="2014-11-30 23:50:00",
                       folder="SR",
-                      zr=lambda dbz: piecewise(dbz, [dbz < -15,
-                                                     (dbz >= -15) &
-                                                     (dbz <= 36.0),
-                                                     (dbz > 36.0)],
-                                               [0, lambda z: power(
-                                                   (10 ** (z / 10.0)) / 300.0,
-                                                   1 / 1.6),
-                                                lambda z: power(
-                                                    (10 ** (z / 10.0)) / 200.0,
-                                                    1 / 1.4)])))
\ No newline at end of file
+                      zr=zr_pi))
\ No newline at end of file
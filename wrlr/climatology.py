@@ -0,0 +1,250 @@
+# coding: utf-8
+"""
+Out-of-core per-pixel statistics over the radar archive of a city.
+
+A Climatology holds fixed-size accumulators for the city box, updated scan by
+ scan, so a whole season is reduced in constant memory. Partial states built
+ from different files can be merged, which allows processing chunks of the
+ archive in parallel.
+"""
+__docformat__ = 'restructuredtext en'
+
+import concurrent.futures
+import os
+
+import numpy as np
+
+from .cappi import CAPPI
+from .handler import Handler
+from .workspace import Workspace
+
+
+class Climatology(object):
+    """
+    Per-pixel accumulators for the box of a city:
+    * scans: number of scans;
+    * valid: number of valid (unmasked) observations;
+    * rain: sum of the rain rate (mm/h), from the ZR lookup table of the
+      city;
+    * convective: number of convective observations, from the Steiner mask;
+    * exceedance: observations above each of the dBZ ``thresholds``;
+    * histogram: observations in each dBZ bin of ``edges``, giving
+      percentiles with the resolution of the bins.
+
+    :param city: city code for a radar
+    :param thresholds: dBZ thresholds for the exceedance counts
+    :param edges: dBZ bin edges for the percentiles
+    """
+
+    side = CAPPI.side
+
+    def __init__(self, city: str, thresholds: tuple = (20.0, 30.0, 40.0, 50.0),
+                 edges: np.ndarray = None):
+        self.city = city
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.edges = np.arange(-15.0, 75.5, 1.0) if edges is None \
+            else np.asarray(edges, dtype=np.float64)
+
+        shape = (self.side, self.side)
+        self.scans = 0
+        self.valid = np.zeros(shape, dtype=np.uint32)
+        self.rain = np.zeros(shape, dtype=np.float64)
+        self.convective = np.zeros(shape, dtype=np.uint32)
+        self.exceedance = np.zeros((len(self.thresholds),) + shape,
+                                   dtype=np.uint32)
+        self.histogram = np.zeros((len(self.edges) + 1,) + shape,
+                                  dtype=np.uint32)
+
+    def update(self, radar: CAPPI):
+        """
+        Adds a scan to the accumulators. The radar must hold the dBZ values,
+         mask and Steiner mask of the city box, i.e. after ``open``,
+         ``load_steiner`` and ``remove_borders``; it is left untouched.
+
+        :param radar: a CAPPI object
+        """
+        valid = ~radar.mask
+        dbz = np.where(valid, radar.data, -np.inf)
+
+        self.scans += 1
+        self.valid += valid
+        self.convective += valid & ~radar.steiner_mask
+        self.rain[valid] += radar.geometry.zr(radar.data[valid])
+
+        for index, threshold in enumerate(self.thresholds):
+            self.exceedance[index] += dbz > threshold
+
+        # Every pixel lands in a single bin, so the fancy indices are unique
+        # and a plain increment is enough.
+
+        pixels = np.flatnonzero(valid)
+        bins = np.searchsorted(self.edges, dbz.ravel()[pixels], side='right')
+        self.histogram.reshape(-1)[bins * valid.size + pixels] += 1
+
+    def merge(self, other: 'Climatology'):
+        """
+        Adds the accumulators of another Climatology of the same city and
+         parameters.
+
+        :param other: a Climatology
+        """
+        if other.city != self.city or \
+                not np.array_equal(other.thresholds, self.thresholds) or \
+                not np.array_equal(other.edges, self.edges):
+            raise ValueError("Only climatologies with the same city and "
+                             "parameters can be merged")
+
+        self.scans += other.scans
+        self.valid += other.valid
+        self.rain += other.rain
+        self.convective += other.convective
+        self.exceedance += other.exceedance
+        self.histogram += other.histogram
+
+    def mean_rain(self) -> np.ndarray:
+        """
+        Mean rain rate (mm/h) over the valid observations of each pixel
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.rain / self.valid
+
+    def convective_fraction(self) -> np.ndarray:
+        """
+        Fraction of the valid observations of each pixel that were convective
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.convective / self.valid
+
+    def exceedance_frequency(self) -> np.ndarray:
+        """
+        Fraction of the valid observations above each threshold, as a
+         (thresholds, side, side) array
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.exceedance / self.valid
+
+    def percentile(self, q: float) -> np.ndarray:
+        """
+        Approximate dBZ percentile of each pixel, given as the upper edge of
+         the bin holding it; NaN for pixels without observations.
+
+        :param q: percentile, between 0 and 100
+        :return: np.ndarray
+        """
+        cumulative = np.cumsum(self.histogram, axis=0)
+        target = np.ceil(self.valid * q / 100.0).clip(min=1)
+        index = (cumulative < target).sum(axis=0)
+
+        upper = np.append(self.edges, np.inf)
+        output = upper[index]
+        output[self.valid == 0] = np.nan
+        return output
+
+    def save(self, file_name: str):
+        """
+        Saves the accumulators as a compressed npz file
+        """
+        np.savez_compressed(file_name, city=self.city, scans=self.scans,
+                            thresholds=self.thresholds, edges=self.edges,
+                            valid=self.valid, rain=self.rain,
+                            convective=self.convective,
+                            exceedance=self.exceedance,
+                            histogram=self.histogram)
+
+    @classmethod
+    def load(cls, file_name: str) -> 'Climatology':
+        """
+        Loads accumulators saved by ``save``
+        """
+        with np.load(file_name) as data:
+            output = cls(str(data['city']), data['thresholds'], data['edges'])
+            output.scans = int(data['scans'])
+            for name in ('valid', 'rain', 'convective', 'exceedance',
+                         'histogram'):
+                setattr(output, name, data[name])
+        return output
+
+
+def _partial(city: str, files: list, thresholds: tuple,
+             edges: np.ndarray) -> Climatology:
+    """
+    Reduces a chunk of files, in a worker process
+
+    :return: the partial Climatology
+    """
+    output = Climatology(city, thresholds, edges)
+    radar = CAPPI(city)
+    radar.workspace = Workspace()
+    for file in files:
+        radar.file_name = file
+        radar.open()
+        radar.load_steiner()
+        radar.remove_borders()
+        output.update(radar)
+    return output
+
+
+class ClimatologyHandler(Handler):
+    """
+    The ClimatologyHandler class reduces all radar files of a path into a
+     Climatology, splitting them into contiguous chunks processed in
+     parallel and merged afterwards.
+
+    :param city: city code for a radar
+    :param path: file path for the radar files
+    :param thresholds: dBZ thresholds for the exceedance counts
+    :param edges: dBZ bin edges for the percentiles
+    """
+
+    climatology = None  # type: Climatology
+
+    def __init__(self, city: str, path: str,
+                 thresholds: tuple = (20.0, 30.0, 40.0, 50.0),
+                 edges: np.ndarray = None):
+        super().__init__(path)
+        self.city = city
+        self.thresholds = thresholds
+        self.edges = edges
+
+    def process(self, workers: int = None, chunk: int = 64) -> Climatology:
+        """
+        Builds the Climatology of every file in path.
+
+        :param workers: number of processes, one per core by default; 0 runs
+         everything in this process
+        :param chunk: number of files reduced by a worker at a time
+        :return: Climatology
+        """
+        if self.files is None:
+            self.list_files()
+
+        chunks = [self.files[i:i + chunk]
+                  for i in range(0, len(self.files), chunk)]
+        climatology = Climatology(self.city, self.thresholds, self.edges)
+
+        if workers == 0:
+            for files in chunks:
+                climatology.merge(_partial(self.city, files, self.thresholds,
+                                           climatology.edges))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                futures = [executor.submit(_partial, self.city, files,
+                                           self.thresholds, climatology.edges)
+                           for files in chunks]
+                for future in concurrent.futures.as_completed(futures):
+                    climatology.merge(future.result())
+
+        self.climatology = climatology
+        return climatology
+
+    def save(self, directory: str) -> str:
+        """
+        Saves the Climatology as ``climatology_<city>.npz`` in a directory
+
+        :return: the file name
+        """
+        os.makedirs(directory, exist_ok=True)
+        file_name = os.path.join(directory,
+                                 "climatology_%s.npz" % self.city)
+        self.climatology.save(file_name)
+        return file_name
@@ -5,7 +5,6 @@ This is a clustering class.
 __docformat__ = 'restructuredtext en'
 
 import pandas as pd
-from geopy.distance import distance
 
 
 class Cluster():
@@ -48,6 +47,8 @@ class Cluster():
         :param index:
         :return:
         """
+        from geopy.distance import distance
+
         lightning = self.data.loc[index]
         time_delta = lightning.datahora + pd.to_timedelta(
             "%imin" % self.delta_t)
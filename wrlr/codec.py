@@ -0,0 +1,236 @@
+# coding: utf-8
+"""
+A compact archive format for reflectivity and rain fields.
+
+Values are stored as 8 or 16 bit integers, ``code = round((value - offset) /
+ scale)``, and decoded as ``code * scale + offset``. The highest code is
+ reserved for no-data pixels (the ``mask_value`` of ``CAPPI.open`` and NaNs),
+ which decode back to the mask value. The quantization error is therefore:
+* at most ``scale / 2`` for values between ``offset`` and ``maximum``;
+* values outside that range are clipped to it.
+
+The codes are then compressed with zlib, or zstandard/lz4 when installed.
+
+======  =====  ======  =====================  ==============
+Codec   bits   scale   range                  error
+======  =====  ======  =====================  ==============
+DBZ8    8      0.5     -15 to 112 dBZ         0.25 dBZ
+DBZ16   16     0.01    -15 to 640.34 dBZ      0.005 dBZ
+RAIN16  16     0.01    0 to 655.34 mm/h       0.005 mm/h
+======  =====  ======  =====================  ==============
+
+8 bits at 0.5 dBZ match the precision of the radar, around 0.5 dBZ.
+"""
+__docformat__ = 'restructuredtext en'
+
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4
+except ImportError:
+    lz4 = None
+
+_magic = b'WRQ1'
+
+# magic, bits, compressor, shuffle, scale, offset, lines, columns, mask value
+
+_header = struct.Struct('<4sBBBxddIIf')
+
+_compressors = ('zlib', 'zstd', 'lz4')
+
+
+def available() -> tuple:
+    """
+    The compressors that can be used here
+    """
+    return tuple(name for name, module in (('zlib', zlib), ('zstd', zstandard),
+                                           ('lz4', lz4)) if module is not None)
+
+
+def _compress(name: str, data: bytes, level: int) -> bytes:
+    if name == 'zlib':
+        return zlib.compress(data, level)
+    if name == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if name == 'lz4' and lz4 is not None:
+        return lz4.compress(data, compression_level=level)
+    raise ValueError("Compressor %r is not available, use one of %s" %
+                     (name, ', '.join(available())))
+
+
+def _decompress(name: str, data: bytes) -> bytes:
+    if name == 'zlib':
+        return zlib.decompress(data)
+    if name == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if name == 'lz4' and lz4 is not None:
+        return lz4.decompress(data)
+    raise ValueError("Compressor %r is needed to decode this field" % name)
+
+
+class Codec(object):
+    """
+    Quantizes fields to ``bits`` integers and compresses them.
+
+    :param bits: 8 or 16
+    :param scale: the quantization step
+    :param offset: the value of code 0
+    :param compressor: 'zlib', 'zstd' or 'lz4'
+    :param level: the compression level
+    """
+
+    def __init__(self, bits: int = 8, scale: float = 0.5,
+                 offset: float = -15.0, compressor: str = 'zlib',
+                 level: int = 1):
+        if bits not in (8, 16):
+            raise ValueError("Only 8 and 16 bit codes are supported")
+        if compressor not in _compressors:
+            raise ValueError("Unknown compressor %r" % compressor)
+        self.bits = bits
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.compressor = compressor
+        self.level = level
+
+        self.dtype = np.dtype('<u1' if bits == 8 else '<u2')
+        self.reserved = np.iinfo(self.dtype).max  # The no-data code
+        self.maximum = self.offset + (self.reserved - 1) * self.scale
+
+    @property
+    def error(self) -> float:
+        """
+        The largest error for values between ``offset`` and ``maximum``
+        """
+        return self.scale / 2
+
+    def encode(self, data: np.ndarray, mask: np.ndarray = None,
+               mask_value: float = np.nan) -> bytes:
+        """
+        Encodes a 2D field
+
+        :param data: the field, NaNs being no-data
+        :param mask: pixels to store as no-data, such as ``CAPPI.mask``
+        :param mask_value: the value no-data pixels decode to
+        :return: the encoded bytes
+        """
+        data = np.asarray(data)
+        if data.ndim != 2:
+            raise ValueError("Only 2D fields can be encoded")
+
+        codes = np.subtract(data, self.offset, dtype=np.float64)
+        codes /= self.scale
+        np.rint(codes, out=codes)
+        np.clip(codes, 0, self.reserved - 1, out=codes)
+
+        invalid = np.isnan(data)
+        if mask is not None:
+            invalid |= mask
+        codes = codes.astype(self.dtype)
+        codes[invalid] = self.reserved
+
+        # Byte planes of 16 bit codes compress better than interleaved bytes
+
+        shuffle = self.bits == 16
+        payload = codes.view(np.uint8).reshape(-1, 2).T.tobytes() if shuffle \
+            else codes.tobytes()
+
+        header = _header.pack(_magic, self.bits,
+                              _compressors.index(self.compressor), shuffle,
+                              self.scale, self.offset, data.shape[0],
+                              data.shape[1], mask_value)
+        return header + _compress(self.compressor, payload, self.level)
+
+
+def info(encoded: bytes) -> dict:
+    """
+    Reads the header of an encoded field
+
+    :return: dict with bits, compressor, scale, offset, shape and mask_value
+    """
+    magic, bits, compressor, shuffle, scale, offset, lines, columns, \
+        mask_value = _header.unpack_from(encoded)
+    if magic != _magic:
+        raise ValueError("Not an encoded field")
+    return {'bits': bits, 'compressor': _compressors[compressor],
+            'shuffle': bool(shuffle), 'scale': scale, 'offset': offset,
+            'shape': (lines, columns), 'mask_value': mask_value}
+
+
+def decode(encoded: bytes, output: np.ndarray = None,
+           mask: np.ndarray = None) -> np.ndarray:
+    """
+    Decodes a field, into preallocated buffers when given
+
+    :param encoded: bytes from ``Codec.encode``
+    :param output: a float32 array with the shape of the field
+    :param mask: a boolean array with the shape of the field, set where
+     pixels are no-data
+    :return: the float32 field
+    """
+    header = info(encoded)
+    dtype = np.dtype('<u1' if header['bits'] == 8 else '<u2')
+    reserved = np.iinfo(dtype).max
+    shape = header['shape']
+
+    payload = _decompress(header['compressor'], encoded[_header.size:])
+    if header['shuffle']:
+        planes = np.frombuffer(payload, dtype=np.uint8).reshape(2, -1)
+        codes = np.empty(planes.shape[1], dtype=dtype)
+        codes.view(np.uint8).reshape(-1, 2).T[...] = planes
+    else:
+        codes = np.frombuffer(payload, dtype=dtype)
+    codes = codes.reshape(shape)
+
+    if output is None:
+        output = np.empty(shape, dtype=np.float32)
+    np.multiply(codes, header['scale'], out=output, casting='unsafe')
+    output += np.float32(header['offset'])
+
+    invalid = np.equal(codes, reserved, out=mask)
+    output[invalid] = header['mask_value']
+    return output
+
+
+def save(radar, file_name: str, codec: Codec = None):
+    """
+    Saves the field of a CAPPI object after ``open``
+
+    :param radar: a CAPPI object
+    :param file_name: the output file name
+    :param codec: the Codec, ``DBZ8`` by default
+    """
+    codec = DBZ8 if codec is None else codec
+    with open(file_name, 'wb') as output:
+        output.write(codec.encode(radar.data, radar.mask, radar.mask_value))
+
+
+def load(radar, file_name: str):
+    """
+    Fills ``data``, ``mask`` and ``mask_value`` of a CAPPI object from a file
+     written by ``save``, using the workspace buffers of the radar
+
+    :param radar: a CAPPI object
+    :param file_name: the encoded file name
+    """
+    with open(file_name, 'rb') as encoded:
+        encoded = encoded.read()
+    header = info(encoded)
+    shape = header['shape']
+    mask = radar._buffer('codec.mask', shape, np.bool_)
+    radar.mask_value = np.float32(header['mask_value'])
+    radar.data = decode(encoded, radar._buffer('codec.data', shape,
+                                               np.float32), mask)
+    radar.mask = mask
+
+
+DBZ8 = Codec(8, 0.5, -15.0)
+DBZ16 = Codec(16, 0.01, -15.0)
+RAIN16 = Codec(16, 0.01, 0.0)
@@ -0,0 +1,129 @@
+# coding: utf-8
+"""
+The radar values under every lightning event: the scan nearest in time, the
+ box pixel holding the event, and the reflectivity, rain rate and Steiner
+ class of that pixel.
+"""
+__docformat__ = 'restructuredtext en'
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .cappi import CAPPI
+from .earthnetworks import EarthNetworks
+from .handler import Handler
+from .workspace import Workspace
+
+
+def nearest(dates: np.ndarray, times: np.ndarray, tolerance=None) \
+        -> np.ndarray:
+    """
+    Finds the nearest date of every time with a binary search
+
+    :param dates: sorted datetime64 array
+    :param times: datetime64 array
+    :param tolerance: the largest distance accepted, as a timedelta
+    :return: the index of the nearest date, -1 when farther than tolerance
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    times = np.asarray(times, dtype='datetime64[ns]')
+    if not len(dates):
+        return np.full(len(times), -1, dtype=np.intp)
+
+    right = np.searchsorted(dates, times).clip(max=len(dates) - 1)
+    left = (right - 1).clip(min=0)
+    closer = np.abs(times - dates[left]) <= np.abs(dates[right] - times)
+    output = np.where(closer, left, right)
+
+    if tolerance is not None:
+        far = np.abs(times - dates[output]) > pd.to_timedelta(tolerance)
+        output[far] = -1
+    return output
+
+
+class CoincidenceHandler(Handler):
+    """
+    The CoincidenceHandler class joins every lightning event to the radar scan
+     nearest in time. Events are bucketed by scan, so each scan is opened once
+     and all of its events are gathered with a single indexing pass.
+
+    :param city: city code for a radar
+    :param path: file path for the radar files
+    """
+
+    table = None  # type: pd.DataFrame
+
+    def __init__(self, city: str, path: str):
+        super().__init__(path)
+        self.radar = CAPPI(city)
+        self.radar.workspace = Workspace()
+        self.lightning = EarthNetworks(city)
+
+    def process(self, tolerance: str = "225s") -> pd.DataFrame:
+        """
+        Creates a table with one row for every lightning event, in the order
+         of ``lightning.data``, with:
+        * scan: the radar file nearest in time, None when farther than
+          tolerance;
+        * row, column: the box pixel, -1 outside the box;
+        * dbz: the reflectivity, NaN for masked pixels or without a scan;
+        * rain: the rain rate in mm/h from the ZR lookup table of the city;
+        * convective: whether the pixel is convective in the Steiner mask.
+
+        The lightning file must have been opened by ``self.lightning.open``.
+
+        :param tolerance: the largest time between an event and its scan
+        :return: pd.DataFrame
+        """
+        if self.dates is None:
+            self.perform()
+
+        data = self.lightning.data
+        order = np.argsort(self.dates, kind='stable')
+        dates = np.array(self.dates, dtype='datetime64[ns]')[order]
+        scan = nearest(dates, data.datahora.values, tolerance)
+        scan = np.where(scan >= 0, order[scan.clip(min=0)], -1)
+        rows, columns = self.lightning.to_pixels(data.latitude,
+                                                 data.longitude)
+
+        dbz = np.full(len(data), np.nan)
+        rain = np.full(len(data), np.nan)
+        convective = np.zeros(len(data), dtype=bool)
+
+        # Events of the same scan are contiguous once sorted by scan
+
+        inside = (scan >= 0) & (rows >= 0)
+        events = np.flatnonzero(inside)
+        events = events[np.argsort(scan[events], kind='stable')]
+        scans, starts = np.unique(scan[events], return_index=True)
+        bounds = np.append(starts, len(events))
+
+        for present, (index, first, last) in enumerate(zip(scans, bounds[:-1],
+                                                           bounds[1:])):
+            self.radar.file_name = self.files[index]
+            self.radar.open()
+            self.radar.load_steiner()
+            self.radar.remove_borders()
+
+            selected = events[first:last]
+            pixel = (rows[selected], columns[selected])
+            valid = ~self.radar.mask[pixel]
+            values = self.radar.data[pixel].astype(np.float64)
+
+            dbz[selected[valid]] = values[valid]
+            rain[selected[valid]] = self.radar.geometry.zr(values[valid])
+            convective[selected] = valid & ~self.radar.steiner_mask[pixel]
+
+            percentage = ((present + 1) * 100) // len(scans)
+            sys.stdout.write("\r%d%% - %s" % (percentage,
+                                              self.files[index]))
+            sys.stdout.flush()
+
+        files = np.array(self.files + [None], dtype=object)
+        self.table = pd.DataFrame({'scan': files[scan], 'row': rows,
+                                   'column': columns, 'dbz': dbz,
+                                   'rain': rain, 'convective': convective},
+                                  index=data.index)
+        return self.table
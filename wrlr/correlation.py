@@ -0,0 +1,160 @@
+# coding: utf-8
+"""
+Lagged cross-correlation between the rain and lightning series of every slice.
+
+The series are the columns of a WRLRHandler table, one value per ``Handler``
+ window. Windows without radar files are missing from the table, so the
+ series are put back on a regular grid of window starts with NaN for the
+ missing windows. All slices are correlated at once with a single real FFT
+ of each series, zero padded so the correlation is linear instead of
+ circular, and NaNs are left out of the sums and of the overlap counts.
+
+A positive lag means lightning leads rain: the correlation at lag ``k`` pairs
+ the strokes of window ``t`` with the rain of window ``t + k``.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+from scipy.fft import irfft, next_fast_len, rfft
+
+
+def from_table(table: pd.DataFrame, step: str = None) -> tuple:
+    """
+    Reshapes a table from ``WRLRHandler.process``, for a single window count,
+     into time series over a regular grid of window starts.
+
+    :param table: the WRLR table
+    :param step: the time between two window starts, the smallest one of the
+     table by default
+    :return: (starts, rain, flashes), where rain and flashes are (windows,
+     slices) arrays, NaN for the windows missing from the table
+    """
+    rain = table.pivot(index='start', columns='slice', values='rain')
+    flashes = table.pivot(index='start', columns='slice', values='flashes')
+
+    starts = rain.index.values
+    if step is not None:
+        step = pd.Timedelta(step).to_timedelta64()
+    elif len(starts) > 1:
+        step = np.diff(starts).min()
+    if len(starts) > 1:
+        starts = np.arange(starts[0], starts[-1] + step, step)
+        rain = rain.reindex(starts)
+        flashes = flashes.reindex(starts)
+    return starts, rain.values.astype(np.float64), \
+        flashes.values.astype(np.float64)
+
+
+def _standardize(data: np.ndarray) -> np.ndarray:
+    data = np.asarray(data, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        data = data - np.nanmean(data, axis=0)
+        return data / np.nanstd(data, axis=0)
+
+
+def cross_correlation(rain: np.ndarray, flashes: np.ndarray,
+                      max_lag: int, min_lag: int = None) -> tuple:
+    """
+    Pearson correlation between flashes and lagged rain, for every slice and
+     lag in [min_lag, max_lag]. Each lag is normalized by the number of
+     overlapping windows where both series are known; constant series and
+     lags without any overlap give NaN.
+
+    :param rain: a (windows, slices) array, NaN where unknown
+    :param flashes: a (windows, slices) array, NaN where unknown
+    :param max_lag: the largest lag, in windows
+    :param min_lag: the smallest lag, ``-max_lag`` by default
+    :return: (lags, curves), with curves a (slices, lags) array
+    """
+    if min_lag is None:
+        min_lag = -max_lag
+    rain = np.asarray(rain, dtype=np.float64)
+    flashes = np.asarray(flashes, dtype=np.float64)
+    if rain.shape != flashes.shape:
+        raise ValueError("rain and flashes must have the same shape")
+
+    # Unknown windows count as zero once standardized, and are removed from
+    # the overlap by the same correlation of the masks
+    known_rain = ~np.isnan(rain)
+    known_flashes = ~np.isnan(flashes)
+    rain = np.where(known_rain, _standardize(rain), 0)
+    flashes = np.where(known_flashes, _standardize(flashes), 0)
+
+    length = rain.shape[0]
+    if not -length < min_lag <= max_lag < length:
+        raise ValueError("Lags must be within the length of the series")
+
+    size = next_fast_len(2 * length - 1, real=True)
+    spectrum = rfft(rain, size, axis=0) * np.conj(rfft(flashes, size, axis=0))
+    full = irfft(spectrum, size, axis=0)
+    spectrum = rfft(known_rain, size, axis=0) * \
+        np.conj(rfft(known_flashes, size, axis=0))
+    overlap = np.rint(irfft(spectrum, size, axis=0))
+
+    # Negative lags wrap around to the end of the padded correlation
+
+    lags = np.arange(min_lag, max_lag + 1)
+    overlap = overlap[lags % size]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        curves = np.where(overlap > 0, full[lags % size] / overlap, np.nan)
+    return lags, curves.T
+
+
+def best_lags(lags: np.ndarray, curves: np.ndarray) -> tuple:
+    """
+    Finds the lag of the highest correlation of every slice
+
+    :param lags: the lags from ``cross_correlation``
+    :param curves: the curves from ``cross_correlation``
+    :return: (lag, correlation) arrays, with lag 0 and correlation NaN for
+     slices without any finite correlation
+    """
+    finite = np.isfinite(curves)
+    index = np.where(finite, curves, -np.inf).argmax(axis=1)
+    found = finite.any(axis=1)
+
+    value = curves[np.arange(len(curves)), index]
+    return np.where(found, lags[index], 0), np.where(found, value, np.nan)
+
+
+def lag_table(table: pd.DataFrame, max_lag: int = 8,
+              min_lag: int = None) -> tuple:
+    """
+    Correlates every slice of a WRLR table. Tables with a ``windows`` column
+     are correlated for each window count.
+
+    :param table: the table from ``WRLRHandler.process``
+    :param max_lag: the largest lag, in windows
+    :param min_lag: the smallest lag, ``-max_lag`` by default
+    :return: (best, curves), where best is a pd.DataFrame with the best lag,
+     its delay and correlation of every slice, and curves a pd.DataFrame with
+     one column per lag
+    """
+    if 'windows' in table.columns:
+        groups = list(table.groupby('windows'))
+    else:
+        groups = [(None, table)]
+
+    best = []
+    curves = []
+    for windows, group in groups:
+        starts, rain, flashes = from_table(group)
+        lags, curve = cross_correlation(rain, flashes, max_lag, min_lag)
+        lag, value = best_lags(lags, curve)
+
+        step = pd.Timedelta(starts[1] - starts[0]) if len(starts) > 1 \
+            else pd.Timedelta(0)
+        output = pd.DataFrame({'slice': np.arange(len(lag)), 'lag': lag,
+                               'delay': lag * step, 'correlation': value})
+        curve = pd.DataFrame(curve, columns=lags)
+        if windows is not None:
+            output.insert(0, 'windows', windows)
+            curve.index = pd.MultiIndex.from_product(
+                [[windows], np.arange(len(curve))], names=['windows', 'slice'])
+        else:
+            curve.index.name = 'slice'
+        best.append(output)
+        curves.append(curve)
+
+    return pd.concat(best, ignore_index=True), pd.concat(curves)
@@ -0,0 +1,205 @@
+# coding: utf-8
+"""
+Smoothed lightning density maps.
+
+Stroke counts binned at the 200 x 200 box resolution are spiky, so they are
+ smoothed before being compared with rain. A whole (windows, side, side) stack
+ is convolved at once: the stack is transformed with a single real 2D FFT,
+ multiplied by the cached spectrum of each kernel and transformed back.
+
+The stack is zero padded, so the convolution is linear instead of circular,
+ and at the edges of the box either:
+* zero: strokes outside the box count as none, so density fades at the
+  edges;
+* normalize: the result is divided by the share of the kernel falling inside
+  the box, the mean density of the pixels that were observed.
+
+    maps = density.counts(lightning, starts, ends, 'CG')
+    smooth = density.smooth(maps, 'gaussian', radius=3)
+    several = density.smooth_radii(maps, (1, 2, 4), 'disk')
+"""
+__docformat__ = 'restructuredtext en'
+
+import functools
+
+import numpy as np
+from scipy.fft import irfft2, next_fast_len, rfft2
+
+from . import circles
+
+kinds = ('gaussian', 'disk')
+truncate = 3.0  # Gaussian kernels are cut at ``truncate`` standard deviations
+
+
+@functools.lru_cache(maxsize=None)
+def kernel(kind: str = 'gaussian', radius: float = 2.0) -> np.ndarray:
+    """
+    A normalized square kernel, of odd side:
+    * gaussian: standard deviation of ``radius`` pixels;
+    * disk: the convective disks of ``circles`` for radius 1 to 5, the
+      background circle with its center for radius 11, else the pixels
+      within ``radius``.
+
+    :param kind: 'gaussian' or 'disk'
+    :param radius: the kernel radius in pixels
+    :return: a read-only np.ndarray summing to 1
+    """
+    if kind == 'gaussian':
+        half = max(int(np.ceil(truncate * radius)), 1)
+        line = np.arange(-half, half + 1)
+        output = np.exp(-(line[:, None] ** 2 + line ** 2) /
+                        (2.0 * radius ** 2))
+    elif kind == 'disk':
+        if radius in circles.convective_radius:
+            output = circles.convective_radius[radius]
+        elif radius == circles.background_radius.shape[0] // 2:
+            # The background of the Steiner method leaves the pixel itself out
+            output = circles.background_radius.copy()
+            output[int(radius), int(radius)] = True
+        else:
+            half = int(np.floor(radius))
+            line = np.arange(-half, half + 1)
+            output = line[:, None] ** 2 + line ** 2 <= radius ** 2
+    else:
+        raise ValueError("Unknown kernel %r, use one of %s" %
+                         (kind, ', '.join(kinds)))
+
+    output = output.astype(np.float64)
+    output /= output.sum()
+    output.flags.writeable = False
+    return output
+
+
+def _padded(shape: tuple, size: int) -> tuple:
+    return tuple(next_fast_len(length + size - 1, real=True)
+                 for length in shape)
+
+
+@functools.lru_cache(maxsize=64)
+def spectrum(kind: str, radius: float, shape: tuple) -> np.ndarray:
+    """
+    The spectrum of a kernel for maps of a given shape, computed once
+
+    :param kind: 'gaussian' or 'disk'
+    :param radius: the kernel radius in pixels
+    :param shape: the (lines, columns) of the maps
+    :return: a read-only complex np.ndarray
+    """
+    weights = kernel(kind, radius)
+    output = rfft2(weights, s=_padded(shape, weights.shape[0]))
+    output.flags.writeable = False
+    return output
+
+
+@functools.lru_cache(maxsize=64)
+def coverage(kind: str, radius: float, shape: tuple) -> np.ndarray:
+    """
+    The share of the kernel falling inside maps of a given shape, for every
+     pixel, computed once
+
+    :return: a read-only np.ndarray
+    """
+    output = _convolve(rfft2(np.ones(shape), s=_padded(
+        shape, kernel(kind, radius).shape[0])), kind, radius, shape)
+    output.flags.writeable = False
+    return output
+
+
+def _convolve(transform: np.ndarray, kind: str, radius: float,
+              shape: tuple) -> np.ndarray:
+    size = kernel(kind, radius).shape[0]
+    padded = _padded(shape, size)
+    output = irfft2(transform * spectrum(kind, radius, shape), s=padded)
+
+    # The full convolution is shifted by half the kernel side
+
+    half = size // 2
+    return output[..., half:half + shape[0], half:half + shape[1]]
+
+
+def smooth_radii(stack: np.ndarray, radii, kind: str = 'gaussian',
+                 edges: str = 'normalize') -> np.ndarray:
+    """
+    Smooths a stack of maps with kernels of several radii, transforming the
+     stack only once
+
+    :param stack: a (lines, columns) map or a (windows, lines, columns) stack
+    :param radii: a sequence of kernel radii in pixels
+    :param kind: 'gaussian' or 'disk'
+    :param edges: 'normalize' or 'zero', see the module documentation
+    :return: a (radii, ...) array, each the shape of stack
+    """
+    if edges not in ('normalize', 'zero'):
+        raise ValueError("edges must be 'normalize' or 'zero'")
+    stack = np.asarray(stack, dtype=np.float64)
+    shape = stack.shape[-2:]
+    radii = tuple(radii)
+    sizes = {kernel(kind, radius).shape[0] for radius in radii}
+
+    # Kernels of the same side share the padded transform of the stack
+
+    transforms = {size: rfft2(stack, s=_padded(shape, size)) for size in sizes}
+
+    output = np.empty((len(radii),) + stack.shape)
+    for index, radius in enumerate(radii):
+        transform = transforms[kernel(kind, radius).shape[0]]
+        output[index] = _convolve(transform, kind, radius, shape)
+        if edges == 'normalize':
+            output[index] /= coverage(kind, radius, shape)
+
+    # Rounding of the transforms leaves tiny negative values where there are
+    # no strokes
+
+    np.maximum(output, 0, out=output)
+    return output
+
+
+def smooth(stack: np.ndarray, kind: str = 'gaussian', radius: float = 2.0,
+           edges: str = 'normalize') -> np.ndarray:
+    """
+    Smooths a stack of maps with a single kernel, see ``smooth_radii``
+
+    :return: an array the shape of stack
+    """
+    return smooth_radii(stack, (radius,), kind, edges)[0]
+
+
+def counts(lightning, starts: np.ndarray, ends: np.ndarray,
+           flash_type=('CG', 'IC')) -> np.ndarray:
+    """
+    Counts the lightning strokes (``multiplicidade``) of every pixel of the
+     box for each [start, end) window, the maps to be smoothed.
+
+    :param lightning: an EarthNetworks object after ``open``
+    :param starts: the starting time of every window
+    :param ends: the ending time of every window
+    :param flash_type: either 'CG', 'IC' or a tuple of both
+    :return: a (windows, side, side) array
+    """
+    if isinstance(flash_type, str):
+        flash_type = (flash_type,)
+    side = lightning.side
+
+    data = lightning.data
+    data = data[data.tipo.isin(flash_type)].sort_values('datahora',
+                                                        kind='stable')
+    rows, columns = lightning.to_pixels(data.latitude, data.longitude)
+    inside = rows >= 0
+    pixels = (rows * side + columns)[inside]
+    strokes = data.multiplicidade.values[inside].astype(np.float64)
+    times = data.datahora.values.astype('datetime64[ns]')[inside]
+
+    # Events are sorted by time, so each window is a contiguous range
+
+    first = np.searchsorted(times, np.asarray(starts, dtype='datetime64[ns]'))
+    last = np.searchsorted(times, np.asarray(ends, dtype='datetime64[ns]'))
+    length = np.maximum(last - first, 0)
+    window = np.repeat(np.arange(len(first)), length)
+    event = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length,
+                                                length) + \
+        np.repeat(first, length)
+
+    output = np.bincount(window * side ** 2 + pixels[event],
+                         weights=strokes[event],
+                         minlength=len(first) * side ** 2)
+    return output.reshape(len(first), side, side)
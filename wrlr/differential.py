@@ -0,0 +1,368 @@
+# coding: utf-8
+"""
+Differential tests of the fast engines against the reference implementations.
+
+The Steiner method (``CAPPI._steiner`` on the ``reference`` backend) and the
+ lightning rasterizer (``EarthNetworks.to_matrix``) are the references. Any
+ engine meant to replace them is run side by side on seeded random and
+ adversarial cases, and every pixel where they disagree is reported:
+
+    python -m wrlr.differential --seeds 5 --side 64
+
+Cases are synthetic: radar fields go through the same loader as the radar
+ files, so NaNs and values below -15 dBZ are masked as in production.
+"""
+__docformat__ = 'restructuredtext en'
+
+import argparse
+import collections
+import gzip
+import sys
+
+import numpy as np
+import pandas as pd
+
+from . import backends
+from .cappi import CAPPI, SteinerParameters
+from .earthnetworks import EarthNetworks
+from .workspace import Workspace
+
+mask_value = -99.0
+
+# A single test input, ``data`` being raw radar values or a lightning table
+
+Case = collections.namedtuple('Case', ['name', 'seed', 'data'])
+
+# A pixel-level comparison of an engine against the reference on a case
+
+Difference = collections.namedtuple('Difference', [
+    'kind', 'case', 'seed', 'engine', 'pixels', 'differing', 'max_difference',
+    'first'])
+
+
+def decode(raw: np.ndarray, city: str = 'BRU') -> CAPPI:
+    """
+    Loads a raw field as ``CAPPI.open`` loads a radar file, so NaNs, values
+     below -15 dBZ and the mask value are masked the same way.
+
+    :param raw: a float32 (lines, columns) field, with the mask value at [2, 2]
+    :param city: the city whose orientation is used
+    :return: a CAPPI object with data, mask and mask_value
+    """
+    radar = CAPPI(city)
+    radar.y_size, radar.x_size = raw.shape
+    radar.data_size = raw.size * 4
+    radar.decode(gzip.compress(raw.astype(np.float32).tobytes()), '<raw>')
+    radar.data = np.array(radar.data)  # Detached from the stream buffer
+    radar.mask = np.array(radar.mask)
+    return radar
+
+
+def radar_cases(seed: int, side: int = 64) -> list:
+    """
+    Random and adversarial raw fields:
+    * random: dBZ between -20 and 60, with mask value pixels;
+    * nan: NaNs and values below -15 dBZ scattered over the field;
+    * intensity_edge: pixels just below, at and above 40 dBZ;
+    * curve_edges: pixels at the threshold cutoff and convective radius bins;
+    * borders: convective pixels along the 5 pixel border and the corners;
+    * masked: a field almost entirely masked;
+    * plateau: a constant convective field.
+
+    :param seed: seed of the random generator
+    :param side: side of the square fields
+    :return: a list of Case
+    """
+    random = np.random.RandomState(seed)
+    parameters = SteinerParameters()
+    output = []
+
+    def field(low: float = -20.0, high: float = 40.0) -> np.ndarray:
+        return random.uniform(low, high, (side, side)).astype(np.float32)
+
+    def spots(data: np.ndarray, values, fraction: float = 0.05):
+        where = random.uniform(size=data.shape) < fraction
+        data[where] = random.choice(np.asarray(values, dtype=np.float32),
+                                    where.sum())
+        return data
+
+    data = spots(field(-20.0, 60.0), [mask_value], 0.1)
+    output.append(Case('random', seed, data))
+
+    data = spots(field(), [np.nan, -15.5, -15.0, -14.9], 0.1)
+    output.append(Case('nan', seed, data))
+
+    edge = np.float32(parameters.intensity)
+    data = spots(field(), [np.nextafter(edge, np.float32(0)), edge,
+                           np.nextafter(edge, np.float32(100))], 0.05)
+    output.append(Case('intensity_edge', seed, data))
+
+    data = spots(field(), [parameters.threshold_cutoff] +
+                 list(parameters.radius_bins), 0.05)
+    output.append(Case('curve_edges', seed, data))
+
+    data = field(-20.0, 20.0)
+    border = np.zeros((side, side), dtype=bool)
+    border[:7] = border[-7:] = border[:, :7] = border[:, -7:] = True
+    data[border & (random.uniform(size=data.shape) < 0.2)] = 50.0
+    data[0, 0] = data[0, -1] = data[-1, 0] = data[-1, -1] = 55.0
+    output.append(Case('borders', seed, data))
+
+    data = spots(field(-20.0, 60.0), [mask_value], 0.9)
+    output.append(Case('masked', seed, data))
+
+    output.append(Case('plateau', seed,
+                       np.full((side, side), 45.0, dtype=np.float32)))
+
+    for case in output:
+        case.data[2, 2] = mask_value  # Where CAPPI reads the mask value from
+    return output
+
+
+def lightning_cases(seed: int, city: str = 'BRU', events: int = 500) -> list:
+    """
+    Random and adversarial lightning tables, in the format of
+     ``EarthNetworks.open``, over 2014-01-01 00:00 to 01:00:
+    * random: events anywhere in the box;
+    * duplicates: several events in the same pixels;
+    * box_edges: events on the borders of the box;
+    * outside: events just and well beyond each edge of the box, among
+      events in it;
+    * time_edges: events exactly at the start and end of the window.
+
+    :param seed: seed of the random generator
+    :param city: city code for a radar
+    :param events: number of events of each table
+    :return: a list of Case
+    """
+    random = np.random.RandomState(seed)
+    box = EarthNetworks(city).city
+    start = pd.Timestamp("2014-01-01 00:00:00")
+
+    def table(latitude, longitude, seconds) -> pd.DataFrame:
+        count = len(latitude)
+        return pd.DataFrame({
+            'tipo': random.choice(['CG', 'IC'], count),
+            'datahora': start + pd.to_timedelta(seconds, unit='s'),
+            'latitude': latitude, 'longitude': longitude,
+            'pico_corrente': random.choice(['+', '-'], count),
+            'multiplicidade': random.randint(1, 6, count)})
+
+    def uniform(count: int) -> tuple:
+        return (random.uniform(box.lat_min, box.lat_max, count),
+                random.uniform(box.lon_min, box.lon_max, count))
+
+    output = [Case('random', seed, table(*uniform(events),
+                                         random.uniform(0, 3600, events)))]
+
+    latitude, longitude = uniform(events // 10)
+    output.append(Case('duplicates', seed,
+                       table(np.repeat(latitude, 10), np.repeat(longitude, 10),
+                             random.uniform(0, 3600, events))))
+
+    latitude, longitude = uniform(events)
+    edges = random.randint(0, 4, events)
+    latitude[edges == 0] = box.lat_min
+    latitude[edges == 1] = box.lat_max
+    longitude[edges == 2] = box.lon_min
+    longitude[edges == 3] = box.lon_max
+    output.append(Case('box_edges', seed,
+                       table(latitude, longitude,
+                             random.uniform(0, 3600, events))))
+
+    latitude, longitude = uniform(events)
+    edges = random.randint(0, 5, events)
+    beyond = random.choice([0.001, 0.1], events)
+    latitude[edges == 0] = box.lat_min - beyond[edges == 0]
+    latitude[edges == 1] = box.lat_max + beyond[edges == 1]
+    longitude[edges == 2] = box.lon_min - beyond[edges == 2]
+    longitude[edges == 3] = box.lon_max + beyond[edges == 3]
+    output.append(Case('outside', seed,
+                       table(latitude, longitude,
+                             random.uniform(0, 3600, events))))
+
+    output.append(Case('time_edges', seed,
+                       table(*uniform(events),
+                             random.choice([0.0, 1800.0, 3600.0], events))))
+    return output
+
+
+def steiner_reference(radar: CAPPI) -> np.ndarray:
+    """
+    The reference Steiner method, the per-pixel callbacks of the
+     ``reference`` backend
+    """
+    radar.backend = 'reference'
+    return radar._steiner(radar.data, radar.mask).copy()
+
+
+def steiner_backend(name: str):
+    """
+    The Steiner method on another backend
+    """
+    def engine(radar: CAPPI) -> np.ndarray:
+        radar.backend = name
+        return radar._steiner(radar.data, radar.mask).copy()
+    return engine
+
+
+def steiner_sweep(radar: CAPPI) -> np.ndarray:
+    """
+    The vectorized rules of ``steiner_sweep`` with the default parameters
+    """
+    radar.backend = 'reference'
+    return radar.steiner_sweep({'default': SteinerParameters()})['default']
+
+
+def steiner_workspace(radar: CAPPI) -> np.ndarray:
+    """
+    The reference method run twice on the same workspace, checking that
+     reused buffers do not leak between files
+    """
+    radar.backend = 'reference'
+    radar.workspace = Workspace()
+    radar._steiner(np.full_like(radar.data, 50.0), ~radar.mask)
+    return radar._steiner(radar.data, radar.mask).copy()
+
+
+def raster_reference(lightning: EarthNetworks, time0, time1,
+                     flash_type: str) -> np.ndarray:
+    """
+    The reference rasterizer, ``to_matrix``
+    """
+    lightning.to_matrix(time0, time1, flash_type)
+    return lightning.figure
+
+
+def raster_pixels(lightning: EarthNetworks, time0, time1,
+                  flash_type: str) -> np.ndarray:
+    """
+    The rasterizer of WRLRHandler: ``to_pixels`` and a bincount
+    """
+    data = lightning.data
+    data = data[(data.tipo == flash_type) & (data.datahora >= time0) &
+                (data.datahora <= time1)]
+    rows, columns = lightning.to_pixels(data.latitude, data.longitude)
+    inside = rows >= 0
+    side = lightning.side
+    return np.bincount(rows[inside] * side + columns[inside],
+                       weights=data.multiplicidade.values[inside],
+                       minlength=side * side).reshape(side, side)
+
+
+steiner_engines = collections.OrderedDict(
+    [('sweep', steiner_sweep), ('workspace', steiner_workspace)] +
+    [(name, steiner_backend(name)) for name in backends.available()
+     if name != 'reference'])
+raster_engines = collections.OrderedDict([('pixels', raster_pixels)])
+
+
+def compare(kind: str, case: Case, engine: str, reference: np.ndarray,
+            output: np.ndarray, first: int = 10) -> Difference:
+    """
+    Compares the output of an engine with the reference, pixel by pixel
+
+    :return: Difference
+    """
+    reference = np.asarray(reference)
+    output = np.asarray(output)
+    if reference.shape != output.shape:
+        raise ValueError("%s returned a %s array instead of %s" %
+                         (engine, output.shape, reference.shape))
+
+    if reference.dtype == np.bool_:
+        delta = reference != output
+        magnitude = delta.astype(np.float64)
+    else:
+        magnitude = np.abs(reference.astype(np.float64) - output)
+        delta = magnitude > 0
+    positions = np.argwhere(delta)[:first]
+    return Difference(kind, case.name, case.seed, engine, reference.size,
+                      int(delta.sum()),
+                      float(magnitude.max()) if magnitude.size else 0.0,
+                      [tuple(int(i) for i in position)
+                       for position in positions])
+
+
+def run_steiner(seeds=range(3), side: int = 64, engines: dict = None) -> list:
+    """
+    Runs every Steiner engine against the reference on the radar cases
+
+    :param seeds: seeds of the cases
+    :param side: side of the square fields
+    :param engines: a dict of name: function(CAPPI) -> Steiner mask
+    :return: a list of Difference
+    """
+    engines = steiner_engines if engines is None else engines
+    output = []
+    for seed in seeds:
+        for case in radar_cases(seed, side):
+            reference = steiner_reference(decode(case.data))
+            for name, engine in engines.items():
+                output.append(compare('steiner', case, name, reference,
+                                      engine(decode(case.data))))
+    return output
+
+
+def run_raster(seeds=range(3), city: str = 'BRU', engines: dict = None) \
+        -> list:
+    """
+    Runs every rasterizer against ``to_matrix`` on the lightning cases, for
+     both flash types
+
+    :param seeds: seeds of the cases
+    :param city: city code for a radar
+    :param engines: a dict of name: function(EarthNetworks, time0, time1,
+     flash_type) -> matrix
+    :return: a list of Difference
+    """
+    engines = raster_engines if engines is None else engines
+    time0 = pd.Timestamp("2014-01-01 00:00:00")
+    time1 = pd.Timestamp("2014-01-01 00:30:00")
+
+    output = []
+    for seed in seeds:
+        for case in lightning_cases(seed, city):
+            lightning = EarthNetworks(city)
+            for flash_type in ('CG', 'IC'):
+                lightning.data = case.data.copy()
+                reference = raster_reference(lightning, time0, time1,
+                                             flash_type)
+                for name, engine in engines.items():
+                    lightning.data = case.data.copy()
+                    output.append(compare(
+                        'raster', case._replace(name='%s/%s' % (case.name,
+                                                                flash_type)),
+                        name, reference,
+                        engine(lightning, time0, time1, flash_type)))
+    return output
+
+
+def report(differences: list) -> pd.DataFrame:
+    """
+    The differences as a table
+    """
+    return pd.DataFrame(differences, columns=Difference._fields)
+
+
+def main(arguments: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--side', type=int, default=64)
+    parser.add_argument('--city', default='BRU')
+    arguments = parser.parse_args(arguments)
+
+    seeds = range(arguments.seeds)
+    table = report(run_steiner(seeds, arguments.side) +
+                   run_raster(seeds, arguments.city))
+    with pd.option_context('display.width', 160,
+                           'display.max_colwidth', 40,
+                           'display.max_rows', None):
+        print(table.drop(columns='first'))
+    return 1 if table.differing.any() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,12 +5,15 @@ This file deals with Earth Networks lightning data format/
 
 __docformat__ = 'restructuredtext en'
 
+import os
 from collections import namedtuple
 
 import numpy as np
 import pandas as pd
 
-import cities
+from . import geometry
+from . import instrument
+from . import shared
 
 Delimiter = namedtuple("Delimiter", ['lat_max', 'lat_min', 'lon_max', 'lon_min', 'time_max', 'time_min'])
 
@@ -26,66 +29,46 @@ class EarthNetworks(object):
     slices = None
 
     def __init__(self, city: str):
-        self.city = cities.cities[city]
-
-        lat_line = np.linspace(start=self.city.lat_min,
-                               stop=self.city.lat_max,
-                               num=self.side)
-        lon_line = np.linspace(start=self.city.lon_min,
-                               stop=self.city.lon_max,
-                               num=self.side)
-
-        self.longitude, self.latitude = np.meshgrid(lon_line, lat_line,
-                                                    indexing='xy')
+        self.geometry = geometry.get(city)
+        self.city = self.geometry.city
+        self.latitude = self.geometry.latitude
+        self.longitude = self.geometry.longitude
 
         self.y_size, self.x_size = self.city.shape
-        self.y_upper_left, self.x_upper_left = self.city.box_ul
-        self.y_lower_right, self.x_lower_right = self.city.box_lr
+        rows, columns = self.geometry.box
+        self.y_upper_left, self.y_lower_right = rows.start, rows.stop
+        self.x_upper_left, self.x_lower_right = columns.start, columns.stop
         self.data_size = self.x_size * self.y_size * 4  # Binary size for float
 
-    def remap(self, latitude: float, longitude: float) -> list:
+    def remap(self, latitude: float, longitude: float) -> tuple:
         """
-        Remap a tuple (latitude, longitude) to a mapping matrix
-        Return (i, j) coordinates
+        Remap a single (latitude, longitude) to the pixel of the city box
+         holding it, as ``to_pixels`` does
 
         :param latitude: The latitude of the point
         :param longitude: The Longitude of the point
-        :return: (i, j)
+        :return: (i, j), -1 outside the box
         """
+        rows, columns = self.geometry.to_pixels([latitude], [longitude])
+        return int(rows[0]), int(columns[0])
 
-        if self.city.lat_min <= latitude < self.city.lat_max:
-            lat_window = (self.city.lat_max - self.city.lat_min)
-            normal_lat = (latitude - self.city.lat_min) / lat_window
-            new_latitude = round(normal_lat * self.city.shape[0])
-        else:
-            new_latitude = -1
-
-        if self.city.lon_min <= longitude < self.city.lon_max:
-            lon_window = (self.city.lon_max - self.city.lon_min)
-            normal_lon = (longitude - self.city.lon_min) / lon_window
-            new_longitude = round(normal_lon * self.city.shape[1])
-        else:
-            new_longitude = -1
-
-        return new_latitude, new_longitude
-
-    def open(self, file_name: str):
+    def to_pixels(self, latitude, longitude) -> tuple:
         """
-        Read a single lightning file given it's full file path and file_name.
-        Saves it as a pandas.DataFrame where:
-        * tipo: either 'CG' for Cloud-to-Ground or 'IC' for intracloud;
-        * datahora: a date-time timestamp;
-        * latitude: the latitude of the occurrence as a float;
-        * longitude: the longitude of the occurrence as a float;
-        * pico_corrente: either '+' for positive or '-' for negative polarity,
-            with no-polarity converted to '+';
-        * multiplicidade: number of strokes for each occurrence;
+        Vectorized mapping of coordinates to the (row, column) pixels of the
+         ``side`` x ``side`` city box, the same used by ``to_matrix``.
+        Points outside the box are given the index -1.
 
-        :param file_name: the full path for a lightning file
+        :param latitude: an array of latitudes
+        :param longitude: an array of longitudes
+        :return: (rows, columns) as integer arrays
         """
-        data = pd.read_csv(file_name,
+        return self.geometry.to_pixels(latitude, longitude)
+
+    def _read_csv(self, file_name: str, chunksize: int = None):
+        return pd.read_csv(file_name,
                            sep=';',
                            index_col='id',
+                           chunksize=chunksize,
                            converters={'pico_corrente':
                                        lambda z: '-' if '-' in z else '+'},
                            usecols=('id',
@@ -96,17 +79,64 @@ class EarthNetworks(object):
                                     'pico_corrente',
                                     'multiplicidade'))
 
+    def _prepare(self, data: pd.DataFrame) -> pd.DataFrame:
         data['datahora'] = pd.to_datetime(data['datahora'])
 
         # Reduce to valid intervals only
 
-        data = data[(data['latitude'] >= self.city.lat_min) &
+        return data[(data['latitude'] >= self.city.lat_min) &
                     (data['latitude'] <= self.city.lat_max) &
                     (data['longitude'] >= self.city.lon_min) &
                     (data['longitude'] <= self.city.lon_max)]
 
+    @instrument.timed('earthnetworks.open')
+    def open(self, file_name: str):
+        """
+        Read a single lightning file given it's full file path and file_name.
+        Saves it as a pandas.DataFrame where:
+        * tipo: either 'CG' for Cloud-to-Ground or 'IC' for intracloud;
+        * datahora: a date-time timestamp;
+        * latitude: the latitude of the occurrence as a float;
+        * longitude: the longitude of the occurrence as a float;
+        * pico_corrente: either '+' for positive or '-' for negative polarity,
+            with no-polarity converted to '+';
+        * multiplicidade: number of strokes for each occurrence;
+
+        :param file_name: the full path for a lightning file, or a binary file
+         object with its content
+        """
+        data = self._prepare(self._read_csv(file_name))
+
         self.data = data
 
+        if instrument.recorder is not None:
+            size = os.path.getsize(file_name) if isinstance(file_name, str) \
+                else file_name.tell()
+            instrument.count('earthnetworks.open', files=1, events=len(data),
+                             bytes_read=size)
+
+    def chunks(self, file_name: str, chunksize: int = 100000):
+        """
+        Reads a lightning file as ``open`` does, a chunk of rows at a time,
+         without keeping the whole file in memory.
+
+        :param file_name: the full path for a lightning file
+        :param chunksize: number of rows read at a time
+        :return: a generator of pandas.DataFrame
+        """
+        for data in self._read_csv(file_name, chunksize):
+            yield self._prepare(data)
+
+    def share(self):
+        """
+        Exports ``data`` to shared memory for worker processes, see
+         ``shared.SharedTable``
+
+        :return: the owning SharedTable, to be closed when the workers are done
+        """
+        return shared.SharedTable.export(self.data)
+
+    @instrument.timed('earthnetworks.to_matrix')
     def to_matrix(self, time0, time1, flash_type='CG'):
         """
         Converts a pandas DataFrame to a matrix mapped to the city
@@ -125,15 +155,20 @@ class EarthNetworks(object):
         data.latitude -= self.city.lat_min
         data.latitude /= self.city.lat_max - self.city.lat_min
         data.latitude *= self.side
-        data = data[data.latitude < self.side]
+        data = data[(data.latitude >= 0) & (data.latitude < self.side)]
 
         data.longitude -= self.city.lon_min
         data.longitude /= self.city.lon_max - self.city.lon_min
         data.longitude *= self.side
-        data = data[data.longitude < self.side]
+        data = data[(data.longitude >= 0) & (data.longitude < self.side)]
+
+        # Events sharing a pixel must all be added, which a buffered
+        # ``figure[rows, columns] +=`` would not do
 
         figure = np.zeros((self.side, self.side))
-        figure[data.latitude, data.longitude] += data.multiplicidade
+        np.add.at(figure, (data.latitude.values.astype(int),
+                           data.longitude.values.astype(int)),
+                  data.multiplicidade.values)
         del data
 
         self.figure = figure
@@ -0,0 +1,130 @@
+# coding: utf-8
+"""
+The geometry of every city, built once per process and shared by all CAPPI and
+ EarthNetworks objects: coordinate grids of the city box, the box in the
+ native grid, the coefficients mapping coordinates to box pixels and the ZR
+ lookup table used by every rain rate of the package.
+
+Arrays are read-only, as every object of a city holds the same ones. Worker
+ processes started by fork inherit the geometries already built.
+"""
+__docformat__ = 'restructuredtext en'
+
+import collections
+import functools
+
+import numpy as np
+
+from . import cities
+
+side = 200  # Side of the city box
+
+# The ZR lookup table covers dBZ from ``zr_min`` to ``zr_max`` in ``zr_step``
+# steps. ``zr_breaks`` are the dBZ where a ZR relationship of ``cities``
+# changes branch, the lower branch including them; they must be on the grid.
+
+zr_min = -15.0
+zr_max = 80.0
+zr_step = 0.01
+zr_breaks = {'zr_pi': (36.0,)}
+
+
+class Geometry(collections.namedtuple('Geometry', [
+        'city', 'latitude', 'longitude', 'box', 'lat_scale', 'lon_scale',
+        'zr_table', 'zr_breaks'])):
+    """
+    The geometry of a city, see ``get``:
+    * city: the City of ``cities.cities``;
+    * latitude, longitude: ``side`` x ``side`` grids of the box, rows going
+      north from ``lat_min`` and columns east from ``lon_min``;
+    * box: the (rows, columns) slices of the box in the native grid;
+    * lat_scale, lon_scale: box pixels per degree;
+    * zr_table: the rain rate of dBZ from ``zr_min`` in ``zr_step`` steps;
+    * zr_breaks: the table indices of the branch changes of ``city.zr``.
+    """
+
+    __slots__ = ()
+
+    def to_pixels(self, latitude, longitude) -> tuple:
+        """
+        Maps coordinates to (row, column) pixels of the box, -1 outside it
+
+        :param latitude: an array of latitudes
+        :param longitude: an array of longitudes
+        :return: (rows, columns) as integer arrays
+        """
+        rows = np.asarray(latitude, dtype=np.float64) - self.city.lat_min
+        rows *= self.lat_scale
+        columns = np.asarray(longitude, dtype=np.float64) - self.city.lon_min
+        columns *= self.lon_scale
+
+        inside = (rows >= 0) & (rows < side) & \
+                 (columns >= 0) & (columns < side)
+
+        rows = np.where(inside, rows, -1).astype(np.intp)
+        columns = np.where(inside, columns, -1).astype(np.intp)
+        return rows, columns
+
+    def zr(self, dbz) -> np.ndarray:
+        """
+        The rain rate in mm/h from the lookup table, with dBZ rounded to
+         ``zr_step`` but never across a branch change of ``city.zr``. Exact
+         for fields quantized at a multiple of ``zr_step``, such as the
+         codecs of ``codec``, else within ``zr_step`` dBZ of ``city.zr``.
+         Below ``zr_min`` the rate is 0 and above ``zr_max`` it is computed
+         by ``city.zr``.
+
+        :param dbz: an array of dBZ
+        :return: np.ndarray
+        """
+        dbz = np.asarray(dbz, dtype=np.float64)
+        index = dbz - zr_min
+        index /= zr_step
+        np.rint(index, out=index)
+        for limit in self.zr_breaks:
+            index[(dbz > zr_min + limit * zr_step) & (index <= limit)] = \
+                limit + 1
+        np.clip(index, 0, len(self.zr_table) - 1, out=index)
+        output = self.zr_table[index.astype(np.intp)]
+
+        output[dbz < zr_min] = 0.0
+        above = dbz > zr_max
+        if above.any():
+            output[above] = self.city.zr(dbz[above])
+        return output
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@functools.lru_cache(maxsize=None)
+def get(city: str) -> Geometry:
+    """
+    The geometry of a city, built the first time it is requested
+
+    :param city: city code for a radar
+    :return: Geometry
+    """
+    info = cities.cities[city]
+
+    lat_line = np.linspace(start=info.lat_min, stop=info.lat_max, num=side)
+    lon_line = np.linspace(start=info.lon_min, stop=info.lon_max, num=side)
+    longitude, latitude = np.meshgrid(lon_line, lat_line, indexing='xy')
+
+    (top, left), (bottom, right) = info.box_ul, info.box_lr
+
+    count = int(round((zr_max - zr_min) / zr_step)) + 1
+    dbz = zr_min + np.arange(count) * zr_step
+
+    return Geometry(city=info,
+                    latitude=_read_only(latitude),
+                    longitude=_read_only(longitude),
+                    box=(slice(top, bottom), slice(left, right)),
+                    lat_scale=side / (info.lat_max - info.lat_min),
+                    lon_scale=side / (info.lon_max - info.lon_min),
+                    zr_table=_read_only(info.zr(dbz)),
+                    zr_breaks=tuple(int(round((value - zr_min) / zr_step))
+                                    for value in
+                                    zr_breaks.get(info.zr.__name__, ())))
@@ -6,9 +6,10 @@ Handle iterating over file lists, specially for CAPPI files as they need to be
 __docformat__ = 'restructuredtext en'
 
 import os
+from bisect import bisect_left
 from collections import namedtuple
 
-from pandas import to_timedelta, date_range, to_datetime
+from . import instrument
 
 # A justification for the use of pandas' time instead of datetime is the
 # simplicity. If this software was intended to be used within machines
@@ -17,6 +18,11 @@ from pandas import to_timedelta, date_range, to_datetime
 
 DRange = namedtuple('DRange', ['start', 'end', 'files'])
 
+# A single file of the catalog, with the size and modification time given by
+# the same directory scan that found it.
+
+CatalogEntry = namedtuple('CatalogEntry', ['file', 'date', 'size', 'mtime'])
+
 
 class Handler(object):
     """
@@ -24,6 +30,7 @@ class Handler(object):
      available in a certain path.
     """
 
+    catalog = None
     dates = None
     files = None
     iterable = None
@@ -32,9 +39,10 @@ class Handler(object):
         self.path = path
 
     def perform(self):
-        self.list_files(self.path)
+        self.list_files()
         self.list_dates()
 
+    @instrument.timed('handler.list_files')
     def list_files(self):
         """
         Lists all visible (i.e. not starting with a dot) files in a directory
@@ -53,21 +61,57 @@ class Handler(object):
                     output.append(file_name)
 
         self.files = sorted(output)
+        instrument.count('handler.list_files', files=len(output))
+
+    @instrument.timed('handler.list_catalog')
+    def list_catalog(self):
+        """
+        Lists all visible files like ``list_files``, also keeping their size
+         and modification time in ``catalog``, a list of CatalogEntry. The
+         ``files`` and ``dates`` lists are filled as well.
+
+        Directory entries already carry the file attributes, so this costs a
+         single directory scan.
+        """
 
+        output = []
+        directories = [self.path]
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.name[0] == '.':
+                        continue
+                    if entry.is_dir():
+                        directories.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        output.append((entry.path, stat.st_size,
+                                       stat.st_mtime))
+
+        output.sort()
+        self.files = [file_name for file_name, _, _ in output]
+        self.list_dates()
+        self.catalog = [CatalogEntry(file=file_name, date=date, size=size,
+                                     mtime=mtime)
+                        for (file_name, size, mtime), date
+                        in zip(output, self.dates)]
+        instrument.count('handler.list_catalog', files=len(output))
+
+    @instrument.timed('handler.list_dates')
     def list_dates(self):
         """
         This method will try to obtain the date from a file name, which is
          useful specially for radar files.
         """
 
-        dates = []
-        for filename in self.files:
-            filename = (filename.split('_')[-1]).split('.')[0]  # Date portion
-            date = to_datetime(filename)
-            dates.append(date)
+        from pandas import to_datetime  # Loaded by the first file list
 
-        self.dates = dates
+        dates = [(filename.split('_')[-1]).split('.')[0]  # Date portion
+                 for filename in self.files]
 
+        self.dates = list(to_datetime(dates, format="%Y%m%d%H%M%S"))
+
+    @instrument.timed('handler.generate_date_tuples')
     def generate_date_tuples(self, length: str, step: str):
         """
         This method generates a list of named_tuples self.iterable to be used
@@ -80,6 +124,8 @@ class Handler(object):
         :param step: the time step between the starting time of two intervals
         """
 
+        from pandas import to_timedelta, date_range, to_datetime
+
         # Grant the data starts at minute 00, nas has smooth start and ending
 
         tmp_start = to_datetime(self.dates[0].strftime("%Y%m%d"))
@@ -92,19 +138,16 @@ class Handler(object):
 
         # A namedtuple was used for clarity of reading for the return type
 
+        # Windows overlap whenever length is larger than step, so each window
+        # looks its files up again instead of consuming them.
+
         iterable = []
-        i = 0
         for d_start, d_end in zip(start, end):
-            files = []
-            for date, file_path in zip(self.dates[i:], self.files[i:]):
-                i += 1
-                if d_start <= date < d_end:
-                    files.append(file_path)
-                elif date >= d_end:
-                    i -= 1
-                    break
-            if files:
-                iterable.append(DRange(start=d_start, end=d_end, files=files))
+            first = bisect_left(self.dates, d_start)
+            last = bisect_left(self.dates, d_end)
+            if last > first:
+                iterable.append(DRange(start=d_start, end=d_end,
+                                       files=self.files[first:last]))
         self.iterable = iterable
 
     def __iter__(self):
@@ -4,13 +4,18 @@ This module contains the SteinerHandler class, a subclass of Handler and CAPPI
 """
 __docformat__ = 'restructuredtext en'
 
+import collections
 import os
 import sys
 
 import numpy as np
 
-from handler import Handler
-from cappi import CAPPI
+from . import instrument
+from . import summary
+from .handler import Handler
+from .cappi import CAPPI
+from .summary import Summary, scan
+from .workspace import Workspace
 
 
 class SteinerHandler(Handler):
@@ -18,25 +23,87 @@ class SteinerHandler(Handler):
     The SteinerHandler class is a subclass of Handler that deals with the
      Steiner method. While it is almost the same, it implements the iterator
      differently, and also saves the output as a file.
+
+    Several cities may be given when they share the same radar files (e.g. BRU
+     and PPR). Each file is then decoded and filtered only once, over the
+     merged halos of all city boxes, and the boxes of every city are kept in
+     ``crops`` until the next file. The box mask of every city is also saved,
+     labelled with the city code, next to the native Steiner file, which is
+     only valid inside the boxes. A single city is filtered over the whole
+     grid, as before.
+
+    Every processed file adds a row per city to ``summary``. ``process`` saves
+     them as a part file next to the Steiner files every ``checkpoint``
+     files, and combines the parts into the summary file at the end, see
+     ``summary``.
     """
-    def __init__(self, city: str, path: str):
+
+    crops = None  # type: dict
+    checkpoint = 100  # Files processed between two saves of the summary
+
+    def __init__(self, city, path: str):
         """
         Initialized the SteinerHandler class with a city code and a file path.
 
         :param path: file path for the radar files
-        :param city: city code for a radar
+        :param city: city code for a radar, or a tuple of city codes sharing
+         the same radar files
         """
         super().__init__(path)
-        self.radar = CAPPI(city)
 
-    def save_steiner(self):
+        codes = (city,) if isinstance(city, str) else tuple(city)
+        self.radars = collections.OrderedDict((code, CAPPI(code))
+                                              for code in codes)
+        self.radar = self.radars[codes[0]]
+
+        for radar in self.radars.values():
+            if radar.city.folder != self.radar.city.folder or \
+                    radar.city.shape != self.radar.city.shape:
+                raise ValueError("%s and %s do not share the same radar files"
+                                 % (codes[0], radar.city.file_name))
+
+        self.regions = CAPPI.regions(list(self.radars.values())) \
+            if len(codes) > 1 else None
+
+        # Buffers reused by every file, as all of them share the same grid
+        self.workspace = Workspace()
+        self.radar.workspace = self.workspace
+
+        self.crops = collections.OrderedDict()
+        for code in codes:
+            self.crops[code] = CAPPI(code)
+            self.crops[code].workspace = Workspace()
+
+        self.summary = Summary()
+
+    @instrument.timed('steiner_handler.save_steiner')
+    def save_steiner(self, label: str = None):
         """
         Save a file as a Steiner file
+
+        :param label: the label of a mask in ``radar.steiner_masks``, saved
+         side by side with the default Steiner file
+        """
+        new_name = self.radar.steiner_file_name(label)
+        if label is None:
+            np.savetxt(new_name, self.radar.steiner_mask)
+        else:
+            np.savetxt(new_name, self.radar.steiner_masks[label])
+
+        if instrument.recorder is not None:
+            instrument.count('steiner_handler.save_steiner', files=1,
+                             bytes_written=os.path.getsize(new_name))
+
+    @instrument.timed('steiner_handler.save_crops')
+    def save_crops(self):
         """
-        old_name = self.radar.file_name + ""
-        new_name = old_name.replace("raw.gz", "npy.gz")
-        new_name = new_name.replace("Radar", "Steiner")
-        np.savetxt(new_name, self.radar.steiner_mask)
+        Save the box mask of every city, labelled with the city code, when
+         the native Steiner file is only valid inside the boxes
+        """
+        if self.regions is None:
+            return
+        for code, crop in self.crops.items():
+            np.savetxt(crop.steiner_file_name(code), crop.steiner_mask)
 
     def populate_dirs(self):
         """
@@ -49,11 +116,122 @@ class SteinerHandler(Handler):
         for path, _, _ in os.walk(self.path):
             os.makedirs(path.replace('Radar', 'Steiner'), exist_ok=True)
 
-    def process(self):
+    def crop(self):
+        """
+        Fills the CAPPI objects of ``crops`` with the box of each city for the
+         current file, reusing their buffers.
+        """
+        for crop in self.crops.values():
+            crop.crop(self.radar)
+
+    def process_file(self, file: str):
+        """
+        Opens, filters and saves a single file.
+
+        The saved mask covers the native grid, and is valid inside the box of
+         every city given to this object.
+
+        :param file: the radar file name
+        """
+        self.radar.file_name = file
+        self.radar.open()
+        self.radar.steiner_filter(self.regions)
+        self.save_steiner()
+        self.crop()
+        self.save_crops()
+        for crop in self.crops.values():
+            self.summary.append(scan(crop))
+
+    def summary_file_name(self) -> str:
+        """
+        The summary file of the radar files in path, in the ``Steiner``
+         directory
+        """
+        return os.path.join(self.path.replace('Radar', 'Steiner'),
+                            'summary.npz')
+
+    def save_summary(self, file_name: str = None):
+        """
+        Saves ``summary`` as a new part of the summary file and empties it,
+         see ``summary.save_part``
+
+        :param file_name: the summary file, ``summary_file_name`` by default
+        """
+        if len(self.summary):
+            summary.save_part(self.summary,
+                              file_name or self.summary_file_name())
+            self.summary = Summary()
+
+    def checkpoint_summary(self, file_name: str = None):
+        """
+        Saves ``summary`` once it holds the rows of ``checkpoint`` files, see
+         ``save_summary``
+        """
+        if len(self.summary) >= self.checkpoint * len(self.crops):
+            self.save_summary(file_name)
+
+    def combine_summary(self, file_name: str = None) -> Summary:
+        """
+        Saves ``summary`` and merges every part into the summary file,
+         replacing the rows of files processed again, see ``summary.combine``
+
+        :param file_name: the summary file, ``summary_file_name`` by default
+        :return: the summary of every file
+        """
+        file_name = file_name or self.summary_file_name()
+        self.save_summary(file_name)
+        return summary.combine(file_name)
+
+    def sweep(self, parameters: dict):
+        """
+        Will iterate over the files and create one Steiner filter for each set
+         of parameters, sharing the background computation between them. Each
+         mask is saved next to the default Steiner file, with its label before
+         the extension.
+
+        :param parameters: a dict of label: SteinerParameters
+        """
+        for label in parameters:
+            self.radar.steiner_file_name(label)  # Fail before any work
+
+        self.populate_dirs()
+        self.list_files()
+        self._progress(self.sweep_file, parameters)
+
+    def sweep_file(self, file: str, parameters: dict):
+        """
+        Opens a single file and saves one Steiner mask for each set of
+         parameters, see ``sweep``.
+
+        :param file: the radar file name
+        :param parameters: a dict of label: SteinerParameters
+        """
+        self.radar.file_name = file
+        self.radar.open()
+        self.radar.steiner_sweep(parameters, self.regions)
+        for label in parameters:
+            self.save_steiner(label)
+
+    def _progress(self, function, *args):
+        """
+        Calls ``function`` with every file in ``files`` and then ``args``,
+         writing the progress to stdout.
+        """
+        final = len(self.files)
+        for present, file in enumerate(self.files, 1):
+            function(file, *args)
+
+            percentage = (present * 100) // final
+            sys.stdout.write("\r%d%% - %s" % (percentage, file))
+            sys.stdout.flush()
+
+    def process(self, files: list = None):
         """
         Will iterate over the files and create the respective Steiner filter.
         It will then save the file in the proper directory previously created
          by the ``populate_dirs`` method.
+
+        :param files: the files to process, all files in path by default
         """
 
         # Some house-keeping to make sure all conditions for the ``__iter__`` to
@@ -61,24 +239,21 @@ class SteinerHandler(Handler):
         # the house-keeping should be explicit.
 
         self.populate_dirs()
-        self.list_files()
-
-        present = 0
-        final = len(self.files)
+        if files is None:
+            self.list_files()
+        else:
+            self.files = list(files)
 
-        for file in self.files:
-            self.radar.file_name = file
-            self.radar.open()
-            self.radar.steiner_filter()
-            self.save_steiner()
+        self._progress(self._process_file)
+        self.combine_summary()
 
-            present += 1
-            percentage = (present * 100) // final
-            sys.stdout.write("\r%d%% - %s" % (percentage, file))
-            sys.stdout.flush()
+    def _process_file(self, file: str):
+        self.process_file(file)
+        self.checkpoint_summary()
 
 if __name__ == '__main__':
-    x = SteinerHandler('BRU', '/home/likewise-open/LOCAL/joao.garcia/Workplace/'
-                              '1.INPE/Data/Radar/')
+    x = SteinerHandler(('BRU', 'PPR'), '/home/likewise-open/LOCAL/'
+                                       'joao.garcia/Workplace/1.INPE/Data/'
+                                       'Radar/BR_PP/')
     x.list_files()
-    x.process()
\ No newline at end of file
+    x.process()
@@ -0,0 +1,258 @@
+# coding: utf-8
+"""
+This module contains the WRLRHandler class, a subclass of Handler that joins
+ radar rain and lightning counts over the same time windows and slices.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+
+from . import pyramid
+from .handler import Handler
+from .cappi import CAPPI
+from .earthnetworks import EarthNetworks
+from .workspace import Workspace
+
+
+class WRLRHandler(Handler):
+    """
+    The WRLRHandler class computes, for every ``Handler`` window and every
+     ``_slice`` window, the Steiner filtered rain volume, the number of
+     lightning strokes and their ratio.
+
+    Each radar file is read only once: its rain is summed over the cells of a
+     ``pyramid`` shared by every window count and stored in ``rain``, a
+     (files, cells, cells) array. The time windows are then obtained with
+     cumulative sums, so overlapping windows cost nothing, and the slices of
+     each window count are pooled from the cells.
+    Lightning is handled the same way, binning the events once by the window
+     edges and the cells instead of filtering the table for each window.
+
+    Setting ``windows`` recomputes the cells and drops the ``rain`` already
+     accumulated over the previous ones.
+    """
+
+    rain = None  # type: np.ndarray
+    table = None  # type: pd.DataFrame
+
+    def __init__(self, city: str, path: str, windows: int = 4):
+        """
+        Initialized the WRLRHandler class with a city code and a file path.
+
+        :param city: city code for a radar
+        :param path: file path for the radar files
+        :param windows: the number of windows given to ``_slice``, or a
+         sequence of them
+        """
+        super().__init__(path)
+        self.radar = CAPPI(city)
+        self.radar.workspace = Workspace()
+        self.lightning = EarthNetworks(city)
+        self.windows = windows
+
+        lat_center = np.radians((self.radar.city.lat_min +
+                                 self.radar.city.lat_max) / 2)
+        lat_km = 111.32 * (self.radar.city.lat_max -
+                           self.radar.city.lat_min) / self.radar.side
+        lon_km = 111.32 * np.cos(lat_center) * (self.radar.city.lon_max -
+                                                self.radar.city.lon_min) / \
+            self.radar.side
+        self.pixel_area = lat_km * lon_km  # km² of a single box pixel
+
+    @property
+    def windows(self):
+        """
+        The number of windows given to ``_slice``, or a sequence of them
+        """
+        return self._windows
+
+    @windows.setter
+    def windows(self, windows):
+        self._windows = windows
+        self.edges = pyramid.edges(windows, self.radar.side)
+        self.rain = None
+        self.table = None
+
+    def scan_rain(self) -> np.ndarray:
+        """
+        Reduce the currently opened radar file to its convective rain rate
+         (mm/h) summed over each cell of the pyramid.
+
+        The Steiner mask is read from the ``Steiner`` directory when available,
+         and computed otherwise.
+
+        :return: a (cells, cells) array
+        """
+        self.radar.load_steiner()
+        self.radar.remove_borders()
+        self.radar.to_zr()
+        self.radar.apply_filter()
+
+        return pyramid.blocks(self.radar.data, self.edges)
+
+    def accumulate_rain(self, scan_interval: str = None):
+        """
+        Reads every radar file once and stores, in ``rain``, the rain
+         accumulated (mm times pixel count) by each file over each cell.
+
+        :param scan_interval: the time each scan represents. Defaults to the
+         median time between consecutive files.
+        """
+        if self.dates is None:
+            self.perform()
+
+        cells = len(self.edges) - 1
+        rain = np.zeros((len(self.files), cells, cells))
+        for index, file in enumerate(self.files):
+            self.radar.file_name = file
+            self.radar.open()
+            rain[index] = self.scan_rain()
+
+        if scan_interval is None:
+            times = np.array(self.dates, dtype='datetime64[ns]')
+            interval = np.median(np.diff(times)) if len(times) > 1 else 0
+            hours = pd.to_timedelta(interval).total_seconds() / 3600.0
+        else:
+            hours = pd.to_timedelta(scan_interval).total_seconds() / 3600.0
+
+        self.rain = rain * hours
+
+    def flash_blocks(self, starts: np.ndarray, ends: np.ndarray,
+                     flash_type=('CG', 'IC')) -> np.ndarray:
+        """
+        Counts the lightning strokes (``multiplicidade``) of every cell of the
+         pyramid for each [start, end) window.
+
+        :param starts: the starting time of every window
+        :param ends: the ending time of every window
+        :param flash_type: either 'CG', 'IC' or a tuple of both
+        :return: a (windows, cells, cells) array
+        """
+        cells = len(self.edges) - 1
+        if isinstance(flash_type, str):
+            flash_type = (flash_type,)
+
+        data = self.lightning.data
+        data = data[data.tipo.isin(flash_type)]
+
+        rows, columns = pyramid.cells(*self.lightning.to_pixels(
+            data.latitude, data.longitude), self.edges)
+        located = np.where(rows >= 0, rows * cells + columns, -1)
+
+        # Events are binned between consecutive window edges, so each window is
+        # the difference of two cumulative sums.
+
+        edges = np.unique(np.concatenate([starts, ends]))
+        times = data.datahora.values.astype('datetime64[ns]')
+        bins = np.searchsorted(edges, times, side='right') - 1
+        strokes = data.multiplicidade.values.astype(np.int64)
+
+        valid = (located >= 0) & (bins >= 0)
+        counts = np.bincount(bins[valid] * cells ** 2 + located[valid],
+                             weights=strokes[valid],
+                             minlength=len(edges) * cells ** 2)
+
+        cumulative = np.zeros((len(edges) + 1, cells ** 2), dtype=np.int64)
+        np.cumsum(counts.astype(np.int64).reshape(len(edges), cells ** 2),
+                  axis=0, out=cumulative[1:])
+
+        first = np.searchsorted(edges, starts)
+        last = np.searchsorted(edges, ends)
+        return (cumulative[last] - cumulative[first]).reshape(-1, cells, cells)
+
+    def count_flashes(self, starts: np.ndarray, ends: np.ndarray,
+                      flash_type=('CG', 'IC'), windows: int = None) \
+            -> np.ndarray:
+        """
+        Counts the lightning strokes (``multiplicidade``) of every slice for
+         each [start, end) window.
+
+        :param starts: the starting time of every window
+        :param ends: the ending time of every window
+        :param flash_type: either 'CG', 'IC' or a tuple of both
+        :param windows: the number of windows given to ``_slice``, the one of
+         the handler by default
+        :return: a (windows, slices) array
+        """
+        if windows is None:
+            windows = self.windows
+        if np.ndim(windows):
+            raise ValueError("A single window count must be given")
+        tree = pyramid.Pyramid.from_blocks(
+            self.flash_blocks(starts, ends, flash_type), self.edges)
+        return tree.reduce(windows).astype(np.int64)
+
+    def process(self, length: str = "30m", step: str = "450s",
+                flash_type=('CG', 'IC'), scan_interval: str = None) \
+            -> pd.DataFrame:
+        """
+        Creates the WRLR table, with one row for each window and slice:
+        * windows: the window count given to ``_slice``, only when the
+          handler was given a sequence of them;
+        * start: the starting time of the window;
+        * slice: the slice index, in the same order as ``_slice``;
+        * rain: the convective rain volume in m³;
+        * flashes: the number of lightning strokes;
+        * ratio: rain per stroke, NaN if there are no strokes.
+
+        The lightning file must have been opened by ``self.lightning.open``.
+
+        :param length: the duration of each time interval
+        :param step: the time step between the starting time of two intervals
+        :param flash_type: either 'CG', 'IC' or a tuple of both
+        :param scan_interval: the time each scan represents
+        :return: pd.DataFrame
+        """
+        if self.dates is None:
+            self.perform()
+        if self.rain is None:
+            self.accumulate_rain(scan_interval)
+        self.generate_date_tuples(length, step)
+
+        starts = np.array([d.start for d in self], dtype='datetime64[ns]')
+        ends = np.array([d.end for d in self], dtype='datetime64[ns]')
+        times = np.array(self.dates, dtype='datetime64[ns]')
+
+        cumulative = np.zeros((len(times) + 1,) + self.rain.shape[1:])
+        np.cumsum(self.rain, axis=0, out=cumulative[1:])
+        first = np.searchsorted(times, starts)
+        last = np.searchsorted(times, ends)
+
+        # Both pyramids are built once, every window count is pooled from them
+
+        rain = pyramid.Pyramid.from_blocks(cumulative[last] -
+                                           cumulative[first], self.edges)
+        flashes = pyramid.Pyramid.from_blocks(
+            self.flash_blocks(starts, ends, flash_type), self.edges)
+
+        tables = []
+        for windows in np.atleast_1d(self.windows):
+            # mm over a km² is a thousand m³
+
+            volume = rain.reduce(windows) * self.pixel_area * 1e3
+            strokes = flashes.reduce(windows).astype(np.int64)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.where(strokes > 0, volume / strokes, np.nan)
+
+            total = volume.shape[1]
+            table = pd.DataFrame({'start': np.repeat(starts, total),
+                                  'slice': np.tile(np.arange(total),
+                                                   len(starts)),
+                                  'rain': volume.ravel(),
+                                  'flashes': strokes.ravel(),
+                                  'ratio': ratio.ravel()})
+            if np.ndim(self.windows):
+                table.insert(0, 'windows', windows)
+            tables.append(table)
+
+        self.table = pd.concat(tables, ignore_index=True)
+        return self.table
+
+if __name__ == '__main__':
+    x = WRLRHandler('BRU', '/home/likewise-open/LOCAL/joao.garcia/Workplace/'
+                           '1.INPE/Data/Radar/BR_PP/')
+    x.lightning.open('/home/likewise-open/LOCAL/joao.garcia/Workplace/'
+                     '1.INPE/Data/Lightning/flash.csv')
+    print(x.process())
@@ -0,0 +1,240 @@
+# coding: utf-8
+"""
+Lightweight instrumentation for the radar pipeline.
+
+Stages are marked with the ``timed`` decorator or the ``stage`` context
+ manager, and counters (bytes read and written, files, events) with ``count``.
+Nothing is measured until ``enable`` is called: a disabled stage costs a global
+ lookup. Once enabled, the wall and CPU times of every stage are accumulated
+ and written as JSON lines, one per stage, when ``disable`` is called:
+
+    instrument.enable(open('stages.jsonl', 'w'))
+    handler.process()
+    instrument.disable()
+"""
+__docformat__ = 'restructuredtext en'
+
+import collections
+import contextlib
+import functools
+import json
+import sys
+import threading
+import time
+
+recorder = None  # type: Recorder
+
+
+class Recorder(object):
+    """
+    Accumulates per-stage wall time, CPU time and counters.
+
+    :param stream: a text stream receiving JSON lines
+    :param calls: also write one line for every single stage call
+    :param profiler: an object with ``start`` and ``stop`` methods, run while
+     the recorder is enabled. ``stop`` may return a list of records, written
+     along with the stages.
+    """
+
+    def __init__(self, stream=None, calls: bool = False, profiler=None):
+        self.stream = sys.stderr if stream is None else stream
+        self.calls = calls
+        self.profiler = profiler
+        self.stages = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def _stage(self, name: str) -> dict:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'stage': name, 'calls': 0,
+                                         'wall': 0.0, 'cpu': 0.0}
+        return stage
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Measures the time spent inside the context
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            with self.lock:
+                stage = self._stage(name)
+                stage['calls'] += 1
+                stage['wall'] += wall
+                stage['cpu'] += cpu
+            if self.calls:
+                self.emit({'stage': name, 'wall': wall, 'cpu': cpu})
+
+    def count(self, name: str, **counters):
+        """
+        Adds counters, such as ``bytes_read`` or ``files``, to a stage
+        """
+        with self.lock:
+            stage = self._stage(name)
+            for key, value in counters.items():
+                stage[key] = stage.get(key, 0) + value
+
+    def emit(self, record: dict):
+        """
+        Writes a record as a JSON line
+        """
+        with self.lock:
+            self.stream.write(json.dumps(record) + '\n')
+            self.stream.flush()
+
+    def summary(self) -> list:
+        """
+        Returns one record per stage, with files per second when files were
+         counted.
+
+        :return: list of dict
+        """
+        output = []
+        for stage in self.stages.values():
+            stage = dict(stage)
+            if stage.get('files') and stage['wall']:
+                stage['files_per_second'] = stage['files'] / stage['wall']
+            output.append(stage)
+        return output
+
+
+class _Null(object):
+    """
+    The context manager returned by ``stage`` while disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_null = _Null()
+
+
+def stage(name: str):
+    """
+    A context manager timing a stage, doing nothing while disabled
+
+    :param name: the stage name
+    """
+    if recorder is None:
+        return _null
+    return recorder.stage(name)
+
+
+def count(name: str, **counters):
+    """
+    Adds counters to a stage, doing nothing while disabled
+
+    :param name: the stage name
+    """
+    if recorder is not None:
+        recorder.count(name, **counters)
+
+
+def timed(name: str):
+    """
+    Decorator timing every call of a function as a stage
+
+    :param name: the stage name
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if recorder is None:
+                return function(*args, **kwargs)
+            with recorder.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(stream=None, calls: bool = False, profiler=None) -> Recorder:
+    """
+    Starts recording every stage
+
+    :param stream: a text stream receiving JSON lines, stderr by default
+    :param calls: also write one line for every single stage call
+    :param profiler: an optional profiler, see ``Recorder``
+    :return: the active Recorder
+    """
+    global recorder
+    recorder = Recorder(stream, calls, profiler)
+    if profiler is not None:
+        profiler.start()
+    return recorder
+
+
+def disable() -> list:
+    """
+    Stops recording, writing the summary of every stage
+
+    :return: the summary records
+    """
+    global recorder
+    if recorder is None:
+        return []
+
+    active, recorder = recorder, None
+    output = active.summary()
+    if active.profiler is not None:
+        output += active.profiler.stop() or []
+    for record in output:
+        active.emit(record)
+    return output
+
+
+class SamplingProfiler(object):
+    """
+    A minimal sampling profiler: a background thread looks at the stack of a
+     thread at a fixed interval and counts the innermost functions seen.
+
+    :param interval: seconds between samples
+    :param top: number of functions reported
+    :param thread_id: the sampled thread, the one creating this object by
+     default
+    """
+
+    def __init__(self, interval: float = 0.005, top: int = 20,
+                 thread_id: int = None):
+        self.interval = interval
+        self.top = top
+        self.thread_id = threading.get_ident() if thread_id is None \
+            else thread_id
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[(code.co_filename, code.co_name,
+                              frame.f_lineno)] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> list:
+        """
+        Stops sampling
+
+        :return: one record per sampled function
+        """
+        self._stop.set()
+        self._thread.join()
+        total = sum(self.samples.values()) or 1
+        return [{'profile': name, 'file': file_name, 'line': line,
+                 'samples': samples, 'fraction': samples / total}
+                for (file_name, name, line), samples
+                in self.samples.most_common(self.top)]
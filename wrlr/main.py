@@ -5,9 +5,8 @@ This file is intended to be used as a main script. It's intended to read and
 """
 __docformat__ = 'restructuredtext en'
 
-from earthnetworks import EarthNetworks
-from cappi import CAPPI
-from handler import Handler
+from .earthnetworks import EarthNetworks
+from .handler_wrlr import WRLRHandler
 from sys import argv
 
 
@@ -20,21 +19,13 @@ def main():
     flash_path = "/home/likewise-open/LOCAL/joao.garcia/Workplace/1.INPE/Data/Lightning/flash.csv"
     pulse_path = "/home/likewise-open/LOCAL/joao.garcia/Workplace/1.INPE/Data/Lightning/pulse.csv"
 
-    rad = CAPPI(city)
-    flash = EarthNetworks(city)
-    #flash.open(flash_path)
+    handler = WRLRHandler(city, radar_path, windows=4)
+    handler.lightning.open(flash_path)
     pulse = EarthNetworks(city)
     #pulse.open(pulse_path)
 
-    handler = Handler(radar_path)
-    handler.list_files()
-    handler.list_dates()
-    handler.generate_date_tuples("30m", "450s")
-
-    for h in iter(handler):
-        if h.files:
-            print(h)
-            break
+    table = handler.process("30m", "450s")
+    print(table)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,285 @@
+# coding: utf-8
+"""
+A staged streaming pipeline, where each stage runs in its own workers and
+ stages are connected by bounded queues, so reading, inflating, filtering and
+ writing of different files overlap in time.
+"""
+__docformat__ = 'restructuredtext en'
+
+import collections
+import concurrent.futures
+import functools
+import os
+import queue
+import sys
+import threading
+
+import numpy as np
+
+from . import instrument
+from .cappi import CAPPI
+from .handler_steiner import SteinerHandler
+
+# A pipeline stage. ``function`` receives the output of the previous stage and
+# runs in ``workers`` threads, or in a pool of ``workers`` processes when
+# ``processes`` is set (the function and its data must then be picklable).
+
+Stage = collections.namedtuple('Stage', ['name', 'function', 'workers',
+                                         'processes'],
+                               defaults=(1, False))
+
+_end = object()  # Marks the end of the items in a queue
+
+
+class _Failure(object):
+    """
+    An exception raised by a stage, carried down to the consumer
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class Pipeline(object):
+    """
+    Runs items through a list of stages. Each stage has its own concurrency,
+     and consecutive stages are linked by queues holding at most ``maxsize``
+     items: a slow stage makes the previous ones wait instead of piling up
+     data in memory.
+
+    Results are yielded in the same order as the items, whatever order the
+     workers finish them in. An exception in any stage stops the pipeline and
+     is raised by ``run`` when its item is reached.
+
+    :param stages: a list of Stage
+    :param maxsize: the size of the queues between stages
+    """
+
+    def __init__(self, stages: list, maxsize: int = 2):
+        self.stages = [Stage(*stage) for stage in stages]
+        self.maxsize = maxsize
+
+    def _put(self, output: queue.Queue, item, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self, stage: Stage, executor, source: queue.Queue,
+                output: queue.Queue, stop: threading.Event, remaining: list,
+                lock: threading.Lock):
+        while not stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _end:
+                # Left in the queue for the other workers of this stage
+                self._put(source, _end, stop)
+                break
+
+            index, value = item
+            if not isinstance(value, _Failure):
+                try:
+                    with instrument.stage('pipeline.' + stage.name):
+                        if executor is None:
+                            value = stage.function(value)
+                        else:
+                            value = executor.submit(stage.function,
+                                                    value).result()
+                except Exception as error:
+                    value = _Failure(error)
+            self._put(output, (index, value), stop)
+
+        # The last worker of a stage tells the next one
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            self._put(output, _end, stop)
+
+    def run(self, items):
+        """
+        Runs every item through all stages
+
+        :param items: an iterable of items given to the first stage
+        :return: a generator of the outputs of the last stage
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(self.maxsize)
+                  for _ in range(len(self.stages) + 1)]
+
+        # Items in flight are bounded, so a slow item cannot make the reorder
+        # buffer grow without limit.
+
+        in_flight = threading.BoundedSemaphore(
+            self.maxsize * (len(self.stages) + 1) +
+            sum(stage.workers for stage in self.stages))
+
+        executors = []
+        threads = []
+        for stage, source, output in zip(self.stages, queues, queues[1:]):
+            executor = None
+            if stage.processes:
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    stage.workers)
+                executors.append(executor)
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._worker, daemon=True,
+                    args=(stage, executor, source, output, stop, remaining,
+                          lock)))
+
+        def feed():
+            for item in enumerate(items):
+                while not in_flight.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                self._put(queues[0], item, stop)
+            self._put(queues[0], _end, stop)
+
+        threads.append(threading.Thread(target=feed, daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            pending = {}
+            expected = 0
+            while True:
+                item = queues[-1].get()
+                if item is _end:
+                    break
+                pending[item[0]] = item[1]
+                while expected in pending:
+                    value = pending.pop(expected)
+                    expected += 1
+                    in_flight.release()
+                    if isinstance(value, _Failure):
+                        raise value.error
+                    yield value
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                executor.shutdown()
+
+
+def _filter(city: str, regions: list, item: tuple) -> tuple:
+    """
+    The compute stage of SteinerPipeline, a module function so it can run in
+     another process.
+
+    :param city: city code for a radar
+    :param regions: regions given to ``steiner_filter``
+    :param item: (file, data, mask, mask_value) from the decode stage
+    :return: (file, steiner_mask)
+    """
+    file, data, mask, mask_value = item
+    radar = CAPPI(city)
+    radar.data, radar.mask, radar.mask_value = data, mask, mask_value
+    radar.steiner_filter(regions)
+    return file, radar.steiner_mask
+
+
+class SteinerPipeline(SteinerHandler):
+    """
+    The SteinerPipeline class gives the same output as SteinerHandler, running
+     each file through four stages with their own concurrency:
+
+    1. read: the compressed bytes are read from disk (threads);
+    2. decode: the bytes are inflated and masked (threads, zlib releases the
+       GIL);
+    3. compute: the Steiner filter (processes by default, as the filter holds
+       the GIL);
+    4. write: the Steiner file is saved (threads).
+
+    :param city: city code for a radar, or a tuple of city codes sharing the
+     same radar files
+    :param path: file path for the radar files
+    :param workers: a dict of stage name: number of workers
+    :param processes: run the compute stage in processes instead of threads
+    :param maxsize: the size of the queues between stages
+    """
+
+    def __init__(self, city, path: str, workers: dict = None,
+                 processes: bool = True, maxsize: int = 2):
+        super().__init__(city, path)
+        self.workers = {'read': 1, 'decode': 1,
+                        'compute': os.cpu_count() or 1, 'write': 1}
+        self.workers.update(workers or {})
+        self.processes = processes
+        self.maxsize = maxsize
+        self.local = threading.local()
+
+    def _radar(self) -> CAPPI:
+        """
+        A CAPPI object for the current thread, without workspace, as its
+         arrays are handed over to the next stage.
+        """
+        radar = getattr(self.local, 'radar', None)
+        if radar is None:
+            radar = self.local.radar = CAPPI(self.radar.city.file_name)
+        return radar
+
+    def read(self, file: str) -> tuple:
+        with open(file, 'rb') as data_file:
+            compressed = data_file.read()
+        instrument.count('pipeline.read', files=1, bytes_read=len(compressed))
+        return file, compressed
+
+    def decode(self, item: tuple) -> tuple:
+        file, compressed = item
+        radar = self._radar()
+        radar.decode(compressed, file)
+        return file, radar.data, radar.mask, radar.mask_value
+
+    def write(self, item: tuple) -> str:
+        file, steiner_mask = item
+        radar = self._radar()
+        radar.file_name = file
+        new_name = radar.steiner_file_name()
+        np.savetxt(new_name, steiner_mask)
+        return new_name
+
+    def stages(self) -> list:
+        """
+        The stages of the pipeline
+
+        :return: a list of Stage
+        """
+        compute = functools.partial(_filter, self.radar.city.file_name,
+                                    self.regions)
+        return [Stage('read', self.read, self.workers['read']),
+                Stage('decode', self.decode, self.workers['decode']),
+                Stage('compute', compute, self.workers['compute'],
+                      self.processes),
+                Stage('write', self.write, self.workers['write'])]
+
+    def process(self, files: list = None) -> list:
+        """
+        Will run every file through the pipeline, saving the Steiner files in
+         the same place as ``SteinerHandler.process``.
+
+        :param files: the files to process, all files in path by default
+        :return: the list of Steiner files, in the same order as the files
+        """
+        self.populate_dirs()
+        if files is None:
+            self.list_files()
+        else:
+            self.files = list(files)
+
+        output = []
+        final = len(self.files)
+        for new_name in Pipeline(self.stages(), self.maxsize).run(self.files):
+            output.append(new_name)
+            percentage = (len(output) * 100) // final
+            sys.stdout.write("\r%d%% - %s" % (percentage, new_name))
+            sys.stdout.flush()
+        return output
@@ -0,0 +1,158 @@
+# coding: utf-8
+"""
+Multi-resolution block sums of the ``side`` x ``side`` city box.
+
+Every slice of ``_slice(windows)`` is a rectangle whose bounds fall on a few
+ cut lines. Taking the union of the cut lines of several window counts gives
+ the coarsest grid refining all of them: summing a field over the cells of
+ that grid is the only pass over the pixels. Any slice, of any of those window
+ counts, is then four lookups in the summed-area table of the cells.
+
+    tree = Pyramid(rain, windows=(2, 4, 5))
+    tree.reduce(4)  # the same as slices.reduce(rain, 4)
+    tree.level(5)   # the 5x5 grid of the full split
+"""
+__docformat__ = 'restructuredtext en'
+
+import functools
+
+import numpy as np
+
+from . import slices
+
+
+@functools.lru_cache(maxsize=None)
+def _edges(windows: tuple, side: int) -> np.ndarray:
+    cuts = {0, side}
+    for count in windows:
+        cuts.update(slices.rectangles(count, side).ravel().tolist())
+    output = np.array(sorted(cuts), dtype=np.intp)
+    output.flags.writeable = False
+    return output
+
+
+def edges(windows, side: int = 200) -> np.ndarray:
+    """
+    The cut lines of the cells shared by one or more window counts. The slices
+     are symmetric, so the same cuts apply to rows and columns.
+
+    :param windows: a window count, or a sequence of them
+    :param side: side of the square box
+    :return: a read-only array of pixel indices, from 0 to side
+    """
+    if np.ndim(windows) == 0:
+        windows = (windows,)
+    return _edges(tuple(sorted(set(int(count) for count in windows))), side)
+
+
+def blocks(data: np.ndarray, cuts: np.ndarray) -> np.ndarray:
+    """
+    Sums a (side, side) matrix, or a (n, side, side) stack, over the cells
+     given by ``cuts``.
+
+    :param data: a (..., side, side) array
+    :param cuts: cut lines from ``edges``
+    :return: a (..., cells, cells) array
+    """
+    data = np.asarray(data, dtype=np.float64)
+    output = np.add.reduceat(data, cuts[:-1], axis=-2)
+    return np.add.reduceat(output, cuts[:-1], axis=-1)
+
+
+def cells(rows: np.ndarray, columns: np.ndarray, cuts: np.ndarray) -> tuple:
+    """
+    Finds the cell of each (row, column) pixel.
+
+    :param rows: integer row indices, -1 for points outside the box
+    :param columns: integer column indices, -1 for points outside the box
+    :param cuts: cut lines from ``edges``
+    :return: (rows, columns) of the cells, -1 for points outside the box
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    columns = np.asarray(columns, dtype=np.intp)
+    inside = (rows >= 0) & (columns >= 0) & \
+        (rows < cuts[-1]) & (columns < cuts[-1])
+
+    cell_rows = np.searchsorted(cuts, rows, side='right') - 1
+    cell_columns = np.searchsorted(cuts, columns, side='right') - 1
+    return np.where(inside, cell_rows, -1), np.where(inside, cell_columns, -1)
+
+
+class Pyramid(object):
+    """
+    Block sums of a field, or a stack of fields, from which the slices of
+     several window counts are derived without reading the pixels again.
+
+    :param data: a (..., side, side) array
+    :param windows: the window counts to support, an int or a sequence
+    """
+
+    def __init__(self, data: np.ndarray, windows=4):
+        data = np.asarray(data)
+        self.side = data.shape[-1]
+        self.edges = edges(windows, self.side)
+        self._build(blocks(data, self.edges))
+
+    @classmethod
+    def from_blocks(cls, data: np.ndarray, cuts: np.ndarray) -> 'Pyramid':
+        """
+        Builds a Pyramid from cells already summed, such as sums of the
+         ``blocks`` of several scans.
+
+        :param data: a (..., cells, cells) array
+        :param cuts: the cut lines used to build the cells
+        :return: Pyramid
+        """
+        output = cls.__new__(cls)
+        output.edges = np.asarray(cuts)
+        output.side = int(output.edges[-1])
+        output._build(np.asarray(data, dtype=np.float64))
+        return output
+
+    def _build(self, data: np.ndarray):
+        self.blocks = data
+        shape = data.shape[:-2] + (data.shape[-2] + 1, data.shape[-1] + 1)
+        self.table = np.zeros(shape)
+        np.cumsum(np.cumsum(data, axis=-2), axis=-1,
+                  out=self.table[..., 1:, 1:])
+
+    def _index(self, bounds: np.ndarray) -> np.ndarray:
+        index = np.searchsorted(self.edges, bounds)
+        if not np.array_equal(self.edges[index.clip(max=len(self.edges) - 1)],
+                              bounds):
+            raise ValueError("The pyramid was not built for these windows")
+        return index
+
+    def sum(self, top, bottom, left, right) -> np.ndarray:
+        """
+        Sums rectangles whose bounds are cut lines, bottom and right excluded
+
+        :return: a (..., rectangles) array
+        """
+        top, bottom, left, right = (self._index(np.asarray(bound))
+                                    for bound in (top, bottom, left, right))
+        table = self.table
+        return table[..., bottom, right] - table[..., top, right] - \
+            table[..., bottom, left] + table[..., top, left]
+
+    def reduce(self, windows: int) -> np.ndarray:
+        """
+        Sums every slice of ``_slice(windows)``, as ``slices.reduce`` does
+
+        :param windows: one of the window counts of the pyramid
+        :return: a (..., slices) array
+        """
+        return self.sum(*slices.rectangles(windows, self.side).T)
+
+    def level(self, windows: int) -> np.ndarray:
+        """
+        Pools the cells into the ``windows`` x ``windows`` grid of the full
+         split, laid out as the box (lines first).
+
+        :param windows: one of the window counts of the pyramid
+        :return: a (..., windows, windows) array
+        """
+        bounds = np.arange(windows + 1) * (self.side // windows)
+        index = self._index(bounds)
+        output = np.add.reduceat(self.blocks, index[:-1], axis=-2)
+        return np.add.reduceat(output, index[:-1], axis=-1)
@@ -0,0 +1,243 @@
+# coding: utf-8
+"""
+Fits the relation between rain and lightning over the (window x slice) cells
+ of WRLRHandler tables, with bootstrap confidence intervals.
+
+Two parameters are estimated:
+* wrlr: the water to lightning ratio, total rain (m³) per total strokes;
+* intercept, slope: the power law ``rain = 10 ** intercept * flashes ** slope``
+  fitted in log space over the cells with both rain and strokes.
+
+Cells of the same time window share its rain, and consecutive windows
+ overlap, so cells are not independent. The bootstrap is therefore a moving
+ block bootstrap over time: the cells of each window are summed into a
+ single unit, and a resample draws runs of ``block`` consecutive windows,
+ which should be at least the number of windows a single one overlaps
+ (``length / step`` of ``WRLRHandler.process``). With ``block=1`` and a unit
+ per cell, it is the ordinary bootstrap of the cells.
+
+A resample is a vector of weights over the units, so a batch of resamples is
+ a matrix and every fit of the batch is a few matrix products. Batches are
+ split in chunks seeded from a single SeedSequence, so the results only
+ depend on the seed, not on the number of workers.
+"""
+__docformat__ = 'restructuredtext en'
+
+import concurrent.futures
+
+import numpy as np
+import pandas as pd
+
+from . import cities
+
+parameters = ('wrlr', 'intercept', 'slope')
+
+
+def _columns(rain: np.ndarray, flashes: np.ndarray) -> np.ndarray:
+    """
+    Stacks the per-cell terms summed by a weighted fit
+
+    :return: a (cells, 7) array
+    """
+    rain = np.asarray(rain, dtype=np.float64).ravel()
+    flashes = np.asarray(flashes, dtype=np.float64).ravel()
+    if rain.shape != flashes.shape:
+        raise ValueError("rain and flashes must have the same shape")
+
+    valid = (rain > 0) & (flashes > 0)
+    x = np.log10(flashes, out=np.zeros_like(flashes), where=valid)
+    y = np.log10(rain, out=np.zeros_like(rain), where=valid)
+    return np.column_stack([rain, flashes, valid, x, y, x * x, x * y])
+
+
+def _fit(terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Fits every row of weights at once
+
+    :param terms: the output of ``_columns``
+    :param weights: a (batch, cells) array
+    :return: a (batch, 3) array with the parameters
+    """
+    rain, flashes, count, x, y, xx, xy = (weights @ terms).T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wrlr = rain / flashes
+        slope = (count * xy - x * y) / (count * xx - x * x)
+        intercept = (y - slope * x) / count
+    return np.column_stack([wrlr, intercept, slope])
+
+
+def _units(terms: np.ndarray, groups: np.ndarray = None) -> np.ndarray:
+    """
+    Sums the terms of the cells of every group, in the order of the groups
+
+    :param terms: the output of ``_columns``
+    :param groups: the group of every cell, each cell being its own group by
+     default
+    :return: a (groups, 7) array
+    """
+    if groups is None:
+        return terms
+    groups = np.asarray(groups).ravel()
+    if len(groups) != len(terms):
+        raise ValueError("groups must give the group of every cell")
+    _, index = np.unique(groups, return_inverse=True)
+    output = np.zeros((index.max() + 1 if len(index) else 0, terms.shape[1]))
+    np.add.at(output, index, terms)
+    return output
+
+
+def fit(rain: np.ndarray, flashes: np.ndarray) -> np.ndarray:
+    """
+    Fits the parameters once, over all cells
+
+    :param rain: rain volume of every cell
+    :param flashes: number of strokes of every cell
+    :return: a (3,) array, in the order of ``parameters``
+    """
+    terms = _columns(rain, flashes)
+    return _fit(terms, np.ones((1, len(terms))))[0]
+
+
+def _resample(terms: np.ndarray, seed: np.random.SeedSequence, count: int,
+              batch: int, block: int = 1) -> np.ndarray:
+    """
+    Fits ``count`` moving block bootstrap resamples of the units, ``batch`` at
+     a time, in a worker process
+
+    :return: a (count, 3) array
+    """
+    generator = np.random.Generator(np.random.PCG64(seed))
+    units = len(terms)
+    block = max(1, min(block, units))
+    blocks = -(-units // block)
+
+    output = np.empty((count, len(parameters)))
+    for start in range(0, count, batch):
+        size = min(batch, count - start)
+
+        # Each drawn block adds one to the weight of its units, marked at its
+        # first unit and removed after its last one
+        first = generator.integers(0, units - block + 1, size=(size, blocks))
+        rows = np.arange(size)[:, np.newaxis]
+        marks = np.zeros((size, units + 1))
+        np.add.at(marks, (rows, first), 1)
+        np.add.at(marks, (rows, first + block), -1)
+        weights = np.cumsum(marks[:, :units], axis=1)
+
+        output[start:start + size] = _fit(terms, weights)
+    return output
+
+
+def bootstrap(rain: np.ndarray, flashes: np.ndarray, resamples: int = 1000,
+              seed: int = 0, workers: int = None, chunk: int = 250,
+              batch: int = None, groups: np.ndarray = None,
+              block: int = 1) -> np.ndarray:
+    """
+    Fits bootstrap resamples of the cells, see the module documentation
+
+    :param rain: rain volume of every cell
+    :param flashes: number of strokes of every cell
+    :param resamples: number of resamples
+    :param seed: the seed of all resamples
+    :param workers: number of processes, one per core by default; 0 runs
+     everything in this process
+    :param chunk: resamples given to a worker at a time, part of the seeding:
+     changing it changes the resamples
+    :param batch: resamples fitted at once, bounded by default to about 64 MB
+     of weights
+    :param groups: the time window of every cell, such as the ``start`` column
+     of a WRLR table, sorted in time; each cell is its own unit by default
+    :param block: the number of consecutive units drawn together
+    :return: a (resamples, 3) array, in the order of ``parameters``
+    """
+    terms = _units(_columns(rain, flashes), groups)
+    if batch is None:
+        batch = max(1, min(chunk, (64 << 20) // (16 * max(len(terms), 1))))
+
+    counts = [min(chunk, resamples - start)
+              for start in range(0, resamples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+
+    if workers == 0:
+        parts = [_resample(terms, child, count, batch, block)
+                 for child, count in zip(seeds, counts)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            parts = list(executor.map(_resample, [terms] * len(counts), seeds,
+                                      counts, [batch] * len(counts),
+                                      [block] * len(counts)))
+
+    if not parts:
+        return np.empty((0, len(parameters)))
+    return np.concatenate(parts)
+
+
+def summarize(estimate: np.ndarray, samples: np.ndarray,
+              confidence: float = 0.95) -> pd.DataFrame:
+    """
+    Describes the bootstrap distribution of every parameter
+
+    :param estimate: the output of ``fit``
+    :param samples: the output of ``bootstrap``
+    :param confidence: the level of the percentile interval
+    :return: pd.DataFrame indexed by parameter
+    """
+    tail = (1 - confidence) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        lower, median, upper = np.nanpercentile(samples,
+                                                [tail, 50, 100 - tail], axis=0)
+    return pd.DataFrame({'estimate': estimate,
+                         'mean': np.nanmean(samples, axis=0),
+                         'std': np.nanstd(samples, axis=0),
+                         'lower': lower, 'median': median, 'upper': upper},
+                        index=pd.Index(parameters, name='parameter'))
+
+
+def report(tables: dict, resamples: int = 1000, seed: int = 0,
+           workers: int = None, confidence: float = 0.95,
+           block: int = 4) -> pd.DataFrame:
+    """
+    Fits and bootstraps the WRLR tables of several cities. Tables with a
+     ``windows`` column are fitted for each window count, as slices of
+     different sizes do not share a relation.
+
+    The cells of a table are resampled in blocks of time windows, see the
+     module documentation; (rain, flashes) arrays are resampled cell by cell.
+
+    :param tables: a dict of city code: table from ``WRLRHandler.process``,
+     or (rain, flashes) arrays
+    :param resamples: number of resamples of each city
+    :param seed: the seed of every city
+    :param workers: number of processes, see ``bootstrap``
+    :param confidence: the level of the percentile interval
+    :param block: the number of consecutive time windows drawn together, 4
+     for the default 30 minute windows every 450 s
+    :return: pd.DataFrame indexed by (city, parameter), or by (city, windows,
+     parameter) for tables with a ``windows`` column
+    """
+    output = []
+    for city, table in sorted(tables.items()):
+        if city not in cities.cities:
+            raise ValueError("Unknown city %r" % city)
+        if not isinstance(table, pd.DataFrame):
+            rain, flashes = table
+            groups = [(city, rain, flashes, None)]
+        elif 'windows' in table.columns:
+            groups = [((city, windows), group.rain.values,
+                       group.flashes.values, group.start.values)
+                      for windows, group in table.groupby('windows')]
+        else:
+            groups = [(city, table.rain.values, table.flashes.values,
+                       table.start.values if 'start' in table.columns
+                       else None)]
+
+        for key, rain, flashes, starts in groups:
+            samples = bootstrap(rain, flashes, resamples, seed, workers,
+                                groups=starts,
+                                block=1 if starts is None else block)
+            summary = summarize(fit(rain, flashes), samples, confidence)
+            names = ['city', 'windows'] if isinstance(key, tuple) \
+                else ['city']
+            output.append(pd.concat({key: summary}, names=names))
+    return pd.concat(output)
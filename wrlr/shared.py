@@ -0,0 +1,202 @@
+# coding: utf-8
+"""
+The lightning table in shared memory, for worker processes.
+
+Columns are stored once, with fixed dtypes, in a single shared memory
+ segment; text columns (``tipo``, ``pico_corrente``) become integer codes.
+ Workers receive a small picklable ``SharedSpec`` instead of the table and map
+ the same memory, read-only and without copies:
+
+    with SharedTable.export(lightning.data) as table:
+        with ProcessPoolExecutor(initializer=shared.initializer,
+                                 initargs=(table.spec,)) as executor:
+            ...  # workers call shared.worker_table()
+
+The segment is removed when the exporting table is closed, when it is garbage
+ collected, and, should the process die, by the multiprocessing resource
+ tracker.
+"""
+__docformat__ = 'restructuredtext en'
+
+import collections
+import os
+import sys
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+# What a worker needs to map a table: the segment name, the number of rows,
+# (column, dtype, offset) of every column, the categories of text columns, the
+# index column and the resource tracker of the owner, see ``_tracker``.
+
+SharedSpec = collections.namedtuple('SharedSpec', ['name', 'length', 'columns',
+                                                   'categories', 'index',
+                                                   'tracker'])
+
+_alignment = 64
+
+
+def _tracker() -> tuple:
+    """
+    The resource tracker of this process, as the (device, inode) of its pipe,
+     shared by the processes forked or spawned by multiprocessing
+    """
+    status = os.fstat(resource_tracker.getfd())
+    return status.st_dev, status.st_ino
+
+
+def _close(memory: shared_memory.SharedMemory):
+    try:
+        memory.close()
+    except BufferError:
+        pass  # Arrays still in use keep the mapping alive until collected
+
+
+def _unlink(memory: shared_memory.SharedMemory):
+    _close(memory)
+    try:
+        memory.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedTable(object):
+    """
+    A table whose columns live in shared memory. Use ``export`` in the owner
+     process and ``attach`` in the workers.
+
+    :param spec: the SharedSpec of the table
+    :param memory: the mapped segment
+    :param owner: whether this object removes the segment when closed
+    """
+
+    def __init__(self, spec: SharedSpec, memory: shared_memory.SharedMemory,
+                 owner: bool):
+        self.spec = spec
+        self.memory = memory
+        self.owner = owner
+        self.columns = collections.OrderedDict()
+        for column, dtype, offset in spec.columns:
+            array = np.ndarray((spec.length,), dtype=np.dtype(dtype),
+                               buffer=memory.buf, offset=offset)
+            if not owner:
+                array.flags.writeable = False
+            self.columns[column] = array
+
+        self._finalizer = weakref.finalize(self, _unlink if owner else _close,
+                                           memory)
+
+    @classmethod
+    def export(cls, data: pd.DataFrame) -> 'SharedTable':
+        """
+        Copies a table into a new shared memory segment
+
+        :param data: a table such as ``EarthNetworks.data``
+        :return: the owning SharedTable
+        """
+        data = data.reset_index()
+        index = data.columns[0]
+
+        arrays = collections.OrderedDict()
+        categories = {}
+        for column in data.columns:
+            values = data[column]
+            if values.dtype == object or \
+                    isinstance(values.dtype, pd.CategoricalDtype):
+                codes = pd.Categorical(values)
+                categories[column] = tuple(codes.categories.tolist())
+                arrays[column] = codes.codes
+            else:
+                arrays[column] = values.values
+
+        columns = []
+        size = 0
+        for column, array in arrays.items():
+            columns.append((column, array.dtype.str, size))
+            size += -(-array.nbytes // _alignment) * _alignment
+
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        spec = SharedSpec(memory.name, len(data), tuple(columns), categories,
+                          index, _tracker())
+        output = cls(spec, memory, owner=True)
+        for column, array in arrays.items():
+            output.columns[column][:] = array
+        return output
+
+    @classmethod
+    def attach(cls, spec: SharedSpec) -> 'SharedTable':
+        """
+        Maps a table exported by another process, read-only
+
+        :param spec: the spec of the exported table
+        :return: a SharedTable that does not remove the segment
+        """
+        memory = shared_memory.SharedMemory(name=spec.name)
+
+        # Before Python 3.13 every attaching process registers the segment
+        # with its resource tracker, which would remove it when the worker
+        # exits. Only the tracker of the owner is responsible for it, so a
+        # worker sharing that tracker must not unregister the segment: the
+        # registration it would remove is the owner's.
+
+        if sys.version_info < (3, 13) and _tracker() != spec.tracker:
+            resource_tracker.unregister(memory._name, 'shared_memory')
+        return cls(spec, memory, owner=False)
+
+    def __len__(self) -> int:
+        return self.spec.length
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The table as a pandas DataFrame, with text columns decoded. Unlike
+         ``columns``, pandas may copy the data.
+
+        :return: pd.DataFrame
+        """
+        data = collections.OrderedDict()
+        for column, array in self.columns.items():
+            if column in self.spec.categories:
+                data[column] = pd.Categorical.from_codes(
+                    array, self.spec.categories[column])
+            else:
+                data[column] = array
+        return pd.DataFrame(data).set_index(self.spec.index)
+
+    def close(self):
+        """
+        Unmaps the segment, removing it when this is the owner
+        """
+        self.columns.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+
+table = None  # type: SharedTable
+
+
+def initializer(spec: SharedSpec):
+    """
+    A worker initializer attaching to a shared table, see ``worker_table``
+    """
+    global table
+    table = SharedTable.attach(spec)
+
+
+def worker_table() -> SharedTable:
+    """
+    The table attached by ``initializer`` in this worker
+    """
+    if table is None:
+        raise RuntimeError("No shared table was attached to this process")
+    return table
@@ -0,0 +1,164 @@
+# coding: utf-8
+"""
+Vectorized description of the slices produced by ``CAPPI._slice`` and
+ ``EarthNetworks._slice``.
+
+``rectangles`` gives the bounds of every slice, from which ``pyramid`` sums
+ them. ``labels`` and ``reduce`` are the pixel by pixel oracle the pyramid is
+ tested against: instead of copying every sub-matrix, each pixel of the
+ ``side`` x ``side`` box receives the index of the slices it belongs to. As
+ slices overlap (the shifted grids), there are 4 label layers, with -1
+ meaning the pixel is not covered by any slice of that layer. Slice indices
+ follow the same order as ``_slice``.
+"""
+__docformat__ = 'restructuredtext en'
+
+import functools
+
+import numpy as np
+
+
+def _layer(side: int, rows: slice, columns: slice, lines: int,
+           blocks: int, offset: int) -> np.ndarray:
+    """
+    Labels a single split of ``_slice``, i.e. ``_split(data[rows, columns],
+     lines, blocks)``.
+
+    :param side: side of the square box
+    :param rows: rows used by the split
+    :param columns: columns used by the split
+    :param lines: number of lines of the split
+    :param blocks: number of columns of the split
+    :param offset: index of the first slice in this split
+    :return: a (side, side) array of slice indices
+    """
+    output = np.full((side, side), -1, dtype=np.intp)
+
+    row_index = np.arange(side)[rows]
+    column_index = np.arange(side)[columns]
+
+    # np.vsplit and np.hsplit refuse unequal divisions, and so do we
+
+    if len(row_index) % lines or len(column_index) % blocks:
+        raise ValueError("%d windows do not split a %dx%d box equally" %
+                         (blocks, side, side))
+
+    line = np.arange(len(row_index)) // (len(row_index) // lines)
+    block = np.arange(len(column_index)) // (len(column_index) // blocks)
+
+    # _split walks the columns first and the lines inside each column
+
+    output[row_index[0]:row_index[-1] + 1,
+           column_index[0]:column_index[-1] + 1] = \
+        offset + block[np.newaxis, :] * lines + line[:, np.newaxis]
+    return output
+
+
+def _splits(windows: int, side: int):
+    """
+    Yields the four splits done by ``_slice`` as (rows, columns, lines,
+     blocks, offset), where ``offset`` is the index of the first slice of the
+     split.
+    """
+    window_size = (side // 2) // windows
+    odd_adjust = 1 if window_size % 5 else 0
+    shifted = slice(window_size + odd_adjust, -window_size)
+    full = slice(None)
+
+    offset = 0
+    for rows, columns, lines, blocks in ((full, full, windows, windows),
+                                         (shifted, full, windows - 1, windows),
+                                         (full, shifted, windows, windows - 1),
+                                         (shifted, shifted, windows - 1,
+                                          windows - 1)):
+        yield rows, columns, lines, blocks, offset
+        offset += lines * blocks
+
+
+@functools.lru_cache(maxsize=None)
+def labels(windows: int, side: int = 200) -> np.ndarray:
+    """
+    Returns a read-only (4, side, side) array with the slice index of every
+     pixel for each of the four splits done by ``_slice``.
+
+    :param windows: the same parameter given to ``_slice``
+    :param side: side of the square box
+    :return: np.ndarray
+    """
+    output = np.stack([_layer(side, rows, columns, lines, blocks, offset)
+                       for rows, columns, lines, blocks, offset
+                       in _splits(windows, side)])
+    output.flags.writeable = False
+    return output
+
+
+@functools.lru_cache(maxsize=None)
+def rectangles(windows: int, side: int = 200) -> np.ndarray:
+    """
+    Returns a read-only (slices, 4) array with the (top, bottom, left, right)
+     pixel bounds of every slice, bottom and right excluded.
+
+    :param windows: the same parameter given to ``_slice``
+    :param side: side of the square box
+    :return: np.ndarray
+    """
+    output = np.zeros((count(windows), 4), dtype=np.intp)
+    for rows, columns, lines, blocks, offset in _splits(windows, side):
+        top, bottom, _ = rows.indices(side)
+        left, right, _ = columns.indices(side)
+        if (bottom - top) % lines or (right - left) % blocks:
+            raise ValueError("%d windows do not split a %dx%d box equally" %
+                             (blocks, side, side))
+        height = (bottom - top) // lines
+        width = (right - left) // blocks
+
+        block, line = np.divmod(np.arange(lines * blocks), lines)
+        index = offset + np.arange(lines * blocks)
+        output[index, 0] = top + line * height
+        output[index, 1] = top + (line + 1) * height
+        output[index, 2] = left + block * width
+        output[index, 3] = left + (block + 1) * width
+
+    output.flags.writeable = False
+    return output
+
+
+def count(windows: int) -> int:
+    """
+    Number of slices created by ``_slice(windows)``
+
+    :param windows:
+    :return: int
+    """
+    return windows ** 2 + 2 * windows * (windows - 1) + (windows - 1) ** 2
+
+
+def reduce(data: np.ndarray, windows: int) -> np.ndarray:
+    """
+    Sums every slice of a (side, side) matrix, or of a (n, side, side) stack of
+     matrices, in a single vectorized pass. Equivalent to
+     ``_slice(windows)`` followed by summing each slice.
+
+    :param data: a (side, side) or (n, side, side) array
+    :param windows: the same parameter given to ``_slice``
+    :return: a (n_slices,) or (n, n_slices) array
+    """
+    data = np.asarray(data, dtype=np.float64)
+    stack = data.reshape((-1,) + data.shape[-2:])
+    layers = labels(windows, data.shape[-1]).reshape(4, -1)
+    total = count(windows)
+
+    output = np.zeros((stack.shape[0], total))
+    flat = stack.reshape(stack.shape[0], -1)
+    for layer in layers:
+        covered = layer >= 0
+        index = layer[covered]
+        # One bincount per layer: offsetting each matrix by ``total`` keeps the
+        # whole stack in a single call.
+        shift = (np.arange(stack.shape[0]) * total)[:, np.newaxis]
+        output += np.bincount((index + shift).ravel(),
+                              weights=flat[:, covered].ravel(),
+                              minlength=output.size).reshape(output.shape)
+
+    return output.reshape(data.shape[:-2] + (total,))
+
@@ -0,0 +1,189 @@
+# coding: utf-8
+"""
+Per-scan summaries of the Steiner processing, computed while each file is
+ still in memory, so time series over a whole archive are read from a single
+ small table instead of reopening every radar and Steiner file.
+
+Every row is a (scan, city) pair with:
+* date, city, file_name: the scan, the city box and the radar file;
+* valid: pixels of the box with an observation;
+* convective, stratiform: valid pixels of each Steiner class;
+* mean_dbz, max_dbz: reflectivity of the valid pixels, NaN without any;
+* mean_rain: mean rain rate of the valid pixels in mm/h, from the ZR lookup
+  table of the city, see ``geometry.Geometry.zr``, NaN without any.
+
+While processing, rows are saved every few files as part files next to the
+ summary file, see ``save_part``, so a checkpoint only writes its own rows.
+ ``combine`` then merges the parts into the summary file once.
+"""
+__docformat__ = 'restructuredtext en'
+
+import collections
+import glob
+import os
+
+import numpy as np
+
+# Every column and its dtype when saved
+
+columns = collections.OrderedDict([('date', 'datetime64[s]'),
+                                   ('city', 'U'),
+                                   ('file_name', 'U'),
+                                   ('valid', np.int32),
+                                   ('convective', np.int32),
+                                   ('stratiform', np.int32),
+                                   ('mean_dbz', np.float32),
+                                   ('max_dbz', np.float32),
+                                   ('mean_rain', np.float32)])
+
+
+def scan(radar) -> dict:
+    """
+    Summarizes the city box of a scan
+
+    :param radar: a CAPPI object after ``steiner_filter`` and
+     ``remove_borders``, or a crop of ``SteinerHandler``, still in dBZ
+    :return: a row of the summary table
+    """
+    valid = ~radar.mask
+    count = int(np.count_nonzero(valid))
+    convective = int(np.count_nonzero(valid & ~radar.steiner_mask))
+
+    if count:
+        dbz = radar.data[valid].astype(np.float64)
+        mean_dbz, max_dbz = dbz.mean(), dbz.max()
+        mean_rain = radar.geometry.zr(dbz).clip(min=0).mean()
+    else:
+        mean_dbz = max_dbz = mean_rain = np.nan
+
+    return {'date': np.datetime64(radar.date, 's'),
+            'city': radar.city.file_name, 'file_name': radar.file_name,
+            'valid': count, 'convective': convective,
+            'stratiform': count - convective, 'mean_dbz': mean_dbz,
+            'max_dbz': max_dbz, 'mean_rain': mean_rain}
+
+
+class Summary(object):
+    """
+    A columnar table of scan summaries, grown one row at a time and saved as a
+     compressed npz file with one array per column.
+    """
+
+    def __init__(self, data: dict = None):
+        self.data = collections.OrderedDict(
+            (column, list(data[column]) if data else []) for column in columns)
+
+    def __len__(self) -> int:
+        return len(self.data['date'])
+
+    def append(self, row: dict):
+        """
+        Adds a row, as built by ``scan``
+        """
+        for column, values in self.data.items():
+            values.append(row[column])
+
+    @classmethod
+    def concatenate(cls, summaries: list) -> 'Summary':
+        """
+        The rows of several summaries, a row replacing the earlier rows of the
+         same file and city
+        """
+        output = cls()
+        for summary in summaries:
+            for column, values in output.data.items():
+                values.extend(summary.data[column])
+
+        last = {key: row for row, key in enumerate(
+            zip(output.data['file_name'], output.data['city']))}
+        keep = sorted(last.values())
+        for column, values in output.data.items():
+            output.data[column] = [values[row] for row in keep]
+        return output
+
+    def arrays(self) -> collections.OrderedDict:
+        """
+        The columns as arrays, sorted by date and city
+        """
+        output = collections.OrderedDict(
+            (column, np.array(self.data[column], dtype=dtype))
+            for column, dtype in columns.items())
+        order = np.lexsort((output['city'], output['date']))
+        for column in output:
+            output[column] = output[column][order]
+        return output
+
+    def table(self):
+        """
+        The summary as a pandas DataFrame
+
+        :return: pd.DataFrame
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.arrays())
+
+    def save(self, file_name: str):
+        """
+        Saves the summary as a compressed npz file, atomically
+        """
+        temporary = file_name + '.tmp.npz'
+        np.savez_compressed(temporary, **self.arrays())
+        os.replace(temporary, file_name)
+
+    @classmethod
+    def load(cls, file_name: str) -> 'Summary':
+        """
+        Loads a summary saved by ``save``
+        """
+        with np.load(file_name) as data:
+            return cls({column: data[column].tolist() for column in columns})
+
+
+def part_names(file_name: str) -> list:
+    """
+    The part files of a summary file, in the order they were saved
+    """
+    stem = glob.escape(os.path.splitext(file_name)[0])
+    return sorted(glob.glob(stem + '.part-' + '[0-9]' * 6 + '.npz'))
+
+
+def save_part(summary: Summary, file_name: str) -> str:
+    """
+    Saves a summary as the next part file of a summary file
+
+    :param summary: the rows to save
+    :param file_name: the summary file
+    :return: the part file name
+    """
+    names = part_names(file_name)
+    index = int(names[-1][-10:-4]) + 1 if names else 0
+    output = '%s.part-%06d.npz' % (os.path.splitext(file_name)[0], index)
+    summary.save(output)
+    return output
+
+
+def read(file_name: str) -> Summary:
+    """
+    A summary file with its part files, either being optional
+    """
+    names = [file_name] if os.path.exists(file_name) else []
+    return Summary.concatenate([Summary.load(name) for name
+                                in names + part_names(file_name)])
+
+
+def combine(file_name: str) -> Summary:
+    """
+    Merges the part files into the summary file and removes them. A crash
+     leaves parts already merged, which merge again to the same rows.
+
+    :param file_name: the summary file
+    :return: the merged summary
+    """
+    parts = part_names(file_name)
+    output = read(file_name)
+    if parts or not os.path.exists(file_name):
+        output.save(file_name)
+    for name in parts:
+        os.remove(name)
+    return output
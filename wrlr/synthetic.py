@@ -0,0 +1,164 @@
+# coding: utf-8
+"""
+Synthetic radar and lightning data, in the same formats as the real files, so
+ the pipeline can be tested and benchmarked without the INPE data tree.
+"""
+__docformat__ = 'restructuredtext en'
+
+import gzip
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import cities
+from .cappi import CAPPI
+
+mask_value = -9999.0  # Value of pixels outside the radar range
+
+
+def radar_field(city: str, seed: int = 0, cells: int = 8) -> np.ndarray:
+    """
+    Creates a native CAPPI grid with stratiform rain, a few convective cells
+     reaching 55 dBZ, NaN pixels and ``mask_value`` outside the radar range.
+    The field is in the orientation it is stored in the files.
+
+    :param city: city code for a radar
+    :param seed: seed of the random generator
+    :param cells: number of convective cells
+    :return: a float32 np.ndarray shaped as the city grid
+    """
+    random = np.random.RandomState(seed)
+    lines, columns = cities.cities[city].shape
+    y, x = np.mgrid[0:lines, 0:columns].astype(np.float32)
+
+    # Smooth stratiform background between -15 and 25 dBZ
+
+    field = random.normal(5.0, 8.0, (lines // 8 + 1, columns // 8 + 1))
+    field = np.kron(field, np.ones((8, 8)))[:lines, :columns]
+    field = field.astype(np.float32)
+
+    for _ in range(cells):
+        center_y = random.uniform(0, lines)
+        center_x = random.uniform(0, columns)
+        radius = random.uniform(3, 15)
+        peak = random.uniform(35, 55)
+        distance = ((y - center_y) ** 2 + (x - center_x) ** 2) / radius ** 2
+        np.maximum(field, peak * np.exp(-distance), out=field)
+
+    field[random.uniform(size=field.shape) < 0.001] = np.nan
+
+    # Pixels outside the radar range, which includes the [2, 2] pixel that
+    # CAPPI.open reads the mask value from.
+
+    range_y, range_x = (lines - 1) / 2.0, (columns - 1) / 2.0
+    outside = ((y - range_y) / range_y) ** 2 + \
+              ((x - range_x) / range_x) ** 2 > 1
+    field[outside] = mask_value
+    return field
+
+
+def small_radar(shape: tuple = (100, 120), box_ul: tuple = (30, 40),
+                box_lr: tuple = (70, 80), seed: int = 1) -> CAPPI:
+    """
+    Creates a CAPPI object over a small random grid, as if it had been opened,
+     so the Steiner method runs fast. A fifth of the pixels are masked.
+
+    :param shape: the (lines, columns) of the grid
+    :param box_ul: the upper left pixel of the city box
+    :param box_lr: the lower right pixel of the city box
+    :param seed: seed of the random generator
+    :return: CAPPI
+    """
+    radar = CAPPI('BRU')
+    radar.y_size, radar.x_size = shape
+    radar.y_upper_left, radar.x_upper_left = box_ul
+    radar.y_lower_right, radar.x_lower_right = box_lr
+
+    random = np.random.RandomState(seed)
+    radar.mask_value = np.float32(-99)
+    radar.data = random.uniform(-15, 55, shape).astype(np.float32)
+    radar.data[random.uniform(size=shape) < 0.2] = radar.mask_value
+    radar.mask = radar.data == radar.mask_value
+    return radar
+
+
+def radar_tree(root: str, city: str, start: str = "2014-01-01 00:00:00",
+               periods: int = 8, step: str = "450s", seed: int = 0) -> list:
+    """
+    Writes gzip radar files in the same directory tree as the real data, i.e.
+     ``root/Radar/<folder>/<year>/<month>/RD_<id>_<date>.raw.gz``.
+
+    :param root: the directory containing ``Radar``
+    :param city: city code for a radar
+    :param start: date of the first scan
+    :param periods: number of scans
+    :param step: time between scans
+    :param seed: seed of the random generator
+    :return: the list of file names
+    """
+    folder = cities.cities[city].folder
+    output = []
+    for index, date in enumerate(pd.date_range(start, periods=periods,
+                                               freq=step)):
+        path = os.path.join(root, 'Radar', folder, date.strftime("%Y"),
+                            date.strftime("%m"))
+        os.makedirs(path, exist_ok=True)
+        file_name = os.path.join(path, "RD_%09d_%s.raw.gz" %
+                                 (index, date.strftime("%Y%m%d%H%M%S")))
+
+        field = radar_field(city, seed + index)
+        with gzip.open(file_name, 'wb', compresslevel=6) as data_file:
+            data_file.write(field.tobytes())
+        output.append(file_name)
+    return output
+
+
+def lightning(city: str, start: str = "2014-01-01 00:00:00",
+              end: str = "2014-01-01 01:00:00", events: int = 1000,
+              seed: int = 0) -> pd.DataFrame:
+    """
+    Creates Earth Networks events spread over (and slightly around) the city
+     box, sorted by time.
+
+    :param city: city code for a radar
+    :param start: date of the first event
+    :param end: date of the last event
+    :param events: number of events
+    :param seed: seed of the random generator
+    :return: pd.DataFrame with the same columns as the csv files
+    """
+    city = cities.cities[city]
+    random = np.random.RandomState(seed)
+
+    lat_margin = (city.lat_max - city.lat_min) * 0.1
+    lon_margin = (city.lon_max - city.lon_min) * 0.1
+    times = pd.to_datetime(np.sort(random.uniform(
+        pd.Timestamp(start).value, pd.Timestamp(end).value, events)))
+
+    return pd.DataFrame({
+        'id': np.arange(1, events + 1),
+        'tipo': np.where(random.uniform(size=events) < 0.3, 'CG', 'IC'),
+        'datahora': times.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        'latitude': random.uniform(city.lat_min - lat_margin,
+                                   city.lat_max + lat_margin, events),
+        'longitude': random.uniform(city.lon_min - lon_margin,
+                                    city.lon_max + lon_margin, events),
+        'pico_corrente': random.choice(['-12.5', '8.1', '-30.2', 'None'],
+                                       events),
+        'multiplicidade': random.randint(1, 6, events),
+        'geom': 'POINT'})
+
+
+def lightning_csv(file_name: str, city: str, **kwargs) -> str:
+    """
+    Writes the events of ``lightning`` as an Earth Networks csv file.
+
+    :param file_name: the csv file name
+    :param city: city code for a radar
+    :param kwargs: passed to ``lightning``
+    :return: the file name
+    """
+    os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+    lightning(city, **kwargs).to_csv(file_name, sep=';', index=False)
+    return file_name
@@ -0,0 +1,88 @@
+# coding: utf-8
+"""
+Test for the association module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wrlr import association
+from wrlr import synthetic
+from wrlr.earthnetworks import EarthNetworks
+
+
+@pytest.fixture
+def events():
+    """
+    Fixture with flashes and pulses following them, plus a stray pulse
+    """
+    flashes = synthetic.lightning('BRU', events=200, seed=1)
+    flashes['datahora'] = pd.to_datetime(flashes.datahora)
+    flashes = flashes.set_index('id')
+
+    random = np.random.RandomState(2)
+    parent = np.repeat(flashes.index.values, 3)
+    pulses = pd.DataFrame({
+        'tipo': random.choice(['CG', 'IC'], len(parent)),
+        'datahora': flashes.datahora.values[parent - 1] +
+        pd.to_timedelta(random.uniform(0, 0.5, len(parent)), unit='s'),
+        'latitude': flashes.latitude.values[parent - 1] +
+        random.uniform(-0.02, 0.02, len(parent)),
+        'longitude': flashes.longitude.values[parent - 1] +
+        random.uniform(-0.02, 0.02, len(parent)),
+        'pico_corrente': '+', 'multiplicidade': 1, 'parent': parent})
+    stray = pulses.iloc[:1].assign(latitude=0.0, parent=-1)
+    pulses = pd.concat([pulses, stray]).sort_values('datahora')
+    pulses.index = pd.RangeIndex(1, len(pulses) + 1, name='id')
+    return flashes, pulses
+
+
+def test_associate(events):
+    """
+    Test if every pulse is given to its parent flash
+    :param events: fixture
+    """
+    flashes, pulses = events
+    index = association.associate(flashes, pulses)
+    found = np.where(index >= 0, flashes.index.values[index], -1)
+
+    # Flashes closer in time than the pulses spread may swap a few pulses
+    assert (found == pulses.parent.values).mean() > 0.95
+    assert found[pulses.parent.values == -1].tolist() == [-1]
+
+    summary = association.summarize(flashes,
+                                     pulses.assign(flash=found))
+    assert list(summary.columns) == ['tipo', 'multiplicidade', 'pulses',
+                                     'ic', 'cg']
+    assert summary.pulses.sum() == len(pulses) - 1
+    assert (summary.pulses == summary.ic + summary.cg).all()
+
+    with pytest.raises(ValueError):
+        association.associate(flashes.iloc[::-1], pulses)
+
+
+def test_stream(events, tmp_path):
+    """
+    Test if streaming small chunks gives the same summary as a single pass
+    :param events: fixture
+    """
+    flashes, pulses = events
+    flash_file = str(tmp_path / 'flash.csv')
+    pulse_file = str(tmp_path / 'pulse.csv')
+    for data, file_name in ((flashes, flash_file), (pulses, pulse_file)):
+        data.drop(columns='parent', errors='ignore').assign(
+            pico_corrente='1.0', geom='POINT').to_csv(file_name, sep=';')
+
+    reader = EarthNetworks('BRU')
+    reader.open(flash_file)
+    flashes = reader.data
+    reader.open(pulse_file)
+    pulses = reader.data
+    index = association.associate(flashes, pulses)
+    expected = association.summarize(flashes, pulses.assign(
+        flash=np.where(index >= 0, flashes.index.values[index], -1)))
+
+    output = association.stream(flash_file, pulse_file, 'BRU', chunksize=37)
+    assert output.sort_index().equals(expected.sort_index())
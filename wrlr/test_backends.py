@@ -0,0 +1,101 @@
+# coding: utf-8
+"""
+Test for the Steiner backends, run against every backend available here.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pytest
+
+from wrlr import backends
+from wrlr import differential
+from wrlr import synthetic
+from wrlr.cappi import SteinerParameters
+
+mask_value = np.float32(differential.mask_value)
+
+
+@pytest.fixture(scope='module')
+def cases():
+    """
+    Fixture with adversarial dBZ fields and their reference results
+    """
+    reference = backends.get('reference')
+    output = []
+    for case in differential.radar_cases(0, 48):
+        data = differential.decode(case.data).data
+        background = reference.background(data, mask_value)
+        output.append((data, background,
+                       reference.peak(data, background, mask_value,
+                                      SteinerParameters()),
+                       reference.surrounding(data, mask_value, (25, 30, 35,
+                                                                40))))
+    return output
+
+
+@pytest.mark.parametrize('name', backends.available())
+def test_kernels(cases, name):
+    """
+    Test if every kernel of a backend matches the reference one
+    """
+    backend = backends.get(name)
+    assert backend.name == name
+    parameters = SteinerParameters()
+    for data, background, peak, surrounding in cases:
+        output = np.empty(data.shape, dtype=np.float64)
+        assert backend.background(data, mask_value, output=output) is output
+        assert np.array_equal(output, background)
+
+        assert np.array_equal(
+            backend.peak(data, output, mask_value, parameters), peak)
+        assert np.array_equal(
+            backend.surrounding(data, mask_value, parameters.radius_bins),
+            surrounding)
+
+    with pytest.raises(ValueError):
+        backend.surrounding(data, mask_value, (10, 20, 30, 40, 50))
+
+
+def test_select(monkeypatch):
+    """
+    Test if backends are chosen by name, by configuration and by preference,
+     falling back to numpy
+    """
+    monkeypatch.delenv(backends.variable, raising=False)
+    assert backends.select().name == backends.preference[
+        [name in backends.available() for name in
+         backends.preference].index(True)]
+    assert backends.select('reference').name == 'reference'
+
+    monkeypatch.setenv(backends.variable, 'reference')
+    assert backends.select().name == 'reference'
+
+    monkeypatch.setattr(backends, '_registry', backends._registry.copy())
+    backends.register('missing', lambda: backends.get('nothing'),
+                      requires='a_module_that_does_not_exist')
+    assert 'missing' not in backends.available()
+    with pytest.warns(RuntimeWarning):
+        assert backends.select('missing').name == 'numpy'
+    with pytest.warns(RuntimeWarning):
+        assert backends.select('nothing').name == 'numpy'
+    backends.get.cache_clear()
+
+
+def test_selected_once(monkeypatch):
+    """
+    Test if a CAPPI object selects its backend once, and again only when
+     ``backend`` changes
+    """
+    calls = []
+    select = backends.select
+    monkeypatch.setattr(backends, 'select',
+                        lambda name=None: calls.append(name) or select(name))
+
+    radar = synthetic.small_radar((40, 50))
+    radar.steiner_filter()
+    radar.steiner_filter()
+    assert calls == [None]
+
+    radar.backend = 'reference'
+    radar.steiner_filter()
+    assert calls == [None, 'reference']
@@ -0,0 +1,116 @@
+# coding: utf-8
+"""
+Test for the sharded batch processing.
+"""
+__docformat__ = 'restructuredtext en'
+
+import json
+import os
+
+import pytest
+
+from wrlr import batch
+from wrlr import synthetic
+from wrlr.handler import CatalogEntry
+from wrlr.summary import Summary
+
+
+def test_parse_shard():
+    """
+    Test if shard specifications are validated
+    """
+    assert batch.parse_shard("2/4") == (2, 4)
+    for shard in ("4/4", "a/4", "1", "0/0"):
+        with pytest.raises(ValueError):
+            batch.parse_shard(shard)
+
+
+def test_assign():
+    """
+    Test if every file goes to exactly one shard, in a balanced and
+     deterministic way
+    """
+    catalog = [CatalogEntry(file="f%03d" % i, date=None, size=100 + i % 7,
+                            mtime=0) for i in range(50)]
+    shards = batch.assign(catalog, 3)
+
+    assert sorted(e.file for shard in shards for e in shard) == \
+        [e.file for e in catalog]
+    assert max(len(s) for s in shards) - min(len(s) for s in shards) <= 1
+    sizes = [sum(e.size for e in shard) for shard in shards]
+    assert max(sizes) - min(sizes) <= 106
+    assert batch.assign(list(reversed(catalog)), 3) == shards
+
+
+def test_run_merge(tmp_path):
+    """
+    Test if shards process disjoint files and merge cleanly
+    """
+    synthetic.radar_tree(str(tmp_path), 'PI', periods=3)
+    path = str(tmp_path / 'Radar' / 'PC')
+    output = str(tmp_path / 'manifests')
+
+    first = batch.run(['PI'], path, "0/2", output, start="2014-01-01")
+    with pytest.raises(ValueError):
+        batch.merge(str(tmp_path))
+    assert batch.merge(output)['missing_shards'] == [1]
+
+    second = batch.main(['run', 'PI', '--path', path, '--shard', '1/2',
+                         '--start', '2014-01-01',
+                         '--output', output])
+    assert len(first['files']) + len(second['files']) == 3
+
+    merged = batch.main(['merge', output])
+    assert merged['missing_shards'] == [] and merged['failed'] == []
+    assert merged['duplicated'] == []
+    assert all(os.path.exists(item['output']) for item in merged['files'])
+    summary = Summary.load(os.path.join(output, 'summary.npz'))
+    assert sorted(summary.data['file_name']) == \
+        [item['file'] for item in merged['files']]
+
+    # Running a finished shard again does not process anything
+    assert batch.run(['PI'], path, "0/2", output,
+                     start="2014-01-01")['files'] == first['files']
+
+
+def test_resume(tmp_path):
+    """
+    Test if an interrupted shard is merged from its journal, and if files
+     whose output is missing are processed again
+    """
+    synthetic.radar_tree(str(tmp_path), 'PI', periods=3)
+    path = str(tmp_path / 'Radar' / 'PC')
+    output = str(tmp_path / 'manifests')
+
+    first = batch.run(['PI'], path, "0/1", output)
+    assert not os.path.exists(batch.journal_name(output, 0, 1))
+
+    # A shard stopped after two files: its manifest is unfinished and the
+    # journal ends with a cut line
+    manifest = dict(first, finished=None, files=[])
+    batch.write_json(batch.manifest_name(output, 0, 1), manifest)
+    with open(batch.journal_name(output, 0, 1), 'w') as journal:
+        for item in first['files'][:2]:
+            journal.write(json.dumps(item) + '\n')
+        journal.write('{"file": ')
+    merged = batch.merge(output)
+    assert merged['unfinished_shards'] == [0]
+    assert merged['files'] == first['files'][:2]
+
+    os.remove(first['files'][0]['output'])
+    second = batch.run(['PI'], path, "0/1", output)
+    assert os.path.exists(first['files'][0]['output'])
+    assert second['files'][0]['seconds'] != first['files'][0]['seconds']
+    assert second['files'][1] == first['files'][1]
+    assert second['files'][2]['seconds'] != first['files'][2]['seconds']
+    assert batch.merge(output)['unfinished_shards'] == []
+
+    # A file of the journal whose summary rows were lost is processed again
+    summary_file = batch.summary_name(output, 0, 1)
+    rows = Summary.load(summary_file).data
+    Summary({column: values[1:] for column, values in rows.items()}).save(
+        summary_file)
+    third = batch.run(['PI'], path, "0/1", output, checkpoint=1)
+    assert third['files'][0]['seconds'] != second['files'][0]['seconds']
+    assert third['files'][1:] == second['files'][1:]
+    assert len(Summary.load(summary_file)) == 3
@@ -6,7 +6,8 @@ __docformat__ = 'restructuredtext en'
 
 import pytest
 
-import cappi
+from wrlr import cappi
+from wrlr import synthetic
 
 @pytest.fixture
 def data():
@@ -69,3 +70,35 @@ def test_read(roque):
     assert (200, 200) == roque.data.shape
     assert (200, 200) == roque.steiner_mask.shape
 
+
+def test_steiner_sweep():
+    """
+    Test if the default parameters match the Steiner filter and if every set
+     of parameters gets its own mask
+    """
+    rad = synthetic.small_radar((50, 60), seed=3)
+    rad.steiner_filter()
+    reference = rad.steiner_mask.copy()
+
+    masks = rad.steiner_sweep(
+        {'default': cappi.SteinerParameters(),
+         'strict': cappi.SteinerParameters(intensity=50.0,
+                                           threshold_max=15.0),
+         'wide': cappi.SteinerParameters(radius_bins=(10, 15, 20, 25))})
+
+    assert list(masks) == ['default', 'strict', 'wide']
+    assert (masks['default'] == reference).all()
+    assert masks['strict'].sum() > reference.sum()
+    assert masks['wide'].sum() < reference.sum()
+
+
+def test_steiner_file_name(data):
+    """
+    Test if labelled Steiner files are named side by side
+    :param data: fixture
+    """
+    assert data.steiner_file_name().endswith("20140112213700.npy.gz")
+    assert data.steiner_file_name('a').endswith("20140112213700.a.npy.gz")
+    assert "/Steiner/" in data.steiner_file_name('a')
+    with pytest.raises(ValueError):
+        data.steiner_file_name('a_b')
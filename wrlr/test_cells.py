@@ -0,0 +1,80 @@
+# coding: utf-8
+"""
+Test for the cells module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import types
+
+import numpy as np
+import pandas as pd
+
+from wrlr import cells
+from wrlr import cities
+from wrlr.earthnetworks import EarthNetworks
+
+
+def scan(date: str, boxes: list):
+    """
+    A radar scan with a convective square for each (top, left, size, dbz)
+    """
+    data = np.full((200, 200), 10.0)
+    steiner_mask = np.ones((200, 200), dtype=bool)
+    for top, left, size, dbz in boxes:
+        data[top:top + size, left:left + size] = dbz
+        steiner_mask[top:top + size, left:left + size] = False
+    return types.SimpleNamespace(data=data, steiner_mask=steiner_mask,
+                                 mask=np.zeros((200, 200), dtype=bool),
+                                 date=pd.Timestamp(date),
+                                 city=cities.cities['PI'])
+
+
+def test_label():
+    """
+    Test if diagonal pixels are connected and small cells dropped
+    """
+    convective = np.zeros((10, 10), dtype=bool)
+    convective[1, 1] = convective[2, 2] = True
+    convective[6:9, 6:9] = True
+    labels, count = cells.label(convective, minimum=3)
+    assert count == 1
+    assert labels[1, 1] == 0 and labels[7, 7] == 1
+
+
+def test_tracking():
+    """
+    Test if cells keep their track when moving and splitting
+    """
+    lightning = EarthNetworks('PI')
+    city = cities.cities['PI']
+    lat_step = (city.lat_max - city.lat_min) / 200
+    lon_step = (city.lon_max - city.lon_min) / 200
+    lightning.data = pd.DataFrame(
+        {'datahora': pd.to_datetime(['2014-01-01 00:08', '2014-01-01 00:09']),
+         'latitude': [city.lat_min + 22.5 * lat_step] * 2,
+         'longitude': [city.lon_min + 32.5 * lon_step] * 2,
+         'multiplicidade': [2, 1]})
+    tracker = cells.CellTracker('PI', lightning=lightning)
+
+    tracker.update(scan('2014-01-01 00:00', [(10, 10, 20, 50.0),
+                                             (100, 100, 10, 40.0)]))
+    tracker.update(scan('2014-01-01 00:07:30', [(15, 20, 20, 55.0)]))
+    tracker.update(scan('2014-01-01 00:15', [(15, 20, 8, 45.0),
+                                             (15, 32, 8, 60.0),
+                                             (150, 150, 5, 30.0)]))
+    table = tracker.table()
+
+    assert list(table.columns) == list(cells.CellTracker.columns)
+    first, second, third = (table[table.date == date] for date in
+                            sorted(table.date.unique()))
+    assert first.track.tolist() == [1, 2]
+    assert first.area.tolist() == [400, 100]
+    assert second.track.tolist() == [1]
+    assert second.max_dbz.tolist() == [55.0]
+    assert second.flashes.tolist() == [3]
+    assert second.row.tolist() == [24.5]
+
+    # Both halves overlap the same cell equally, the first one keeps the track
+    assert third.track.tolist() == [1, 3, 4]
+    assert third.lifetime.tolist()[:2] == [pd.Timedelta('15m'),
+                                           pd.Timedelta(0)]
@@ -0,0 +1,85 @@
+# coding: utf-8
+"""
+Test for the Climatology class and related methods.
+"""
+__docformat__ = 'restructuredtext en'
+
+import os
+
+import numpy as np
+import pytest
+
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+from wrlr.climatology import Climatology, ClimatologyHandler
+
+
+@pytest.fixture
+def files(tmp_path):
+    """
+    Fixture with three synthetic radar files and their Steiner masks
+    """
+    output = synthetic.radar_tree(str(tmp_path), 'PI', periods=3)
+    for file in output:
+        radar = CAPPI('PI')
+        radar.file_name = file
+        radar.open()
+        mask = (radar.data < 35).astype(int)
+        os.makedirs(os.path.dirname(radar.steiner_file_name()), exist_ok=True)
+        np.savetxt(radar.steiner_file_name(), mask, fmt='%d')
+    return output
+
+
+def test_update(files):
+    """
+    Test if accumulators match statistics computed directly
+    :param files: fixture
+    """
+    climatology = Climatology('PI')
+    stack = []
+    for file in files:
+        radar = CAPPI('PI')
+        radar.file_name = file
+        radar.open()
+        radar.load_steiner()
+        radar.remove_borders()
+        climatology.update(radar)
+        stack.append(np.where(radar.mask, np.nan, radar.data))
+
+    stack = np.array(stack)
+    assert climatology.scans == 3
+    assert (climatology.valid == np.isfinite(stack).sum(axis=0)).all()
+    assert (climatology.exceedance[2] == (stack > 40).sum(axis=0)).all()
+    assert (climatology.convective == (stack >= 35).sum(axis=0)).all()
+    assert (climatology.histogram.sum(axis=0) == climatology.valid).all()
+
+    maximum = np.nanmax(stack, axis=0)
+    upper = climatology.percentile(100)
+    valid = climatology.valid > 0
+    assert (upper[valid] > maximum[valid]).all()
+    assert (upper[valid] - maximum[valid] <= 1).all()
+    assert np.isnan(upper[~valid]).all()
+
+
+def test_parallel(files, tmp_path):
+    """
+    Test if merged partial states match a single pass, and persist
+    :param files: fixture
+    """
+    path = str(tmp_path / 'Radar')
+    serial = ClimatologyHandler('PI', path).process(workers=0)
+    handler = ClimatologyHandler('PI', path)
+    parallel = handler.process(workers=2, chunk=1)
+
+    assert parallel.scans == serial.scans == 3
+    assert (parallel.histogram == serial.histogram).all()
+    assert np.allclose(parallel.rain, serial.rain)
+
+    loaded = Climatology.load(handler.save(str(tmp_path / 'output')))
+    assert loaded.city == 'PI'
+    assert (loaded.exceedance == parallel.exceedance).all()
+    assert np.allclose(np.nan_to_num(loaded.mean_rain()),
+                       np.nan_to_num(parallel.mean_rain()))
+
+    with pytest.raises(ValueError):
+        loaded.merge(Climatology('SR'))
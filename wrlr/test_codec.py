@@ -0,0 +1,75 @@
+# coding: utf-8
+"""
+Test for the quantized codec.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pytest
+
+from wrlr import codec
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+from wrlr.workspace import Workspace
+
+
+@pytest.fixture
+def radar(tmp_path):
+    """
+    Fixture with an opened synthetic radar file
+    """
+    output = CAPPI('PI')
+    output.file_name = synthetic.radar_tree(str(tmp_path), 'PI', periods=1)[0]
+    output.open()
+    return output
+
+
+@pytest.mark.parametrize('name', ['DBZ8', 'DBZ16'])
+def test_round_trip(radar, name):
+    """
+    Test if the quantization error stays within the documented bound
+    """
+    field = getattr(codec, name)
+    encoded = field.encode(radar.data, radar.mask, radar.mask_value)
+    assert len(encoded) < radar.data.nbytes / 2
+
+    mask = np.empty(radar.data.shape, dtype=bool)
+    output = np.empty(radar.data.shape, dtype=np.float32)
+    assert codec.decode(encoded, output, mask) is output
+
+    assert (mask == radar.mask).all()
+    assert (output[mask] == radar.mask_value).all()
+    error = np.abs(output[~mask] - radar.data[~mask])
+    assert error.max() <= field.error + 1e-4
+
+
+def test_edges():
+    """
+    Test if NaNs are no-data and values out of range are clipped
+    """
+    data = np.array([[np.nan, -40.0, 0.26, 500.0]])
+    output = codec.decode(codec.DBZ8.encode(data, mask_value=-99.0))
+    assert output.tolist() == [[-99.0, -15.0, 0.5, codec.DBZ8.maximum]]
+
+    with pytest.raises(ValueError):
+        codec.Codec(12)
+    with pytest.raises(ValueError):
+        codec.decode(b'something else entirely, not a field')
+
+
+@pytest.mark.parametrize('workspace', [True, False])
+def test_load(radar, tmp_path, workspace):
+    """
+    Test if a CAPPI object is filled from an encoded file, with and without a
+     workspace
+    """
+    file_name = str(tmp_path / 'field.wrq')
+    codec.save(radar, file_name)
+
+    loaded = CAPPI('PI')
+    if workspace:
+        loaded.workspace = Workspace()
+    codec.load(loaded, file_name)
+    assert loaded.mask_value == radar.mask_value
+    assert (loaded.mask == radar.mask).all()
+    assert np.allclose(loaded.data, radar.data, atol=codec.DBZ8.error + 1e-4)
@@ -0,0 +1,57 @@
+# coding: utf-8
+"""
+Test for the coincidence module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+
+from wrlr import coincidence
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+
+
+def test_nearest():
+    """
+    Test if times find their nearest date
+    """
+    dates = pd.to_datetime(['2014-01-01 00:00', '2014-01-01 00:10']).values
+    times = pd.to_datetime(['2013-12-31 23:00', '2014-01-01 00:04',
+                            '2014-01-01 00:05', '2014-01-01 00:06',
+                            '2014-01-01 00:12']).values
+    assert coincidence.nearest(dates, times).tolist() == [0, 0, 0, 1, 1]
+    assert coincidence.nearest(dates, times, '3m').tolist() == \
+        [-1, -1, -1, -1, 1]
+
+
+def test_process(tmp_path):
+    """
+    Test if every event gets the values of its pixel in its scan
+    """
+    files = synthetic.radar_tree(str(tmp_path), 'PI', periods=3, step="600s")
+    handler = coincidence.CoincidenceHandler('PI', str(tmp_path / 'Radar'))
+    data = synthetic.lightning('PI', end="2014-01-01 00:35:00", events=300)
+    data['datahora'] = pd.to_datetime(data.datahora)
+    handler.lightning.data = data.set_index('id')
+
+    table = handler.process(tolerance="300s")
+    assert len(table) == 300
+    assert (table.scan.isna() == (data.datahora >
+                                  pd.Timestamp('2014-01-01 00:25')).values).all()
+
+    radar = CAPPI('PI')
+    for number, file in enumerate(files):
+        radar.file_name = file
+        radar.open()
+        radar.load_steiner()
+        radar.remove_borders()
+        events = table[(table.scan == file) & (table.row >= 0)]
+        assert len(events)
+        values = radar.data[events.row, events.column].astype(np.float64)
+        valid = ~radar.mask[events.row, events.column]
+        assert np.array_equal(events.dbz.values[valid], values[valid])
+        assert events.dbz[~valid].isna().all()
+        assert (events.convective.values ==
+                valid & ~radar.steiner_mask[events.row, events.column]).all()
+    assert table.rain[table.dbz.notna()].ge(0).all()
@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+Test for the correlation module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+
+from wrlr import correlation
+
+
+def test_cross_correlation():
+    """
+    Test if the FFT correlation matches a direct computation and finds the lag
+    """
+    generator = np.random.RandomState(0)
+    flashes = generator.rand(300, 3)
+    rain = np.roll(flashes, 4, axis=0) + 0.1 * generator.rand(300, 3)
+    rain[:, 2] = 1.0  # constant
+
+    lags, curves = correlation.cross_correlation(rain, flashes, 6)
+    assert curves.shape == (3, 13)
+
+    for lag in (-3, 0, 4):
+        x = flashes[max(0, -lag):300 - max(0, lag), 0]
+        y = rain[max(0, lag):300 + min(0, lag), 0]
+        x = (x - flashes[:, 0].mean()) / flashes[:, 0].std()
+        y = (y - rain[:, 0].mean()) / rain[:, 0].std()
+        assert np.isclose(curves[0, lags == lag][0], (x * y).mean())
+
+    lag, value = correlation.best_lags(lags, curves)
+    assert lag.tolist() == [4, 4, 0]
+    assert value[0] > 0.9
+    assert np.isnan(value[2])
+
+
+def test_lag_table():
+    """
+    Test if a WRLR table is correlated for every window count
+    """
+    generator = np.random.RandomState(1)
+    starts = pd.date_range('2014-01-01', periods=100, freq='450s')
+    flashes = generator.poisson(3, size=(100, 9))
+    rain = np.roll(flashes, -2, axis=0) * 10.0
+
+    table = pd.DataFrame({'windows': 2,
+                          'start': np.repeat(starts, 9),
+                          'slice': np.tile(np.arange(9), 100),
+                          'rain': rain.ravel(),
+                          'flashes': flashes.ravel()})
+    best, curves = correlation.lag_table(table, max_lag=5)
+
+    assert (best.lag == -2).all()
+    assert (best.delay == pd.Timedelta('-900s')).all()
+    assert list(curves.columns) == list(range(-5, 6))
+    assert curves.index.names == ['windows', 'slice']
+
+
+def test_missing_window():
+    """
+    Test if lags are counted in time when windows are missing from the table
+    """
+    generator = np.random.RandomState(2)
+    starts = pd.date_range('2014-01-01', periods=100, freq='450s')
+    flashes = generator.poisson(3, size=(100, 9)).astype(np.float64)
+    rain = np.roll(flashes, 3, axis=0) * 10.0
+
+    table = pd.DataFrame({'start': np.repeat(starts, 9),
+                          'slice': np.tile(np.arange(9), 100),
+                          'rain': rain.ravel(),
+                          'flashes': flashes.ravel()})
+    table = table[~table.start.isin(starts[40:60:4])]
+
+    regular, rain_series, flashes_series = correlation.from_table(table)
+    assert len(regular) == 100
+    assert np.isnan(rain_series[40:60:4]).all()
+    assert np.isnan(rain_series).sum() == 5 * 9
+
+    best, curves = correlation.lag_table(table, max_lag=5)
+    assert (best.lag == 3).all()
+    assert (best.delay == pd.Timedelta('1350s')).all()
+    assert (best.correlation > 0.94).all()
@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+Test for the lightning density maps.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import ndimage
+
+from wrlr import circles
+from wrlr import density
+from wrlr.earthnetworks import EarthNetworks
+
+
+@pytest.mark.parametrize('kind, radius', [('gaussian', 1.5), ('disk', 3),
+                                          ('disk', 11), ('disk', 7)])
+def test_smooth(kind, radius):
+    """
+    Test if the FFT convolution matches a direct one, on every map of a stack
+    """
+    stack = np.random.RandomState(0).poisson(0.2, (3, 40, 50))
+    weights = density.kernel(kind, radius)
+    assert np.isclose(weights.sum(), 1)
+
+    output = density.smooth(stack, kind, radius, edges='zero')
+    assert output.shape == stack.shape
+    for index in range(len(stack)):
+        expected = ndimage.convolve(stack[index].astype(np.float64), weights,
+                                    mode='constant')
+        assert np.allclose(output[index], expected)
+
+    if kind == 'disk' and radius == 3:
+        assert (weights > 0).tolist() == circles.convective_radius[3].tolist()
+
+
+@pytest.mark.parametrize('kind', density.kinds)
+def test_isolated_stroke(kind):
+    """
+    Test if an isolated stroke is counted at its own pixel, for every radius
+    """
+    stack = np.zeros((30, 30))
+    stack[15, 15] = 1
+    radii = tuple(range(1, 13)) + (2.5,)
+    output = density.smooth_radii(stack, radii, kind)
+    assert (output[:, 15, 15] > 0).all()
+    output = density.smooth_radii(stack, radii, kind, edges='zero')
+    assert (output[:, 15, 15] >= output.max(axis=(1, 2)) - 1e-12).all()
+
+
+def test_edges():
+    """
+    Test if normalized edges keep a uniform map uniform and radii share the
+     cached spectra
+    """
+    stack = np.full((2, 30, 30), 4.0)
+    output = density.smooth_radii(stack, (1, 2, 3))
+    assert output.shape == (3, 2, 30, 30)
+    assert np.allclose(output, 4.0)
+
+    zero = density.smooth(stack, radius=2, edges='zero')
+    assert zero[0, 0, 0] < 4.0 and np.isclose(zero[0, 15, 15], 4.0)
+
+    hits = density.spectrum.cache_info().hits
+    density.smooth(stack, radius=2)
+    assert density.spectrum.cache_info().hits > hits
+
+    with pytest.raises(ValueError):
+        density.kernel('square', 2)
+    with pytest.raises(ValueError):
+        density.smooth(stack, edges='wrap')
+
+
+def test_counts():
+    """
+    Test if strokes are counted per pixel and [start, end) window
+    """
+    lightning = EarthNetworks('PI')
+    city = lightning.city
+    start = pd.Timestamp("2014-01-01 00:00:00")
+    lightning.data = pd.DataFrame({
+        'tipo': ['CG', 'CG', 'IC', 'CG', 'CG'],
+        'datahora': start + pd.to_timedelta([0, 600, 60, 1200, 700],
+                                            unit='s'),
+        'latitude': [city.lat_min + 0.001] * 4 + [city.lat_max + 1],
+        'longitude': [city.lon_min + 0.001] * 5,
+        'multiplicidade': [1, 2, 4, 8, 16]})
+
+    starts = start + pd.to_timedelta([0, 600, 0], unit='s')
+    ends = starts + pd.to_timedelta([600, 600, 1800], unit='s')
+    maps = density.counts(lightning, starts.values, ends.values, 'CG')
+    assert maps.shape == (3, 200, 200)
+    assert maps[:, 0, 0].tolist() == [1, 2, 11]
+    assert maps.sum() == 14
+
+    both = density.counts(lightning, starts.values, ends.values)
+    assert both[:, 0, 0].tolist() == [5, 2, 15]
@@ -0,0 +1,51 @@
+# coding: utf-8
+"""
+Test for the differential harness.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+
+from wrlr import differential
+
+
+def test_decode():
+    """
+    Test if raw fields are masked as radar files are
+    """
+    raw = np.full((20, 30), 30.0, dtype=np.float32)
+    raw[2, 2] = differential.mask_value
+    raw[5, 5] = np.nan
+    raw[6, 6] = -20.0
+    radar = differential.decode(raw)
+    assert radar.data.shape == (20, 30)
+    assert radar.mask.sum() == 3
+    assert (radar.data[radar.mask] == differential.mask_value).all()
+
+
+def test_steiner():
+    """
+    Test if the fast Steiner engines match the reference on every case
+    """
+    differences = differential.report(differential.run_steiner([0], side=40))
+    assert set(differences.case) == {'random', 'nan', 'intensity_edge',
+                                     'curve_edges', 'borders', 'masked',
+                                     'plateau'}
+    assert (differences.differing == 0).all()
+
+    # A wrong engine is caught
+    broken = {'broken': lambda radar: radar.mask}
+    differences = differential.run_steiner([0], side=40, engines=broken)
+    assert any(difference.differing for difference in differences)
+    assert differences[0].first
+
+
+def test_raster():
+    """
+    Test if the rasterizers match ``to_matrix`` on every case, including
+     events sharing a pixel and events outside the box
+    """
+    differences = differential.report(differential.run_raster([0]))
+    assert set(differences.case) >= {'duplicates/CG', 'duplicates/IC',
+                                     'outside/CG', 'outside/IC'}
+    assert (differences.differing == 0).all()
@@ -5,9 +5,9 @@ Test for the EarthNetworks class and related methods.
 __docformat__ = 'restructuredtext en'
 
 import pytest
-import cities
+from wrlr import cities
 
-import earthnetworks
+from wrlr import earthnetworks
 
 
 @pytest.fixture
@@ -0,0 +1,82 @@
+# coding: utf-8
+"""
+Test for the city geometries.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pytest
+
+from wrlr import cities
+from wrlr import geometry
+from wrlr.cappi import CAPPI
+from wrlr.earthnetworks import EarthNetworks
+
+
+@pytest.mark.parametrize('city', cities.valid_cities)
+def test_shared(city):
+    """
+    Test if every object of a city holds the same read-only grids, with
+     latitudes along rows and longitudes along columns
+    """
+    radar, lightning = CAPPI(city), EarthNetworks(city)
+    assert radar.geometry is lightning.geometry is geometry.get(city)
+    assert radar.latitude is lightning.latitude
+
+    info = cities.cities[city]
+    assert radar.latitude[0, 0] == radar.latitude[0, -1] == info.lat_min
+    assert radar.latitude[-1, 0] == info.lat_max
+    assert radar.longitude[0, 0] == radar.longitude[-1, 0] == info.lon_min
+    assert radar.longitude[0, -1] == info.lon_max
+
+    with pytest.raises(ValueError):
+        radar.latitude[0, 0] = 0
+
+    rows, columns = radar.geometry.box
+    assert (rows.start, columns.start) == info.box_ul
+    assert (rows.stop, columns.stop) == info.box_lr
+    assert radar.y_upper_left == lightning.y_upper_left == rows.start
+    assert radar.x_lower_right == lightning.x_lower_right == columns.stop
+
+
+def test_pixels():
+    """
+    Test if the pixels of the grid centers and of the box edges map back
+    """
+    box = geometry.get('PI')
+    rows, columns = np.indices((geometry.side, geometry.side))
+    latitude = box.city.lat_min + (rows + 0.5) / box.lat_scale
+    longitude = box.city.lon_min + (columns + 0.5) / box.lon_scale
+    found = box.to_pixels(latitude, longitude)
+    assert (found[0] == rows).all() and (found[1] == columns).all()
+
+    rows, columns = box.to_pixels([box.city.lat_max, box.city.lat_min],
+                                  [box.city.lon_min, box.city.lon_min])
+    assert rows.tolist() == [-1, 0] and columns.tolist() == [-1, 0]
+
+    lightning = EarthNetworks('PI')
+    assert lightning.remap(latitude[10, 20], longitude[10, 20]) == (10, 20)
+    assert lightning.remap(box.city.lat_max, box.city.lon_min) == (-1, -1)
+
+
+@pytest.mark.parametrize('city', ['BRU', 'PI'])
+def test_zr(city):
+    """
+    Test if the lookup table matches the ZR relationship of the city, across
+     the branch change of PI and out of the table
+    """
+    box = geometry.get(city)
+    dbz = np.array([-40.0, -15.01, -15.0, 0.0, 20.5, 35.99, 36.0, 36.01,
+                    55.0, 80.0, 85.0, 120.0])
+    assert np.allclose(box.zr(dbz), box.city.zr(dbz), rtol=1e-9)
+
+    dbz = np.array([35.996, 35.9999, 36.0001, 36.004, 36.006])
+    relative = np.abs(box.zr(dbz) / box.city.zr(dbz) - 1)
+    assert relative.max() < 2e-3
+
+    dbz = np.random.RandomState(0).uniform(-20.0, 90.0, 1000)
+    expected = box.city.zr(dbz)
+    output = box.zr(dbz)
+    assert (output[dbz < geometry.zr_min] == 0).all()
+    relative = np.abs(output[expected > 0] / expected[expected > 0] - 1)
+    assert relative.max() < 2e-3
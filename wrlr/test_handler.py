@@ -6,7 +6,7 @@ __docformat__ = 'restructuredtext en'
 
 import pytest
 
-import handler
+from wrlr import handler
 
 
 @pytest.fixture
@@ -0,0 +1,181 @@
+# coding: utf-8
+"""
+Test for the SteinerHandler class and related methods.
+"""
+__docformat__ = 'restructuredtext en'
+
+import gzip
+import os
+
+import numpy as np
+import pytest
+
+from wrlr import cappi
+from wrlr import cities
+from wrlr import handler_steiner
+from wrlr import summary
+from wrlr import synthetic
+
+
+def test_regions_merge():
+    """
+    Test if overlapping halos are merged and distant ones are kept apart
+    """
+    radars = [cappi.CAPPI('BRU'), cappi.CAPPI('PPR')]
+    assert len(cappi.CAPPI.regions(radars)) == 2
+
+    radars = [synthetic.small_radar(box_ul=(10, 10), box_lr=(40, 40)),
+              synthetic.small_radar(box_ul=(50, 50), box_lr=(90, 90))]
+    regions = cappi.CAPPI.regions(radars)
+    assert regions == [(slice(0, 100), slice(0, 106))]
+
+
+def test_region_filter():
+    """
+    Test if filtering only the halo gives the same mask inside the box
+    """
+    full = synthetic.small_radar()
+    full.steiner_filter()
+
+    region = synthetic.small_radar()
+    region.steiner_filter(cappi.CAPPI.regions([region]))
+
+    full.remove_borders()
+    region.remove_borders()
+    assert (full.steiner_mask == region.steiner_mask).all()
+
+
+@pytest.fixture
+def data(tmp_path):
+    """
+    Fixture with a single synthetic radar file shared by BRU and PPR
+    """
+    city = cities.cities['BRU']
+    radar = tmp_path / 'Radar' / 'BR_PP'
+    radar.mkdir(parents=True)
+
+    field = np.full(city.shape, -99.0, dtype=np.float32)
+    field[300:340, 300:700] = 45.0
+    with gzip.open(str(radar / 'RD_203022195_20140112213700.raw.gz'),
+                   'wb') as output:
+        output.write(field.tobytes())
+
+    return handler_steiner.SteinerHandler(('BRU', 'PPR'), str(radar))
+
+
+def test_shared_grid():
+    """
+    Test if cities with different radar files are refused
+    """
+    with pytest.raises(ValueError):
+        handler_steiner.SteinerHandler(('BRU', 'PI'), '')
+
+
+def test_process(data):
+    """
+    Test if a single pass saves the mask and fills the boxes of every city
+    :param data: fixture
+    """
+    crops = dict(data.crops)
+    data.process()
+
+    assert list(data.crops) == ['BRU', 'PPR']
+    for code, crop in data.crops.items():
+        assert crop is crops[code]
+        assert crop.data.shape == (200, 200)
+        assert crop.steiner_mask.shape == (200, 200)
+        assert (~crop.steiner_mask).any()
+
+        saved = cappi.CAPPI(code)
+        saved.file_name = data.files[0]
+        saved.open_steiner(label=code)
+        assert (saved.steiner_mask == crop.steiner_mask).all()
+
+    steiner = cappi.CAPPI('BRU')
+    steiner.file_name = data.files[0]
+    steiner.open_steiner()
+    assert steiner.steiner_mask.shape == (667, 1000)
+
+
+def test_sweep(data):
+    """
+    Test if every set of parameters is saved side by side
+    :param data: fixture
+    """
+    data.sweep({'default': cappi.SteinerParameters(),
+                'strict': cappi.SteinerParameters(intensity=50.0)})
+
+    for label in ('default', 'strict'):
+        steiner = cappi.CAPPI('BRU')
+        steiner.file_name = data.files[0]
+        steiner.open_steiner(label=label)
+        box = steiner.steiner_mask[281:481, 563:763]
+        assert (~box).any() == (label == 'default')
+
+
+def test_summary(data):
+    """
+    Test if every file adds a summary row per city, saved next to the Steiner
+     files
+    :param data: fixture
+    """
+    data.process()
+
+    table = summary.Summary.load(data.summary_file_name()).arrays()
+    assert list(table['city']) == ['BRU', 'PPR']
+    assert (table['valid'] == table['convective'] + table['stratiform']).all()
+    for code, crop in data.crops.items():
+        row = list(table['city']).index(code)
+        valid = ~crop.mask
+        assert table['valid'][row] == valid.sum()
+        assert table['convective'][row] == (valid & ~crop.steiner_mask).sum()
+        if valid.any():
+            assert table['max_dbz'][row] == 45.0
+            assert np.isclose(table['mean_rain'][row],
+                              crop.geometry.zr(np.array([45.0]))[0])
+
+    # Processing the file again replaces its rows
+    data.process()
+    again = summary.Summary.load(data.summary_file_name())
+    assert len(again) == 2
+
+
+def test_summary_checkpoint(data):
+    """
+    Test if the summary is saved while processing, so the rows of finished
+     files survive a crash
+    :param data: fixture
+    """
+    data.list_files()
+    data.checkpoint = 1
+    missing = data.files[0] + '.missing'
+    with pytest.raises(OSError):
+        data.process([data.files[0], missing])
+
+    file_name = data.summary_file_name()
+    assert len(summary.part_names(file_name)) == 1
+    table = summary.read(file_name)
+    assert len(table) == 2 and set(table.data['file_name']) == {data.files[0]}
+
+    data.process(data.files[:1])
+    assert summary.part_names(file_name) == []
+    assert len(summary.Summary.load(file_name)) == 2
+
+
+def test_single_city(data):
+    """
+    Test if a single city is still filtered over the whole grid, without box
+     files
+    :param data: fixture
+    """
+    single = handler_steiner.SteinerHandler('BRU', data.path)
+    assert single.regions is None
+    single.process()
+
+    steiner = cappi.CAPPI('BRU')
+    steiner.file_name = single.files[0]
+    steiner.open_steiner()
+    outside = ~steiner.steiner_mask
+    outside[281:481, 563:763] = False
+    assert outside.any()
+    assert not os.path.exists(steiner.steiner_file_name('BRU'))
@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+Test for the WRLRHandler class and related methods.
+"""
+__docformat__ = 'restructuredtext en'
+
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wrlr import cities
+from wrlr import handler_wrlr
+
+
+@pytest.fixture
+def data(tmp_path):
+    """
+    Fixture with two synthetic radar files and their Steiner masks
+    """
+    city = cities.cities['PI']
+    radar = tmp_path / 'Radar' / 'PC'
+    steiner = tmp_path / 'Steiner' / 'PC'
+    radar.mkdir(parents=True)
+    steiner.mkdir(parents=True)
+
+    for date in ('20140101000100', '20140101001100'):
+        field = np.full(city.shape, -99.0, dtype=np.float32)
+        field[200:300, 200:300] = 45.0
+        name = 'RD_202082071_%s.raw.gz' % date
+        with gzip.open(str(radar / name), 'wb') as output:
+            output.write(field.tobytes())
+        mask = np.ones(city.shape)
+        mask[200:300, 200:300] = 0
+        np.savetxt(str(steiner / name.replace('raw.gz', 'npy.gz')), mask,
+                   fmt='%d')
+
+    output = handler_wrlr.WRLRHandler('PI', str(radar))
+    output.lightning.data = pd.DataFrame(
+        {'tipo': ['CG', 'CG', 'IC', 'CG'],
+         'datahora': pd.to_datetime(['2014-01-01 00:02', '2014-01-01 00:05',
+                                     '2014-01-01 00:06', '2014-01-01 05:00']),
+         'latitude': [-21.7, -21.7, -21.7, -21.7],
+         'longitude': [-43.3, -43.3, -43.3, -43.3],
+         'multiplicidade': [2, 1, 4, 1]})
+    return output
+
+
+def test_process(data):
+    """
+    Test if rain and lightning are joined over the same windows
+    :param data: fixture
+    """
+    table = data.process("30m", "600s", flash_type='CG')
+
+    assert list(table.columns) == ['start', 'slice', 'rain', 'flashes',
+                                   'ratio']
+    assert len(table) % 49 == 0
+
+    window = table[table.start == pd.Timestamp('2014-01-01 00:00')]
+    assert window.flashes.sum() > 0
+    assert window.rain.sum() > 0
+    # The single CG location is covered by one slice per split at most
+    assert window.flashes.max() == 3
+    assert np.isnan(table.ratio[table.flashes == 0]).all()
+
+
+def test_count_flashes(data):
+    """
+    Test if strokes are counted in overlapping windows
+    :param data: fixture
+    """
+    starts = pd.to_datetime(['2014-01-01 00:00', '2014-01-01 00:04'])
+    ends = pd.to_datetime(['2014-01-01 00:10', '2014-01-01 00:14'])
+    counts = data.count_flashes(starts.values, ends.values, ('CG', 'IC'))
+    assert counts.shape == (2, 49)
+    assert counts[0].max() == 7
+    assert counts[1].max() == 5
+
+
+def test_process_windows(data):
+    """
+    Test if several window counts come from the same pass
+    :param data: fixture
+    """
+    single = data.process("30m", "600s", flash_type='CG')
+
+    data.windows = (2, 4)
+    assert data.rain is None
+    table = data.process("30m", "600s", flash_type='CG')
+
+    assert list(table.columns) == ['windows', 'start', 'slice', 'rain',
+                                   'flashes', 'ratio']
+    four = table[table.windows == 4].reset_index(drop=True)
+    assert np.allclose(four.rain, single.rain)
+    assert (four.flashes == single.flashes).all()
+    assert len(table[table.windows == 2]) == len(four) // 49 * 9
@@ -0,0 +1,76 @@
+# coding: utf-8
+"""
+Test for the instrumentation layer.
+"""
+__docformat__ = 'restructuredtext en'
+
+import io
+import json
+
+import pytest
+
+from wrlr import instrument
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+
+
+@pytest.fixture
+def stream():
+    """
+    Fixture enabling the instrumentation, and disabling it afterwards
+    """
+    output = io.StringIO()
+    yield output
+    instrument.disable()
+
+
+def test_disabled():
+    """
+    Test if nothing is recorded while disabled
+    """
+    assert instrument.recorder is None
+    with instrument.stage('nothing'):
+        instrument.count('nothing', files=1)
+    assert instrument.disable() == []
+
+
+def test_stages(stream, tmp_path):
+    """
+    Test if stages, counters and files per second are written as JSON lines
+    :param stream: fixture
+    """
+    files = synthetic.radar_tree(str(tmp_path), 'PI', periods=2)
+    instrument.enable(stream, calls=True)
+
+    radar = CAPPI('PI')
+    for file in files:
+        radar.open(file)
+        radar.remove_borders()
+        radar.to_zr()
+
+    summary = {record['stage']: record for record in instrument.disable()}
+    assert summary['cappi.open']['calls'] == 2
+    assert summary['cappi.open']['files'] == 2
+    assert summary['cappi.open']['bytes_inflated'] == 2 * radar.data_size
+    assert summary['cappi.open']['files_per_second'] > 0
+    assert summary['cappi.to_zr']['cpu'] >= 0
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 4 + len(summary)
+
+
+def test_profiler(stream):
+    """
+    Test if the sampling profiler reports the busy function
+    :param stream: fixture
+    """
+    def busy():
+        total = 0
+        for value in range(2000000):
+            total += value
+        return total
+
+    instrument.enable(stream, profiler=instrument.SamplingProfiler(0.001))
+    busy()
+    records = instrument.disable()
+    assert any(record.get('profile') == 'busy' for record in records)
@@ -0,0 +1,54 @@
+# coding: utf-8
+"""
+Test for the package layout and its import cost.
+"""
+__docformat__ = 'restructuredtext en'
+
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+import wrlr
+from wrlr import benchmark
+from wrlr import cities
+
+
+def test_lazy():
+    """
+    Test if the package loads its modules on first use only
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(wrlr.__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c',
+         'import sys, wrlr; print(sorted(name for name in sys.modules '
+         'if name.startswith(("wrlr.", "numpy", "pandas"))))'],
+        cwd=root, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    assert output.stdout.strip() == '[]'
+
+    from wrlr.cappi import CAPPI
+    assert wrlr.CAPPI is CAPPI
+    assert wrlr.cappi.CAPPI is CAPPI
+    with pytest.raises(AttributeError):
+        wrlr.nothing
+
+
+@pytest.mark.parametrize('module', benchmark.worker_modules)
+def test_import_budget(module):
+    """
+    Test if worker modules import fast and without heavy dependencies
+    """
+    result = min((benchmark.import_time(module) for _ in range(3)),
+                 key=lambda result: result['seconds'])
+    assert result['loaded'] == []
+    assert result['seconds'] < benchmark.import_budget
+
+
+def test_pickle():
+    """
+    Test if cities can be sent to worker processes
+    """
+    city = pickle.loads(pickle.dumps(cities.cities['SR']))
+    assert city == cities.cities['SR']
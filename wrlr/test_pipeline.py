@@ -0,0 +1,76 @@
+# coding: utf-8
+"""
+Test for the staged pipeline.
+"""
+__docformat__ = 'restructuredtext en'
+
+import random
+import time
+
+import numpy as np
+import pytest
+
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+from wrlr.handler_steiner import SteinerHandler
+from wrlr.pipeline import Pipeline, Stage, SteinerPipeline
+
+
+def slow_double(value):
+    time.sleep(random.uniform(0, 0.01))
+    return 2 * value
+
+
+def fail_on_ten(value):
+    if value == 10:
+        raise KeyError(value)
+    return value
+
+
+def test_order():
+    """
+    Test if outputs keep the order of the items with concurrent stages
+    """
+    pipeline = Pipeline([Stage('double', slow_double, 4),
+                         Stage('increment', lambda v: v + 1, 3)], maxsize=1)
+    assert list(pipeline.run(range(50))) == [2 * v + 1 for v in range(50)]
+
+
+def test_processes():
+    """
+    Test if stages may run in processes
+    """
+    pipeline = Pipeline([Stage('double', slow_double, 2, True)])
+    assert list(pipeline.run(range(10))) == list(range(0, 20, 2))
+
+
+def test_failure():
+    """
+    Test if an exception stops the pipeline once its item is reached
+    """
+    output = []
+    with pytest.raises(KeyError):
+        for value in Pipeline([Stage('double', slow_double, 2),
+                               Stage('fail', fail_on_ten, 2)]).run(range(20)):
+            output.append(value)
+    assert output == list(range(0, 10, 2))
+
+
+def test_steiner_pipeline(tmp_path):
+    """
+    Test if the pipeline saves the same masks as SteinerHandler
+    """
+    files = synthetic.radar_tree(str(tmp_path), 'PI', periods=3)
+    path = str(tmp_path / 'Radar')
+
+    pipeline = SteinerPipeline('PI', path, {'compute': 2, 'decode': 2})
+    output = pipeline.process()
+    assert len(output) == 3
+    masks = [np.loadtxt(name) for name in output]
+
+    SteinerHandler('PI', path).process()
+    for file, mask in zip(files, masks):
+        radar = CAPPI('PI')
+        radar.file_name = file
+        radar.open_steiner()
+        assert (radar.steiner_mask == mask.astype(bool)).all()
@@ -0,0 +1,53 @@
+# coding: utf-8
+"""
+Test for the pyramid module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pytest
+
+from wrlr import pyramid
+from wrlr import slices
+from wrlr.cappi import CAPPI
+
+
+def test_reduce():
+    """
+    Test if every window count of a pyramid matches the slices of _slice
+    """
+    data = np.random.RandomState(0).rand(200, 200)
+    tree = pyramid.Pyramid(data, windows=(2, 4, 5, 10))
+
+    radar = CAPPI.__new__(CAPPI)
+    radar.data = data
+    for windows in (2, 4, 5, 10):
+        radar._slice(windows)
+        expected = [piece.sum() for piece in radar.slices]
+        assert np.allclose(tree.reduce(windows), expected)
+        assert np.allclose(tree.level(windows),
+                           data.reshape(windows, 200 // windows,
+                                        windows, 200 // windows).sum((1, 3)))
+
+
+def test_stack():
+    """
+    Test if a stack of fields is reduced at once
+    """
+    data = np.random.RandomState(1).rand(3, 200, 200)
+    tree = pyramid.Pyramid(data, windows=4)
+
+    assert tree.blocks.shape == (3, 8, 8)
+    assert np.allclose(tree.reduce(4), slices.reduce(data, 4))
+    with pytest.raises(ValueError):
+        tree.reduce(5)
+
+
+def test_cells():
+    """
+    Test if pixels fall in the cells they are summed into
+    """
+    cuts = pyramid.edges(4)
+    rows, columns = pyramid.cells([0, 25, 199, -1], [24, 50, 176, 3], cuts)
+    assert rows.tolist() == [0, 1, 7, -1]
+    assert columns.tolist() == [0, 2, 7, -1]
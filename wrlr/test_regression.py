@@ -0,0 +1,117 @@
+# coding: utf-8
+"""
+Test for the regression module.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wrlr import regression
+
+
+@pytest.fixture
+def cells():
+    """
+    Fixture with cells following rain = 100 * flashes ** 1.5
+    """
+    generator = np.random.RandomState(0)
+    flashes = generator.randint(0, 50, size=(40, 49))
+    rain = 100.0 * flashes ** 1.5 * 10 ** generator.normal(0, 0.05,
+                                                           flashes.shape)
+    return rain, flashes
+
+
+def test_fit(cells):
+    """
+    Test if the parameters are recovered
+    :param cells: fixture
+    """
+    rain, flashes = cells
+    wrlr, intercept, slope = regression.fit(rain, flashes)
+    assert wrlr == pytest.approx(rain.sum() / flashes.sum())
+    assert intercept == pytest.approx(2.0, abs=0.05)
+    assert slope == pytest.approx(1.5, abs=0.05)
+
+    # The weighted fit matches an ordinary least squares fit
+    valid = flashes > 0
+    expected = np.polyfit(np.log10(flashes[valid]), np.log10(rain[valid]), 1)
+    assert np.allclose([slope, intercept], expected)
+
+
+def test_bootstrap(cells):
+    """
+    Test if resamples only depend on the seed
+    :param cells: fixture
+    """
+    rain, flashes = cells
+    serial = regression.bootstrap(rain, flashes, 60, seed=3, workers=0,
+                                  chunk=25, batch=7)
+    parallel = regression.bootstrap(rain, flashes, 60, seed=3, workers=2,
+                                    chunk=25)
+    assert serial.shape == (60, 3)
+    assert np.array_equal(serial, parallel)
+    assert not np.array_equal(serial, regression.bootstrap(
+        rain, flashes, 60, seed=4, workers=0, chunk=25))
+
+
+def test_report(cells):
+    """
+    Test if every city gets an interval around its estimate
+    :param cells: fixture
+    """
+    rain, flashes = cells
+    table = pd.DataFrame({'rain': rain.ravel(), 'flashes': flashes.ravel()})
+    output = regression.report({'BRU': table, 'PPR': (rain / 2, flashes)},
+                               resamples=50, workers=0)
+
+    assert list(output.index.get_level_values('city').unique()) == ['BRU',
+                                                                   'PPR']
+    assert (output.lower <= output.estimate).all()
+    assert (output.estimate <= output.upper).all()
+    assert output.loc[('PPR', 'wrlr'), 'estimate'] == \
+        pytest.approx(output.loc[('BRU', 'wrlr'), 'estimate'] / 2)
+
+    with pytest.raises(ValueError):
+        regression.report({'XYZ': table})
+
+
+def test_block_bootstrap():
+    """
+    Test if resampling whole runs of time windows widens the intervals of
+     series that drift over time
+    """
+    generator = np.random.RandomState(1)
+    drift = np.repeat(10 ** generator.normal(0, 0.3, 10), 8)
+    flashes = generator.randint(1, 50, size=(80, 49))
+    rain = 100.0 * flashes * drift[:, np.newaxis]
+    starts = np.repeat(np.arange(80), 49)
+
+    cells = regression.bootstrap(rain, flashes, 200, workers=0)
+    blocks = regression.bootstrap(rain, flashes, 200, workers=0,
+                                  groups=starts, block=8)
+    assert blocks[:, 0].std() > 3 * cells[:, 0].std()
+
+    # A unit per cell and blocks of one is the bootstrap of the cells
+    single = regression.bootstrap(rain, flashes, 200, workers=0,
+                                  groups=np.arange(rain.size), block=1)
+    assert np.array_equal(single, cells)
+
+
+def test_report_windows(cells):
+    """
+    Test if every window count of a table gets its own fit
+    :param cells: fixture
+    """
+    rain, flashes = cells
+    starts = np.repeat(np.arange(40), 49)
+    table = pd.concat([pd.DataFrame({'windows': windows, 'start': starts,
+                                     'rain': rain.ravel() * windows,
+                                     'flashes': flashes.ravel()})
+                       for windows in (2, 4)])
+    output = regression.report({'BRU': table}, resamples=20, workers=0)
+
+    assert output.index.names == ['city', 'windows', 'parameter']
+    assert output.loc[('BRU', 4, 'wrlr'), 'estimate'] == \
+        pytest.approx(2 * output.loc[('BRU', 2, 'wrlr'), 'estimate'])
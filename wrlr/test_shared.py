@@ -0,0 +1,126 @@
+# coding: utf-8
+"""
+Test for the shared lightning table.
+"""
+__docformat__ = 'restructuredtext en'
+
+import concurrent.futures
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wrlr import shared
+from wrlr import synthetic
+from wrlr.earthnetworks import EarthNetworks
+
+
+def strokes(flash_type: str) -> tuple:
+    """
+    Worker task: the strokes of a flash type, and whether the columns are
+     read-only views of the shared segment
+    """
+    table = shared.worker_table()
+    code = table.spec.categories['tipo'].index(flash_type)
+    column = table['multiplicidade']
+    return (int(column[table['tipo'] == code].sum()),
+            not column.flags.writeable and not column.flags.owndata)
+
+
+def owner(file_name: str):
+    """
+    Exports a lightning file to two workers and dies without closing it, run
+     in its own interpreter by ``test_owner_killed``
+    """
+    lightning = EarthNetworks('BRU')
+    lightning.open(file_name)
+    table = lightning.share()
+    with concurrent.futures.ProcessPoolExecutor(
+            2, initializer=shared.initializer,
+            initargs=(table.spec,)) as executor:
+        list(executor.map(strokes, ['CG', 'IC']))
+    print(table.spec.name, flush=True)
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def lightning(tmp_path):
+    """
+    Fixture with an opened synthetic lightning file
+    """
+    output = EarthNetworks('BRU')
+    output.open(synthetic.lightning_csv(str(tmp_path / 'flash.csv'), 'BRU',
+                                        events=2000))
+    return output
+
+
+def test_frame(lightning):
+    """
+    Test if the shared table holds the same events
+    """
+    with lightning.share() as table:
+        assert len(table) == len(lightning.data)
+        assert table['datahora'].dtype == np.dtype('datetime64[ns]')
+        pd.testing.assert_frame_equal(table.frame(), lightning.data,
+                                      check_dtype=False,
+                                      check_categorical=False)
+
+
+def test_workers(lightning):
+    """
+    Test if workers attach without copies and the segment is removed
+    """
+    data = lightning.data
+    with lightning.share() as table:
+        with concurrent.futures.ProcessPoolExecutor(
+                2, initializer=shared.initializer,
+                initargs=(table.spec,)) as executor:
+            output = list(executor.map(strokes, ['CG', 'IC']))
+        spec = table.spec
+
+    assert [value for value, _ in output] == \
+        [data.multiplicidade[data.tipo == kind].sum() for kind in ('CG', 'IC')]
+    assert all(view for _, view in output)
+    with pytest.raises(FileNotFoundError):
+        shared.SharedTable.attach(spec)
+
+
+def test_failure(lightning):
+    """
+    Test if the segment is removed when a job fails
+    """
+    with pytest.raises(ZeroDivisionError):
+        with lightning.share() as table:
+            spec = table.spec
+            1 / 0
+    with pytest.raises(FileNotFoundError):
+        shared.SharedTable.attach(spec)
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'),
+                    reason="Shared memory segments are not files")
+def test_owner_killed(tmp_path):
+    """
+    Test if the resource tracker removes the segment of a killed owner once
+     workers have attached to it
+    """
+    file_name = synthetic.lightning_csv(str(tmp_path / 'flash.csv'), 'BRU',
+                                        events=2000)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(shared.__file__)))
+    process = subprocess.run(
+        [sys.executable, '-c',
+         'from wrlr import test_shared; test_shared.owner(%r)' % file_name],
+        cwd=root, stdout=subprocess.PIPE, universal_newlines=True, timeout=60)
+    assert process.returncode == -signal.SIGKILL
+
+    segment = os.path.join('/dev/shm', process.stdout.split()[-1])
+    for _ in range(100):
+        if not os.path.exists(segment):
+            break
+        time.sleep(0.05)
+    assert not os.path.exists(segment)
@@ -0,0 +1,45 @@
+# coding: utf-8
+"""
+Test for the vectorized slices and related methods.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+import pytest
+
+from wrlr import cappi
+from wrlr import slices
+
+
+@pytest.fixture
+def data():
+    """
+    Fixture object for CAPPI radar data already inside the city box
+    """
+    rad = cappi.CAPPI('BRU')
+    rad.data = np.random.RandomState(0).uniform(0, 50, (200, 200))
+    return rad
+
+
+@pytest.mark.parametrize('windows', [2, 4, 5, 8, 10])
+def test_reduce(data, windows):
+    """
+    Test if slice sums match the ones from ``_slice``
+    :param data: fixture
+    """
+    data._slice(windows)
+    expected = data.slices.sum(axis=(1, 2))
+    assert slices.count(windows) == len(data.slices)
+    assert np.allclose(slices.reduce(data.data, windows), expected)
+
+
+def test_reduce_stack(data):
+    """
+    Test if a stack of matrices is reduced matrix by matrix
+    :param data: fixture
+    """
+    stack = np.stack([data.data, 2 * data.data])
+    output = slices.reduce(stack, 4)
+    assert output.shape == (2, 49)
+    assert np.allclose(output[1], 2 * output[0])
+
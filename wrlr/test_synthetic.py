@@ -0,0 +1,57 @@
+# coding: utf-8
+"""
+Test for the synthetic data used by tests and benchmarks.
+"""
+__docformat__ = 'restructuredtext en'
+
+import os
+
+import numpy as np
+import pytest
+
+from wrlr import cities
+from wrlr import synthetic
+from wrlr.cappi import CAPPI
+from wrlr.earthnetworks import EarthNetworks
+from wrlr.handler import Handler
+
+
+@pytest.mark.parametrize('city', cities.valid_cities)
+def test_radar_tree(tmp_path, city):
+    """
+    Test if synthetic radar files are read as the real ones
+    """
+    files = synthetic.radar_tree(str(tmp_path), city, periods=2)
+    assert os.path.join('Radar', cities.cities[city].folder, '2014', '01') \
+        in files[0]
+
+    radar = CAPPI(city)
+    radar.file_name = files[1]
+    radar.open()
+    assert radar.data.shape == cities.cities[city].shape
+    assert radar.mask_value == synthetic.mask_value
+    assert radar.mask.any() and not radar.mask.all()
+    assert radar.data.max() > 40
+
+    handler = Handler(str(tmp_path))
+    handler.perform()
+    assert handler.files == files
+    assert handler.dates[1] == radar.date
+
+
+def test_lightning_csv(tmp_path):
+    """
+    Test if synthetic lightning files are read as the real ones
+    """
+    file_name = synthetic.lightning_csv(str(tmp_path / 'flash.csv'), 'BRU',
+                                        events=500)
+    flash = EarthNetworks('BRU')
+    flash.open(file_name)
+
+    assert flash.data.keys().tolist() == ['tipo', 'datahora', 'latitude',
+                                          'longitude', 'pico_corrente',
+                                          'multiplicidade']
+    assert 0 < len(flash.data) < 500
+    assert set(flash.data.tipo) == {'CG', 'IC'}
+    assert set(flash.data.pico_corrente) == {'+', '-'}
+    assert np.all(np.diff(flash.data.datahora.values).astype(int) >= 0)
@@ -0,0 +1,79 @@
+# coding: utf-8
+"""
+Test for the pre-flight validation of the radar archive.
+"""
+__docformat__ = 'restructuredtext en'
+
+import os
+import shutil
+
+import pytest
+
+from wrlr import synthetic
+from wrlr import validate
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """
+    Fixture with six scans of PI: one truncated, one not gzip, one missing
+     and one copied under another name
+    """
+    files = synthetic.radar_tree(str(tmp_path), 'PI', periods=6)
+    with open(files[1], 'rb') as data_file:
+        content = data_file.read()
+    with open(files[1], 'wb') as data_file:
+        data_file.write(content[:len(content) // 2])
+    with open(files[2], 'wb') as data_file:
+        data_file.write(b'not a radar file at all')
+    os.remove(files[4])
+    shutil.copy(files[5], files[5].replace('RD_000000005', 'RD_000000099'))
+    return str(tmp_path / 'Radar' / 'PC'), files
+
+
+def test_check(archive):
+    """
+    Test if good, truncated and foreign files are told apart
+    """
+    path, files = archive
+    expected = 500 * 500 * 4
+    assert validate.check(files[0], expected).status == 'ok'
+    assert validate.check(files[0], expected, deep=True).status == 'ok'
+    assert validate.check(files[0], expected + 4).status == 'size'
+    assert validate.check(files[1], expected).status == 'size'
+    assert validate.check(files[2], expected).status == 'not_gzip'
+
+    checks = validate.check_all(files[:3], expected, workers=2, chunk=1)
+    assert [item.status for item in checks] == ['ok', 'size', 'not_gzip']
+
+
+def test_gaps():
+    """
+    Test if late scans are gaps and jitter is not
+    """
+    dates = ['2014-01-01T00:00:00', '2014-01-01T00:07:40',
+             '2014-01-01T00:22:30', '2014-01-01T01:00:00']
+    assert validate.gaps(dates) == [(dates[1], dates[2], 1),
+                                    (dates[2], dates[3], 4)]
+    assert validate.gaps(dates[:1]) == []
+
+
+def test_validate(archive):
+    """
+    Test if the report lists bad files, gaps and duplicates, and if bad files
+     are moved out of the radar tree
+    """
+    path, files = archive
+    report = validate.main(['PI', '--path', path, '--workers', '0',
+                            '--quarantine'])
+
+    assert report['files'] == 6
+    assert [item['file'] for item in report['bad']] == files[1:3]
+    assert [gap['missing'] for gap in report['gaps']] == [1]
+    assert len(report['duplicates']) == 1
+    assert len(report['duplicates'][0]['files']) == 2
+
+    for file_name in files[1:3]:
+        assert not os.path.exists(file_name)
+        assert os.path.exists(validate.quarantine_name(path, file_name))
+    assert validate.validate('PI', path, workers=0)['bad'] == []
@@ -0,0 +1,144 @@
+# coding: utf-8
+"""
+Test for the watch mode.
+"""
+__docformat__ = 'restructuredtext en'
+
+import os
+
+import pytest
+
+from wrlr import summary
+from wrlr import synthetic
+from wrlr import watch
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """
+    Fixture with an empty radar tree and lightning directory
+    """
+    radar = tmp_path / 'Radar' / 'PC'
+    lightning = tmp_path / 'Lightning'
+    radar.mkdir(parents=True)
+    lightning.mkdir()
+    return tmp_path
+
+
+def test_poller(tmp_path):
+    """
+    Test if only new and settled files are found
+    """
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'one').write_text('1')
+    poller = watch.Poller(str(tmp_path), settle=10)
+
+    mtime = os.stat(str(tmp_path / 'a' / 'one')).st_mtime
+    assert poller.poll(mtime) == []
+    assert [f for f, _, _ in poller.poll(mtime + 10)] == \
+        [str(tmp_path / 'a' / 'one')]
+    assert poller.poll(mtime + 20) == []
+
+    (tmp_path / 'a' / 'b').mkdir()
+    (tmp_path / 'a' / 'b' / 'two').write_text('2')
+    (tmp_path / 'a' / '.hidden').write_text('3')
+    assert [f for f, _, _ in poller.poll(mtime + 1e6)] == \
+        [str(tmp_path / 'a' / 'b' / 'two')]
+
+
+def test_poller_growing(tmp_path):
+    """
+    Test if growing files are found again, and if pruned files are forgotten
+    """
+    one = tmp_path / 'one'
+    one.write_text('1\n')
+    mtime = os.stat(str(one)).st_mtime
+    poller = watch.Poller(str(tmp_path), settle=10, growing=True)
+    assert [f for f, _, _ in poller.poll(mtime)] == [str(one)]
+    assert poller.poll(mtime) == []
+
+    with open(str(one), 'a') as data_file:
+        data_file.write('2\n')
+    assert [size for _, size, _ in poller.poll(mtime)] == [4]
+
+    assert poller.prune(mtime + 100) == [str(one)]
+    assert poller.seen == {}
+    two = tmp_path / 'two'
+    two.write_text('3\n')
+    os.utime(str(two), (mtime + 200, mtime + 200))
+    assert [f for f, _, _ in poller.poll(mtime + 1e6)] == [str(two)]
+
+
+def test_watch(tree):
+    """
+    Test if scans dropped in the directory are processed once, with a rolling
+     window
+    """
+    records = []
+    handler = watch.WatchHandler('PI', str(tree / 'Radar' / 'PC'),
+                                 str(tree / 'Lightning'), length="15m",
+                                 settle=0, emit=records.append)
+    assert handler.poll() == []
+
+    synthetic.lightning_csv(str(tree / 'Lightning' / 'flash.csv'), 'PI',
+                            start="2014-01-01 00:00:00",
+                            end="2014-01-01 00:30:00", events=500)
+    synthetic.radar_tree(str(tree), 'PI', periods=2)
+    assert len(handler.poll()) == 2
+    assert handler.poll() == []
+
+    synthetic.radar_tree(str(tree), 'PI', start="2014-01-01 00:15:00",
+                         periods=1, seed=1)
+    output = handler.poll()
+    assert records[-1] is output[0]
+    assert len(records) == 3
+
+    record = records[-1]
+    assert os.path.exists(record['steiner'])
+    assert record['scans'] == 2  # The first scan left the window
+    assert record['start'] == '2014-01-01 00:07:30'
+    city = record['cities']['PI']
+    assert len(city['rain']) == len(city['flashes']) == 49
+    assert sum(city['flashes']) > 0
+    assert sum(city['rain']) > 0
+    assert record['latency'] >= 0
+
+    # Events appended to the open lightning file count for the next scans
+    events = len(handler.events['PI'])
+    more = synthetic.lightning('PI', start="2014-01-01 00:16:00",
+                               end="2014-01-01 00:20:00", events=200, seed=5)
+    more['id'] += 1000
+    more.to_csv(str(tree / 'Lightning' / 'flash.csv'), sep=';', index=False,
+                header=False, mode='a')
+
+    # A late scan is saved but does not enter the window
+    late = synthetic.radar_tree(str(tree), 'PI', start="2014-01-01 00:10:00",
+                                periods=1, seed=2)
+    assert handler.poll() == []
+    assert [entry.file for entry in handler.late] == late
+    assert len(records) == 3
+    assert len(handler.events['PI']) > events
+    assert len(handler.events['PI']) < events + 200
+
+
+def test_watch_summary(tree):
+    """
+    Test if the watcher saves its summary rows every ``checkpoint`` scans,
+     and combines them when it stops
+    """
+    handler = watch.WatchHandler('PI', str(tree / 'Radar' / 'PC'), settle=0,
+                                 emit=lambda record: None)
+    handler.checkpoint = 2
+    file_name = handler.summary_file_name()
+
+    synthetic.radar_tree(str(tree), 'PI', periods=3)
+    assert len(handler.poll()) == 3
+    assert len(handler.summary) == 0
+    assert len(summary.part_names(file_name)) == 1
+
+    synthetic.radar_tree(str(tree), 'PI', start="2014-01-01 00:22:30",
+                         periods=1, seed=1)
+    handler.run(interval=0, polls=1)
+    assert len(handler.summary) == 0
+    assert summary.part_names(file_name) == []
+    assert len(summary.Summary.load(file_name)) == 4
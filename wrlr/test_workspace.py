@@ -0,0 +1,108 @@
+# coding: utf-8
+"""
+Test for the Workspace class and related methods.
+"""
+__docformat__ = 'restructuredtext en'
+
+import gzip
+
+import numpy as np
+import pytest
+
+from wrlr import cappi
+from wrlr import cities
+from wrlr.workspace import Workspace
+
+
+def test_get():
+    """
+    Test if buffers are allocated once per name, shape and dtype
+    """
+    workspace = Workspace()
+    first = workspace.get('a', (3, 4), np.float32)
+    assert workspace.get('a', (3, 4), np.float32) is first
+    assert workspace.get('a', (4, 3), np.float32) is not first
+    assert workspace.get('a', (3, 4), np.bool_) is not first
+    assert workspace.nbytes == 3 * 4 * 4 * 2 + 12
+
+
+@pytest.fixture
+def files(tmp_path):
+    """
+    Fixture with two synthetic PI radar files
+    """
+    city = cities.cities['PI']
+    output = []
+    for index, date in enumerate(('20140101000100', '20140101001100')):
+        field = np.full(city.shape, -99.0, dtype=np.float32)
+        field[100 + index:160, 150:220] = 30.0 + 10 * index
+        field[120:125, 170:175] = np.nan
+        name = str(tmp_path / ('RD_202082071_%s.raw.gz' % date))
+        with gzip.open(name, 'wb') as data_file:
+            data_file.write(field.tobytes())
+        output.append(name)
+    return output
+
+
+def test_open(files):
+    """
+    Test if opening with a workspace matches opening without one, and reuses
+     the same buffers for every file
+    :param files: fixture
+    """
+    plain = cappi.CAPPI('PI')
+    reused = cappi.CAPPI('PI')
+    reused.workspace = Workspace()
+
+    for name in files:
+        plain.open(name)
+        reused.open(name)
+        assert (plain.data == reused.data).all()
+        assert (plain.mask == reused.mask).all()
+        buffers = list(reused.workspace.buffers.values())
+
+        plain.remove_borders()
+        reused.remove_borders()
+        plain.to_zr()
+        reused.to_zr()
+        assert np.allclose(plain.data, reused.data)
+
+    reused.open(files[0])
+    assert [id(b) for b in buffers] == \
+        [id(b) for b in list(reused.workspace.buffers.values())[:len(buffers)]]
+
+
+def test_truncated(tmp_path):
+    """
+    Test if short files are refused instead of reusing stale data
+    """
+    name = str(tmp_path / 'RD_202082071_20140101000100.raw.gz')
+    with gzip.open(name, 'wb') as data_file:
+        data_file.write(np.zeros(10, dtype=np.float32).tobytes())
+
+    radar = cappi.CAPPI('PI')
+    radar.workspace = Workspace()
+    with pytest.raises(IOError):
+        radar.open(name)
+
+
+def test_steiner_filter():
+    """
+    Test if the Steiner filter gives the same mask when using a workspace
+    """
+    random = np.random.RandomState(2)
+    data = random.uniform(-15, 55, (60, 70)).astype(np.float32)
+    data[random.uniform(size=data.shape) < 0.2] = -99.0
+
+    masks = []
+    for workspace in (None, Workspace()):
+        radar = cappi.CAPPI('BRU')
+        radar.workspace = workspace
+        radar.mask_value = np.float32(-99.0)
+        radar.data = data.copy()
+        radar.mask = radar.data == radar.mask_value
+        radar.steiner_filter()
+        masks.append(radar.steiner_mask.copy())
+        assert (radar.data == data).all()
+
+    assert (masks[0] == masks[1]).all()
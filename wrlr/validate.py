@@ -0,0 +1,240 @@
+# coding: utf-8
+"""
+Pre-flight validation of a radar archive, run before the expensive
+ processing so bad files are found at once instead of by ``CAPPI.open`` in
+ the middle of a batch:
+
+    python -m wrlr.validate BRU --path /data/Radar/BR_PP \\
+        --start 2014-01-01 --end 2015-01-01 --report report.json --quarantine
+
+Every file is checked without inflating it: the gzip header must be present
+ and the ISIZE trailer, the inflated size modulo 2 ** 32, must be the size of
+ the city grid. A truncated file ends within the compressed stream, so its
+ last bytes are not the expected size either. ``--deep`` also inflates every
+ file, checking the CRC of its content.
+
+The catalog dates give the scans missing from the ``step`` cadence and the
+ scans found in more than one file. Bad files can then be moved to a
+ ``Quarantine`` directory next to ``Radar``, out of the file lists.
+"""
+__docformat__ = 'restructuredtext en'
+
+import argparse
+import collections
+import concurrent.futures
+import gzip
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from . import cities
+from .batch import select, write_json
+from .handler import Handler
+
+step = 450  # Seconds between two scans
+tolerance = 0.5  # Share of ``step`` a scan may be late without a gap
+
+_magic = b'\x1f\x8b'
+_minimum = 18  # Header and trailer of an empty gzip file
+
+# A single file check, ``status`` being 'ok', 'empty', 'not_gzip', 'size' or
+# 'corrupt', with the expected and found inflated sizes.
+
+Check = collections.namedtuple('Check', ['file', 'status', 'expected',
+                                         'found'])
+
+
+def check(file_name: str, expected: int, deep: bool = False) -> Check:
+    """
+    Checks a radar file from its gzip header and trailer
+
+    :param file_name: the radar file
+    :param expected: the inflated size, 4 bytes per pixel of the city grid
+    :param deep: also inflate the file, checking its CRC
+    :return: Check
+    """
+    size = os.path.getsize(file_name)
+    if size < _minimum:
+        return Check(file_name, 'empty', expected, None)
+
+    with open(file_name, 'rb') as data_file:
+        magic = data_file.read(2)
+        data_file.seek(-4, os.SEEK_END)
+        found, = struct.unpack('<I', data_file.read(4))
+
+    if magic != _magic:
+        return Check(file_name, 'not_gzip', expected, None)
+    if found != expected % 2 ** 32:
+        return Check(file_name, 'size', expected, found)
+
+    if deep:
+        try:
+            with gzip.open(file_name) as data_file:
+                while data_file.read(1 << 20):
+                    pass
+        except (OSError, EOFError, zlib.error):
+            return Check(file_name, 'corrupt', expected, found)
+    return Check(file_name, 'ok', expected, found)
+
+
+def _checks(files: list, expected: int, deep: bool) -> list:
+    return [check(file_name, expected, deep) for file_name in files]
+
+
+def check_all(files: list, expected: int, deep: bool = False,
+              workers: int = None, chunk: int = 256) -> list:
+    """
+    Checks many files in parallel, see ``check``
+
+    :param files: the radar files
+    :param expected: the inflated size of every file
+    :param deep: also inflate every file
+    :param workers: number of processes, one per core by default; 0 runs
+     everything in this process
+    :param chunk: number of files checked by a worker at a time
+    :return: a list of Check, in the order of files
+    """
+    chunks = [files[i:i + chunk] for i in range(0, len(files), chunk)]
+    if workers == 0:
+        return [item for part in chunks
+                for item in _checks(part, expected, deep)]
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return [item for part in executor.map(_checks, chunks,
+                                              [expected] * len(chunks),
+                                              [deep] * len(chunks))
+                for item in part]
+
+
+def gaps(dates: list, seconds: int = step) -> list:
+    """
+    Finds the scans missing from a regular cadence
+
+    :param dates: the sorted dates of the scans
+    :param seconds: the time between two scans
+    :return: a list of (last date before, first date after, missing scans)
+    """
+    if len(dates) < 2:
+        return []
+    times = np.array(dates, dtype='datetime64[s]')
+    delta = np.diff(times).astype(np.int64)
+    late = np.flatnonzero(delta > seconds * (1 + tolerance))
+    missing = np.rint(delta[late] / seconds).astype(np.int64) - 1
+    return [(dates[index], dates[index + 1], max(int(count), 1))
+            for index, count in zip(late, missing)]
+
+
+def duplicates(files: list, dates: list) -> list:
+    """
+    Finds the scans found in more than one file
+
+    :param files: the radar files
+    :param dates: the date of every file
+    :return: a list of (date, files) for dates with several files
+    """
+    output = collections.OrderedDict()
+    for file_name, date in zip(files, dates):
+        output.setdefault(date, []).append(file_name)
+    return [(date, names) for date, names in output.items()
+            if len(names) > 1]
+
+
+def quarantine_name(path: str, file_name: str) -> str:
+    """
+    The quarantine file of a radar file, in the same tree under
+     ``Quarantine`` instead of ``Radar``
+    """
+    relative = os.path.relpath(file_name, path)
+    return os.path.join(path.replace('Radar', 'Quarantine'), relative)
+
+
+def quarantine(path: str, files: list) -> list:
+    """
+    Moves files out of the radar tree, see ``quarantine_name``
+
+    :param path: the root path of the radar files
+    :param files: the files to move
+    :return: the new file names
+    """
+    if path.replace('Radar', 'Quarantine') == path:
+        raise ValueError("%s is not a Radar directory" % path)
+    output = []
+    for file_name in files:
+        target = quarantine_name(path, file_name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(file_name, target)
+        output.append(target)
+    return output
+
+
+def validate(city: str, path: str, start: str = None, end: str = None,
+             deep: bool = False, workers: int = None,
+             move: bool = False) -> dict:
+    """
+    Checks every radar file of a city in [start, end), reporting bad files,
+     gaps and duplicates
+
+    :param city: city code for a radar
+    :param path: file path for the radar files
+    :param start: first date, inclusive
+    :param end: last date, exclusive
+    :param deep: also inflate every file
+    :param workers: number of processes, see ``check_all``
+    :param move: quarantine the bad files
+    :return: the report
+    """
+    y_size, x_size = cities.cities[city].shape
+    expected = y_size * x_size * 4  # Binary size for float
+
+    entries = select(Handler(path), start, end)
+    files = [entry.file for entry in entries]
+    dates = [entry.date for entry in entries]
+
+    bad = [item for item in check_all(files, expected, deep, workers)
+           if item.status != 'ok']
+
+    report = {'city': city, 'path': path, 'start': start, 'end': end,
+              'deep': deep, 'files': len(files), 'step': step,
+              'bad': [item._asdict() for item in bad],
+              'gaps': [{'after': str(after), 'before': str(before),
+                        'missing': missing}
+                       for after, before, missing in gaps(dates)],
+              'duplicates': [{'date': str(date), 'files': names}
+                             for date, names in duplicates(files, dates)],
+              'quarantined': []}
+    if move:
+        report['quarantined'] = quarantine(path,
+                                           [item.file for item in bad])
+    return report
+
+
+def main(arguments: list = None) -> dict:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('city')
+    parser.add_argument('--path', required=True)
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--deep', action='store_true')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--quarantine', action='store_true')
+    parser.add_argument('--report')
+
+    arguments = parser.parse_args(arguments)
+    report = validate(arguments.city, arguments.path, arguments.start,
+                      arguments.end, arguments.deep, arguments.workers,
+                      arguments.quarantine)
+    if arguments.report:
+        write_json(arguments.report, report)
+    print("%d files, %d bad, %d gaps (%d scans), %d duplicated dates" %
+          (report['files'], len(report['bad']), len(report['gaps']),
+           sum(gap['missing'] for gap in report['gaps']),
+           len(report['duplicates'])))
+    return report
+
+
+if __name__ == '__main__':
+    main()
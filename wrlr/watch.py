@@ -0,0 +1,384 @@
+# coding: utf-8
+"""
+Near-real-time processing of radar scans as they arrive.
+
+The watcher polls the radar directory (and optionally a lightning directory),
+ filters every new scan once, saves its Steiner file and emits the WRLR
+ numbers of the window ending at that scan, keeping only that window in
+ memory:
+
+    python -m wrlr.watch BRU PPR --path /data/Radar/BR_PP --lightning /data/Flash
+"""
+__docformat__ = 'restructuredtext en'
+
+import argparse
+import collections
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import instrument
+from . import pyramid
+from .earthnetworks import EarthNetworks
+from .handler import CatalogEntry
+from .handler_steiner import SteinerHandler
+from .handler_wrlr import WRLRHandler
+
+
+class Poller(object):
+    """
+    Finds the files added to a directory tree since the previous poll.
+
+    A directory is listed again only when its modification time changed, so a
+     poll over a quiet tree costs one ``stat`` per directory. Files modified
+     less than ``settle`` seconds ago may still be being written; they are
+     kept aside and checked again on the next polls.
+
+    With ``growing``, files are appended to while open, such as the daily
+     lightning files: every file found is checked again at each poll, and
+     reported again whenever its size or modification time changed, without
+     waiting for it to settle. Readers take only the complete lines added.
+
+    ``prune`` forgets the files older than a given time, which are not
+     reported again.
+
+    :param path: the root of the tree
+    :param settle: seconds without modification before a file is accepted
+    :param growing: report files again as they grow
+    """
+
+    def __init__(self, path: str, settle: float = 1.0, growing: bool = False):
+        self.path = path
+        self.settle = settle
+        self.growing = growing
+        self.directories = {}  # path: (mtime, subdirectories)
+        self.seen = {}  # path: (size, mtime)
+        self.pending = {}  # path: (size, mtime)
+        self.horizon = 0.0  # Files modified before are ignored
+
+    def _scan(self, directory: str, found: dict, now: float):
+        try:
+            mtime = os.stat(directory).st_mtime
+        except FileNotFoundError:
+            self.directories.pop(directory, None)
+            return
+
+        # A directory changed within the timestamp resolution of the file
+        # system could change again with the same mtime: it is listed again
+        # until it is old enough.
+
+        known = self.directories.get(directory)
+        if known is not None and known[0] == mtime and now - mtime > 2.0:
+            subdirectories = known[1]
+        else:
+            subdirectories = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name[0] == '.':
+                        continue
+                    if entry.is_dir():
+                        subdirectories.append(entry.path)
+                    elif entry.path not in self.seen and \
+                            entry.path not in self.pending:
+                        stat = entry.stat()
+                        if stat.st_mtime >= self.horizon:
+                            found[entry.path] = (stat.st_size,
+                                                 stat.st_mtime)
+            self.directories[directory] = (mtime, subdirectories)
+
+        for subdirectory in subdirectories:
+            self._scan(subdirectory, found, now)
+
+    def poll(self, now: float = None) -> list:
+        """
+        Lists the files that arrived and settled since the previous poll
+
+        :param now: the current time, ``time.time()`` by default
+        :return: a sorted list of (file, size, mtime)
+        """
+        now = time.time() if now is None else now
+        found = {}
+        self._scan(self.path, found, now)
+
+        for file_name in list(self.pending) + \
+                (list(self.seen) if self.growing else []):
+            try:
+                stat = os.stat(file_name)
+            except FileNotFoundError:
+                self.pending.pop(file_name, None)
+                self.seen.pop(file_name, None)
+                continue
+            if self.seen.get(file_name) != (stat.st_size, stat.st_mtime):
+                found[file_name] = (stat.st_size, stat.st_mtime)
+
+        output = []
+        for file_name, (size, mtime) in found.items():
+            if self.growing or now - mtime >= self.settle:
+                self.pending.pop(file_name, None)
+                self.seen[file_name] = (size, mtime)
+                output.append((file_name, size, mtime))
+            else:
+                self.pending[file_name] = (size, mtime)
+
+        return sorted(output)
+
+    def prune(self, before: float) -> list:
+        """
+        Forgets the files last modified before a given time, so ``seen`` does
+         not grow forever. Such files are ignored from now on.
+
+        :param before: a time as given by ``time.time()``
+        :return: the files forgotten
+        """
+        self.horizon = max(self.horizon, before)
+        output = [file_name for file_name, (_, mtime) in self.seen.items()
+                  if mtime < self.horizon]
+        for file_name in output:
+            del self.seen[file_name]
+        return output
+
+
+class WatchHandler(SteinerHandler):
+    """
+    The WatchHandler class processes radar files as they are written to path.
+
+    Every new scan is filtered and saved as ``SteinerHandler.process_file``
+     does. The rain of each city box is then summed over the cells of a
+     pyramid and kept, with the lightning events, only while it belongs to the
+     current window, i.e. the ``length`` ending ``scan_interval`` after the
+     last scan. A record is emitted for every scan with the WRLR numbers of
+     each slice of that window.
+
+    Lightning files are read as they arrive in the lightning path, and read
+     again from where they were left as they grow; events arriving after a
+     scan only count for the following scans.
+
+    Scans are expected in date order. A scan not newer than the last one is
+    late: its lightning already left the window, so it is filtered and saved
+    but neither added to the window nor emitted, and is kept in ``late``.
+    Files older than the window are forgotten by the pollers.
+
+    The summary rows of the scans are saved as a part file every
+     ``checkpoint`` scans, and combined into the summary file when ``run``
+     stops, see ``SteinerHandler.process``.
+
+    :param city: city code for a radar, or a tuple of city codes sharing the
+     same radar files
+    :param path: file path for the radar files
+    :param lightning: file path for the lightning csv files
+    :param length: the duration of each window
+    :param windows: the number of windows given to ``_slice``
+    :param flash_type: either 'CG', 'IC' or a tuple of both
+    :param scan_interval: the time each scan represents
+    :param settle: seconds without modification before a file is accepted
+    :param emit: a function receiving each record, writing JSON lines to
+     stdout by default
+    """
+
+    def __init__(self, city, path: str, lightning: str = None,
+                 length: str = "30m", windows: int = 4,
+                 flash_type=('CG', 'IC'), scan_interval: str = "450s",
+                 settle: float = 1.0, emit=None):
+        super().__init__(city, path)
+        self.length = pd.to_timedelta(length)
+        self.scan_interval = pd.to_timedelta(scan_interval)
+        self.flash_type = flash_type
+        self.windows = windows
+        self.emit = self._write if emit is None else emit
+
+        self.radar_poller = Poller(path, settle)
+        self.lightning_poller = None if lightning is None \
+            else Poller(lightning, settle, growing=True)
+        self.offsets = {}  # lightning file: bytes read
+        self.late = []  # CatalogEntry of the late scans
+        self.last = None  # Date of the last scan in the window
+
+        # WRLRHandler holds the geometry and lightning binning of each city
+        self.wrlr = collections.OrderedDict(
+            (code, WRLRHandler(code, path, windows)) for code in self.radars)
+        self.events = collections.OrderedDict()  # code: pd.DataFrame
+        self.scans = collections.deque()  # (date, {code: cells})
+
+    @staticmethod
+    def _write(record: dict):
+        sys.stdout.write(json.dumps(record) + '\n')
+        sys.stdout.flush()
+
+    def add_lightning(self, file_name: str):
+        """
+        Adds the events of a lightning file to the current window of each city,
+         reading only the complete lines added since the previous call
+        """
+        with open(file_name, 'rb') as data_file:
+            header = data_file.readline()
+            offset = max(self.offsets.get(file_name, 0), len(header))
+            data_file.seek(offset)
+            content = data_file.read()
+
+        end = content.rfind(b'\n') + 1
+        if not end:
+            return
+        self.offsets[file_name] = offset + end
+        content = header + content[:end]
+
+        for code in self.radars:
+            reader = EarthNetworks(code)
+            reader.open(io.BytesIO(content))
+            frames = [reader.data]
+            if code in self.events:
+                frames.insert(0, self.events[code])
+            self.events[code] = pd.concat(frames).sort_values('datahora')
+
+    def scan(self, entry: CatalogEntry) -> dict:
+        """
+        Processes a single new scan and builds its record
+
+        :param entry: the new radar file
+        :return: the record, None for a late scan
+        """
+        self.process_file(entry.file)
+        date = self.radar.date
+        if self.last is not None and date <= self.last:
+            self.late.append(entry)
+            return None
+        self.last = date
+
+        cells = {}
+        for code, crop in self.crops.items():
+            crop.to_zr()
+            crop.apply_filter()
+            cells[code] = pyramid.blocks(crop.data, self.wrlr[code].edges)
+        self.scans.append((date, cells))
+
+        end = date + self.scan_interval
+        start = end - self.length
+        while self.scans and self.scans[0][0] < start:
+            self.scans.popleft()
+        for code, events in self.events.items():
+            self.events[code] = events[events.datahora >= start]
+
+        hours = self.scan_interval.total_seconds() / 3600.0
+        starts = np.array([start], dtype='datetime64[ns]')
+        ends = np.array([end], dtype='datetime64[ns]')
+
+        record = {'file': entry.file,
+                  'steiner': self.radar.steiner_file_name(),
+                  'start': str(start), 'end': str(end),
+                  'scans': len(self.scans), 'cities': {}}
+        for code, handler in self.wrlr.items():
+            rain = sum(scan[code] for _, scan in self.scans) * hours
+            rain = pyramid.Pyramid.from_blocks(rain, handler.edges)
+            rain = rain.reduce(self.windows) * handler.pixel_area * 1e3
+
+            if code not in self.events:
+                flashes = np.zeros(rain.shape, dtype=np.int64)
+            else:
+                handler.lightning.data = self.events[code]
+                flashes = handler.count_flashes(starts, ends,
+                                                self.flash_type)[0]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.where(flashes > 0, rain / flashes, np.nan)
+            record['cities'][code] = {
+                'convective': int((~self.crops[code].steiner_mask).sum()),
+                'rain': rain.tolist(), 'flashes': flashes.tolist(),
+                'ratio': [None if np.isnan(value) else value
+                          for value in ratio.tolist()]}
+
+        record['latency'] = time.time() - entry.mtime
+        return record
+
+    def poll(self, now: float = None) -> list:
+        """
+        Reads the new lightning files, then processes the new scans in
+         chronological order, emitting one record each.
+
+        :param now: the current time, ``time.time()`` by default
+        :return: the records emitted
+        """
+        if self.lightning_poller is not None:
+            for file_name, _, _ in self.lightning_poller.poll(now):
+                self.add_lightning(file_name)
+
+        found = self.radar_poller.poll(now)
+        if not found:
+            return []
+
+        self.files = [file_name for file_name, _, _ in found]
+        self.list_dates()
+        entries = sorted((CatalogEntry(file=file_name, date=date, size=size,
+                                       mtime=mtime)
+                          for (file_name, size, mtime), date
+                          in zip(found, self.dates)),
+                         key=lambda entry: entry.date)
+
+        self.populate_dirs()
+        output = []
+        for entry in entries:
+            with instrument.stage('watch.scan'):
+                record = self.scan(entry)
+            if record is not None:
+                self.emit(record)
+                output.append(record)
+        self.checkpoint_summary()
+        self.prune()
+        return output
+
+    def prune(self):
+        """
+        Forgets the files modified before the current window, in both pollers
+        """
+        seen = self.radar_poller.seen.values()
+        if not seen:
+            return
+        before = max(mtime for _, mtime in seen) - \
+            (self.length + self.scan_interval).total_seconds()
+        self.radar_poller.prune(before)
+        if self.lightning_poller is not None:
+            for file_name in self.lightning_poller.prune(before):
+                self.offsets.pop(file_name, None)
+
+    def run(self, interval: float = 5.0, polls: int = None):
+        """
+        Polls forever, or ``polls`` times
+
+        :param interval: seconds between polls
+        :param polls: number of polls, unlimited by default
+        """
+        done = 0
+        try:
+            while polls is None or done < polls:
+                began = time.monotonic()
+                self.poll()
+                done += 1
+                time.sleep(max(0.0, interval - (time.monotonic() - began)))
+        finally:
+            self.combine_summary()
+
+
+def main(arguments: list = None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cities', nargs='+')
+    parser.add_argument('--path', required=True)
+    parser.add_argument('--lightning')
+    parser.add_argument('--length', default='30m')
+    parser.add_argument('--windows', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=5.0)
+    parser.add_argument('--settle', type=float, default=1.0)
+
+    arguments = parser.parse_args(arguments)
+    handler = WatchHandler(arguments.cities, arguments.path,
+                           arguments.lightning, arguments.length,
+                           arguments.windows, settle=arguments.settle)
+    handler.run(arguments.interval)
+
+
+if __name__ == '__main__':
+    main()
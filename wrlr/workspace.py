@@ -0,0 +1,53 @@
+# coding: utf-8
+"""
+This module contains the Workspace class, a set of preallocated buffers reused
+ by CAPPI across files.
+"""
+__docformat__ = 'restructuredtext en'
+
+import numpy as np
+
+
+class Workspace(object):
+    """
+    Holds named buffers for the per-scan pipeline. A buffer is allocated the
+     first time a (name, shape, dtype) is requested and the same array is
+     returned afterwards, so processing many files of the same grid keeps a
+     flat memory footprint.
+
+    Arrays handed out by a workspace are overwritten by the next file: copy
+     anything that must outlive the current scan.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name: str, shape: tuple, dtype=np.float32) -> np.ndarray:
+        """
+        Returns the buffer for a name, shape and dtype, allocating it only the
+         first time. Its content is whatever the previous user left there.
+
+        :param name: the buffer name, usually the pipeline stage using it
+        :param shape: the buffer shape
+        :param dtype: the buffer dtype
+        :return: np.ndarray
+        """
+        key = (name, tuple(shape), np.dtype(dtype).str)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buffer
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the memory held by all buffers
+        :return: int
+        """
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+    def clear(self):
+        """
+        Releases all buffers
+        """
+        self.buffers.clear()